@@ -0,0 +1,290 @@
+"""
+API HTTP ArtAdvisor (fără interfață), alături de aplicația Streamlit.
+
+Rulează doar cu biblioteca standard: python -m api [--host 127.0.0.1] [--port 8502]
+Predicțiile trec prin același get_all_predictions ca interfața (aceleași încărcătoare de modele,
+cache, micro-batching sau worker-ul de inferență, dacă este configurat).
+
+Rute:
+  GET  /health                  starea serviciului
+  GET  /ready                   200 după încălzirea modelelor, altfel 503 (pentru load balancer)
+  POST /predict?top_k=5         o imagine (corpul cererii) sau mai multe (multipart/form-data) -> JSON
+                                (prioritate=lot pentru integrări în masă, rulate doar pe capacitatea liberă)
+  POST /gradcam?model=stil      harta Grad-CAM a unei imagini, ca PNG (model: stil sau autor)
+  GET  /galerie?limit=24        o pagină de rezumate din galerie și cursorul următoarei pagini
+                                (cursor, sortare, stil, autor, scor_stil_min, scor_autor_min)
+"""
+
+import argparse
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from config import (API_HOST, API_PORT, API_WORKERS, API_MAX_UPLOAD_MB, API_KEEPALIVE_S, API_GALLERY_MAX_PAGE,
+                    INFERENCE_BACKEND, WARMUP_ENABLED)
+from predictors.warmup import start_warmup, get_readiness
+from predictors.thread_budget import get_thread_settings
+from predictors.scheduler import get_scheduler, PRIORITY_INTERACTIVE, PRIORITIES
+from utils.single_flight import get_coalescing_stats
+from utils.artifact_store import get_artifact_stats
+
+MODEL_KEYS = ("stil", "autor", "emotie")
+CAM_MODEL_KEYS = ("stil", "autor")
+
+# Imaginile dintr-un lot multipart rulează concurent, ca micro-batcher-ul să le grupeze într-un forward
+_image_pool = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api-image")
+
+class ApiError(Exception):
+    """Eroare returnată clientului ca JSON, cu codul HTTP dat."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def parse_multipart(body, content_type):
+    """Extrage fișierele dintr-un corp multipart/form-data. Returnează o listă (nume, bytes)."""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode('latin-1') + body
+    )
+    if not message.is_multipart():
+        raise ApiError(400, "Corpul multipart nu a putut fi interpretat")
+
+    files = []
+    for part in message.iter_parts():
+        payload = part.get_payload(decode=True)
+        if payload:
+            files.append((part.get_filename() or part.get_param('name', header='content-disposition') or f"imagine_{len(files)}", payload))
+    return files
+
+def format_predictions(predictions, top_k, models=MODEL_KEYS):
+    """Rezultatul get_all_predictions în format JSON: top-k (etichetă, scor) pentru fiecare model."""
+    if predictions.get("error"):
+        return {"error": predictions["error"]}
+
+    formatted = {}
+    for key in models:
+        results = predictions.get(key, {})
+        if results.get("error"):
+            formatted[key] = {"error": results["error"]}
+            continue
+        formatted[key] = {
+            "top_k": [{"eticheta": label, "scor": round(float(score), 6)} for label, score in results.get("predictions_sorted", [])[:top_k]]
+        }
+    return formatted
+
+def predict_image(image_bytes, top_k, models=MODEL_KEYS, priority=PRIORITY_INTERACTIVE):
+    """Rulează cele trei modele pe o imagine (bytes) și returnează rezultatul formatat."""
+    from predict import get_all_predictions
+    return format_predictions(get_all_predictions(image_bytes, priority=priority), top_k, models)
+
+def gradcam_png(image_bytes, model_key, class_idx=None):
+    """Harta CAM pentru modelul dat, ca bytes PNG."""
+    from predict import get_all_predictions
+
+    predictions = get_all_predictions(image_bytes)
+    if predictions.get("error") or predictions.get(model_key, {}).get("error"):
+        raise ApiError(500, predictions.get("error") or predictions[model_key]["error"])
+
+    num_classes = len(predictions[model_key].get("predictions_sorted", []))
+    if class_idx is not None and not 0 <= class_idx < num_classes:
+        raise ApiError(400, f"class_idx trebuie să fie între 0 și {num_classes - 1}")
+
+    from predictors.cam_overlay import get_gradcam_image
+    overlay = get_gradcam_image(predictions.get(model_key), class_idx)
+    if overlay is None:
+        raise ApiError(500, "Harta Grad-CAM nu a putut fi generată")
+
+    buffer = io.BytesIO()
+    overlay.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+class PredictionRequestHandler(BaseHTTPRequestHandler):
+    """Handler HTTP/1.1 (keep-alive) pentru rutele API-ului."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "ArtAdvisorAPI/1.0"
+    # Conexiunile keep-alive inactive eliberează firul din pool după acest interval
+    timeout = API_KEEPALIVE_S
+
+    def log_message(self, format, *args):
+        print(f"API {self.address_string()} - {format % args}")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'), "application/json; charset=utf-8")
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            raise ApiError(400, "Cererea nu conține nicio imagine")
+        if length > API_MAX_UPLOAD_MB * 1024 * 1024:
+            raise ApiError(413, f"Cererea depășește limita de {API_MAX_UPLOAD_MB} MB")
+        return self.rfile.read(length)
+
+    def _read_images(self):
+        body = self._read_body()
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            files = parse_multipart(body, content_type)
+            if not files:
+                raise ApiError(400, "Cererea multipart nu conține fișiere")
+            return files
+        return [("imagine", body)]
+
+    def _route(self):
+        parsed = urlparse(self.path)
+        return parsed.path.rstrip('/') or '/', {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+    def do_GET(self):
+        path, params = self._route()
+        try:
+            if path == "/health":
+                self._send_json(200, {
+                    "status": "ok", "backend": INFERENCE_BACKEND,
+                    "fire_cpu": get_thread_settings(), "planificator": get_scheduler().stats(),
+                    "coalescare": get_coalescing_stats(), "artefacte": get_artifact_stats()
+                })
+            elif path == "/ready":
+                readiness = get_readiness()
+                self._send_json(200 if readiness["pregatit"] else 503, readiness)
+            elif path == "/galerie":
+                self._handle_gallery(params)
+            else:
+                raise ApiError(404, f"Ruta necunoscută: {path}")
+        except ApiError as e:
+            self._send_json(e.status, {"error": e.message})
+        except Exception as e:
+            print(f"Eroare în API: {e}")
+            self._send_json(500, {"error": f"Eroare internă: {e}"})
+
+    def do_POST(self):
+        path, params = self._route()
+        try:
+            if path == "/predict":
+                self._handle_predict(params)
+            elif path == "/gradcam":
+                self._handle_gradcam(params)
+            else:
+                raise ApiError(404, f"Ruta necunoscută: {path}")
+        except ApiError as e:
+            # Corpul poate fi rămas necitit, ceea ce ar strica următoarea cerere de pe conexiunea keep-alive
+            self.close_connection = True
+            self._send_json(e.status, {"error": e.message})
+        except Exception as e:
+            print(f"Eroare în API: {e}")
+            self._send_json(500, {"error": f"Eroare internă: {e}"})
+
+    def _handle_predict(self, params):
+        try:
+            top_k = max(1, int(params.get("top_k", 5)))
+        except ValueError:
+            raise ApiError(400, "top_k trebuie să fie un număr întreg")
+        models = tuple(key for key in params.get("models", ",".join(MODEL_KEYS)).split(',') if key in MODEL_KEYS)
+        if not models:
+            raise ApiError(400, f"models trebuie să conțină cel puțin unul dintre: {', '.join(MODEL_KEYS)}")
+
+        priority = params.get("prioritate", PRIORITY_INTERACTIVE)
+        if priority not in PRIORITIES:
+            raise ApiError(400, f"prioritate trebuie să fie una dintre: {', '.join(PRIORITIES)}")
+
+        files = self._read_images()
+        futures = [_image_pool.submit(predict_image, image_bytes, top_k, models, priority) for _, image_bytes in files]
+        results = [{"fisier": name, **future.result()} for (name, _), future in zip(files, futures)]
+        self._send_json(200, {"rezultate": results})
+
+    def _handle_gallery(self, params):
+        # Importat la prima cerere: API-ul de predicție nu încarcă indexurile galeriei
+        from utils.data_management import iter_artworks
+
+        try:
+            limit = min(max(1, int(params.get("limit", 24))), API_GALLERY_MAX_PAGE)
+            filters = {
+                "style": params.get("stil") or None,
+                "author": params.get("autor") or None,
+                "min_style_score": float(params["scor_stil_min"]) if params.get("scor_stil_min") else None,
+                "min_author_score": float(params["scor_autor_min"]) if params.get("scor_autor_min") else None,
+            }
+            summaries, next_cursor = iter_artworks(params.get("cursor"), limit, params.get("sortare", "data"), filters)
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        self._send_json(200, {"opere": summaries, "cursor": next_cursor})
+
+    def _handle_gradcam(self, params):
+        model_key = params.get("model", "stil")
+        if model_key not in CAM_MODEL_KEYS:
+            raise ApiError(400, f"model trebuie să fie unul dintre: {', '.join(CAM_MODEL_KEYS)}")
+        try:
+            class_idx = int(params["class_idx"]) if params.get("class_idx") else None
+        except ValueError:
+            raise ApiError(400, "class_idx trebuie să fie un număr întreg")
+
+        files = self._read_images()
+        self._send(200, gradcam_png(files[0][1], model_key, class_idx), "image/png")
+
+class PooledHTTPServer(HTTPServer):
+    """Server HTTP care servește conexiunile pe un pool fix de fire (nu câte un fir nou per conexiune)."""
+
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, workers=API_WORKERS):
+        super().__init__(server_address, handler_class)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-conn")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+def create_server(host=API_HOST, port=API_PORT, workers=API_WORKERS):
+    """Creează serverul API (port=0 alege un port liber, util în teste)."""
+    return PooledHTTPServer((host, port), PredictionRequestHandler, workers=workers)
+
+def start_server_thread(host=API_HOST, port=0, workers=API_WORKERS):
+    """Pornește serverul pe un fir de fundal și îl returnează; adresa efectivă este server.server_address."""
+    server = create_server(host, port, workers)
+    threading.Thread(target=server.serve_forever, name="artadvisor-api", daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m api", description="API HTTP pentru predicțiile ArtAdvisor")
+    parser.add_argument("--host", default=API_HOST, help="Adresa de ascultare")
+    parser.add_argument("--port", type=int, default=API_PORT, help="Portul de ascultare")
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Numărul de conexiuni servite concurent")
+    args = parser.parse_args(argv)
+
+    server = create_server(args.host, args.port, args.workers)
+    if WARMUP_ENABLED:
+        start_warmup()
+    print(f"API ArtAdvisor pornit pe http://{args.host}:{server.server_address[1]} ({args.workers} fire)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Oprire API...")
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -20,8 +20,10 @@ st.set_page_config(
 )
 
 import sys
+import time
 import types
 import base64
+import importlib
 from pathlib import Path
 
 # Optimizare PyTorch pentru Streamlit
@@ -29,14 +31,45 @@ torch_classes = types.ModuleType("torch.classes")
 torch_classes.__path__ = []
 sys.modules["torch.classes"] = torch_classes
 
-from ui_components.analysis_tab import render_analysis_tab
-from ui_components.gallery_tab import render_gallery_tab
-from ui_components.search_tab import render_search_tab
-from ui_components.artist_chat_tab import render_artist_chat_tab
-from ui_components.music_gen_tab import render_music_gen_tab
-from ui_components.emotional_lab_tab import render_emotional_lab_tab
-from ui_components.emotional_journeys_tab import render_emotional_journeys_tab
-from ui_components.art_therapy_tab import render_art_therapy_tab
+from config import WARMUP_ENABLED, READINESS_PORT
+from predictors.warmup import start_warmup, start_readiness_server
+
+# Încălzirea modelelor pe un fir de fundal, o singură dată per proces (fără efect la rerulări).
+# Cu worker de inferență, procesul Streamlit nu încarcă modelele: încălzirea doar verifică (ping) worker-ul
+if WARMUP_ENABLED:
+    start_warmup()
+if READINESS_PORT:
+    start_readiness_server(port=READINESS_PORT)
+
+# Modulele tab-urilor (și bibliotecile grele din spatele lor: torch, openai, plotly, sklearn)
+# se importă doar la prima selectare a tab-ului, nu la fiecare rulare a scriptului
+TAB_MODULES = {
+    "analysis": ("ui_components.analysis_tab", "render_analysis_tab"),
+    "gallery": ("ui_components.gallery_tab", "render_gallery_tab"),
+    "search": ("ui_components.search_tab", "render_search_tab"),
+    "chat": ("ui_components.artist_chat_tab", "render_artist_chat_tab"),
+    "music": ("ui_components.music_gen_tab", "render_music_gen_tab"),
+    "emotional_lab": ("ui_components.emotional_lab_tab", "render_emotional_lab_tab"),
+    "emotional_journeys": ("ui_components.emotional_journeys_tab", "render_emotional_journeys_tab"),
+    "art_therapy": ("ui_components.art_therapy_tab", "render_art_therapy_tab"),
+}
+
+@st.cache_resource
+def get_tab_import_timings():
+    """Durata primului import al fiecărui tab (ms), comună tuturor sesiunilor procesului."""
+    return {}
+
+def load_tab_renderer(tab_key):
+    """Importă modulul tab-ului la prima folosire și returnează funcția lui de randare."""
+    module_name, function_name = TAB_MODULES[tab_key]
+    timings = get_tab_import_timings()
+
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    if tab_key not in timings:
+        timings[tab_key] = (time.perf_counter() - start) * 1000
+        print(f"Import tab {tab_key} ({module_name}): {timings[tab_key]:.0f} ms")
+    return getattr(module, function_name)
 
 # Cache optimizat pentru fișiere CSS
 @st.cache_data(ttl=3600) 
@@ -150,22 +183,8 @@ st.markdown('<div class="separator"></div>', unsafe_allow_html=True)
 current_tab = st.session_state.current_tab
 
 try:
-    if current_tab == "analysis":
-        render_analysis_tab()
-    elif current_tab == "gallery":
-        render_gallery_tab()
-    elif current_tab == "search":
-        render_search_tab()
-    elif current_tab == "chat":
-        render_artist_chat_tab()
-    elif current_tab == "music":
-        render_music_gen_tab()
-    elif current_tab == "emotional_lab":
-        render_emotional_lab_tab()
-    elif current_tab == "emotional_journeys":
-        render_emotional_journeys_tab()
-    elif current_tab == "art_therapy":
-        render_art_therapy_tab()
+    render_tab = load_tab_renderer(current_tab if current_tab in TAB_MODULES else "analysis")
+    render_tab()
 except Exception as e:
     st.error(f"Eroare la încărcarea secțiunii: {str(e)}")
     st.info("Vă rugăm să reîncărcați pagina.")
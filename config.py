@@ -3,6 +3,8 @@ Configurații globale pentru aplicația ArtAdvisor.
 Aici sunt definite toate constantele și variabilele  globale folosite în aplicație.
 """
 
+import os
+
 ARTIST_PERSONAS = {
     "Vincent van Gogh": {
         "prompt": """Ești Vincent van Gogh, pictorul post-impresionist olandez. Ești un suflet chinuit dar profund pasional. 
@@ -48,3 +50,115 @@ EMOTION_GROUPS = {
     'contemplative': ['Nostalgie', 'Reflecție', 'Introspecție', 'Meditație'],
     'intense': ['Pasiune', 'Dramă', 'Tensiune', 'Conflict']
 }
+
+# Micro-batching pentru inferență: cererile concurente sunt grupate într-un singur forward per model
+MICRO_BATCHING_ENABLED = os.environ.get("ARTADVISOR_MICRO_BATCHING", "1") == "1"
+MICRO_BATCH_MAX_SIZE = int(os.environ.get("ARTADVISOR_MICRO_BATCH_SIZE", "8"))
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get("ARTADVISOR_MICRO_BATCH_WAIT_MS", "5"))
+
+# Validarea hărților CAM (fără backward) față de GradCAM din torchcam, la fiecare randare
+CAM_VALIDATION = os.environ.get("ARTADVISOR_CAM_VALIDATION", "0") == "1"
+
+# Backend-ul de inferență pe CPU: "fp32" (implicit), "int8" (cuantizare dinamică a straturilor Linear; nu și a
+# atenției ViT, deci accelerează practic doar MLP-urile modelului de emoții - vezi python -m predict quantize)
+# sau "onnx" (ONNX Runtime, fără torch în procesul de servire; modelele se exportă cu python -m predict export-onnx)
+INFERENCE_BACKEND = os.environ.get("ARTADVISOR_INFERENCE_BACKEND", "fp32").lower()
+
+# Ponderile fp32 sunt mapate în memorie pe CPU (safetensors sau torch.load(mmap=True)), partajate între procese
+WEIGHTS_MMAP = os.environ.get("ARTADVISOR_WEIGHTS_MMAP", "1") == "1"
+
+# ONNX Runtime: directorul modelelor exportate și numărul de fire (0 = alegerea ONNX Runtime)
+ONNX_MODEL_DIR = os.environ.get("ARTADVISOR_ONNX_DIR", "models/onnx")
+ONNX_INTRA_OP_THREADS = int(os.environ.get("ARTADVISOR_ONNX_INTRA_OP_THREADS", "0"))
+ONNX_INTER_OP_THREADS = int(os.environ.get("ARTADVISOR_ONNX_INTER_OP_THREADS", "1"))
+
+# Cache-ul de predicții indexat după conținutul imaginii (memorie + disc, limitate în MB)
+PREDICTION_CACHE_ENABLED = os.environ.get("ARTADVISOR_PREDICTION_CACHE", "1") == "1"
+PREDICTION_CACHE_DIR = os.environ.get("ARTADVISOR_PREDICTION_CACHE_DIR", ".cache/predictions")
+PREDICTION_CACHE_MEMORY_MB = int(os.environ.get("ARTADVISOR_PREDICTION_CACHE_MEMORY_MB", "64"))
+PREDICTION_CACHE_DISK_MB = int(os.environ.get("ARTADVISOR_PREDICTION_CACHE_DISK_MB", "512"))
+
+# Rularea concurentă a celor trei modele în get_all_predictions, cu împărțirea firelor intra-op
+# (ex. "stil=4,autor=4,emotie=8"; implicit 1/4, 1/4 și 1/2 din bugetul total)
+PARALLEL_MODELS_ENABLED = os.environ.get("ARTADVISOR_PARALLEL_MODELS", "1") == "1"
+MODEL_THREAD_SPLIT = os.environ.get("ARTADVISOR_MODEL_THREADS", "")
+
+# Bugetul central de fire CPU: totalul intra-op (0 = nucleele disponibile), afinitatea opțională
+# (ex. "0-7"), firele inter-op torch, OpenCV și BLAS (numpy/sklearn)
+CPU_THREAD_BUDGET = int(os.environ.get("ARTADVISOR_CPU_THREADS", "0"))
+CPU_AFFINITY = os.environ.get("ARTADVISOR_CPU_AFFINITY", "")
+TORCH_INTEROP_THREADS = int(os.environ.get("ARTADVISOR_TORCH_INTEROP_THREADS", "1"))
+OPENCV_THREADS = int(os.environ.get("ARTADVISOR_OPENCV_THREADS", "1"))
+BLAS_THREADS = int(os.environ.get("ARTADVISOR_BLAS_THREADS", "1"))
+
+# Worker-ul de inferență: un singur proces deține modelele și servește toate procesele Streamlit.
+# Adresa este un socket Unix (ex. "/tmp/artadvisor-inference.sock") sau "host:port"; gol = inferență în proces.
+# Cheia de autentificare: pe TCP este obligatorie (worker-ul refuză să pornească fără ea); pe socket Unix,
+# dacă lipsește, worker-ul generează la fiecare pornire o cheie aleatoare în "<socket>.key" (permisiuni 0600)
+INFERENCE_WORKER_ADDRESS = os.environ.get("ARTADVISOR_INFERENCE_WORKER", "")
+INFERENCE_WORKER_AUTHKEY = os.environ.get("ARTADVISOR_INFERENCE_WORKER_AUTHKEY", "").encode('utf-8') or None
+INFERENCE_WORKER_QUEUE_SIZE = int(os.environ.get("ARTADVISOR_INFERENCE_WORKER_QUEUE", "32"))
+INFERENCE_WORKER_THREADS = int(os.environ.get("ARTADVISOR_INFERENCE_WORKER_THREADS", "4"))
+INFERENCE_WORKER_TIMEOUT_S = float(os.environ.get("ARTADVISOR_INFERENCE_WORKER_TIMEOUT", "120"))
+INFERENCE_WORKER_AUTOSTART = os.environ.get("ARTADVISOR_INFERENCE_WORKER_AUTOSTART", "0") == "1"
+# Setat de predictors.worker pentru procesul worker, care rulează modelele local
+IS_INFERENCE_WORKER = os.environ.get("ARTADVISOR_INFERENCE_ROLE") == "worker"
+USE_INFERENCE_WORKER = bool(INFERENCE_WORKER_ADDRESS) and not IS_INFERENCE_WORKER
+
+# Încălzirea modelelor la pornire (fir de fundal) și portul serverului /health + /ready (0 = dezactivat).
+# Serverul ascultă implicit pe aceeași adresă ca API-ul (127.0.0.1); pentru un load balancer extern
+# se setează explicit ARTADVISOR_READINESS_HOST (ex. adresa rețelei interne sau 0.0.0.0)
+WARMUP_ENABLED = os.environ.get("ARTADVISOR_WARMUP", "1") == "1"
+READINESS_PORT = int(os.environ.get("ARTADVISOR_READINESS_PORT", "0"))
+READINESS_HOST = os.environ.get("ARTADVISOR_READINESS_HOST", os.environ.get("ARTADVISOR_API_HOST", "127.0.0.1"))
+
+# API-ul HTTP (python -m api): adresa, numărul de conexiuni servite concurent și limitele cererilor
+# (inclusiv numărul maxim de opere dintr-o pagină /galerie)
+API_HOST = os.environ.get("ARTADVISOR_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("ARTADVISOR_API_PORT", "8502"))
+API_WORKERS = int(os.environ.get("ARTADVISOR_API_WORKERS", "8"))
+API_MAX_UPLOAD_MB = int(os.environ.get("ARTADVISOR_API_MAX_UPLOAD_MB", "50"))
+API_KEEPALIVE_S = float(os.environ.get("ARTADVISOR_API_KEEPALIVE_S", "30"))
+API_GALLERY_MAX_PAGE = int(os.environ.get("ARTADVISOR_API_GALLERY_MAX_PAGE", "200"))
+
+# Planificatorul inferenței: clasele interactiv (interfața) și lot (procesări în masă), cu limite de concurență
+# și mărimea bucăților în care se împart loturile mari (granița la care cererile interactive pot prelua modelele)
+SCHEDULER_ENABLED = os.environ.get("ARTADVISOR_SCHEDULER", "1") == "1"
+SCHEDULER_INTERACTIVE_CONCURRENCY = int(os.environ.get("ARTADVISOR_SCHEDULER_INTERACTIVE", "3"))
+SCHEDULER_BATCH_CONCURRENCY = int(os.environ.get("ARTADVISOR_SCHEDULER_BATCH", "1"))
+SCHEDULER_BATCH_CHUNK = int(os.environ.get("ARTADVISOR_SCHEDULER_BATCH_CHUNK", "4"))
+
+# Coada persistentă a analizelor complete (predicții, narațiune, audio, salvare în galerie): starea job-urilor
+# într-o bază SQLite, intrările și rezultatele în același director. Workerii din proces (0 = doar workeri externi,
+# python -m utils.analysis_jobs) preiau job-urile; un job fără progres de ANALYSIS_JOB_STALE_S este repus în coadă.
+ANALYSIS_JOBS_ENABLED = os.environ.get("ARTADVISOR_ANALYSIS_JOBS", "1") == "1"
+ANALYSIS_JOBS_DIR = os.environ.get("ARTADVISOR_ANALYSIS_JOBS_DIR", ".cache/jobs")
+ANALYSIS_JOB_WORKERS = int(os.environ.get("ARTADVISOR_ANALYSIS_JOB_WORKERS", "2"))
+ANALYSIS_JOB_POLL_S = float(os.environ.get("ARTADVISOR_ANALYSIS_JOB_POLL_S", "1.0"))
+ANALYSIS_JOB_STALE_S = float(os.environ.get("ARTADVISOR_ANALYSIS_JOB_STALE_S", "600"))
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.environ.get("ARTADVISOR_ANALYSIS_JOB_MAX_ATTEMPTS", "2"))
+ANALYSIS_JOB_RETENTION_H = float(os.environ.get("ARTADVISOR_ANALYSIS_JOB_RETENTION_H", "24"))
+
+# Artefactele mari ale sesiunilor (imaginile analizate, audio-ul, suprapunerile Grad-CAM): un LRU în memorie
+# limitat în bytes pentru tot procesul; intrările evacuate sunt mutate pe disc (tot limitat) și reîncărcate la cerere
+ARTIFACT_MEMORY_MB = int(os.environ.get("ARTADVISOR_ARTIFACT_MEMORY_MB", "256"))
+ARTIFACT_DISK_DIR = os.environ.get("ARTADVISOR_ARTIFACT_DISK_DIR", ".cache/artifacts")
+ARTIFACT_DISK_MB = int(os.environ.get("ARTADVISOR_ARTIFACT_DISK_MB", "2048"))
+
+# Indexul SQLite al galeriei (în directorul galeriei): listarea, sortarea și filtrarea fără citirea fiecărui JSON
+GALLERY_INDEX_FILENAME = os.environ.get("ARTADVISOR_GALLERY_INDEX_FILENAME", "gallery_index.sqlite3")
+
+# Embedding-urile vizuale (EfficientNet-B2 avgpool + token-ul CLS al ViT, din forward-ul modelului de emoții)
+# și indexul IVF pentru "opere asemănătoare": sub VISUAL_INDEX_MIN_ROWS opere căutarea este exactă;
+# NLIST = numărul de liste (0 = automat, ~4*sqrt(N)), NPROBE = listele vizitate la o căutare
+EMBEDDINGS_ENABLED = os.environ.get("ARTADVISOR_EMBEDDINGS", "1") == "1"
+VISUAL_INDEX_MIN_ROWS = int(os.environ.get("ARTADVISOR_VISUAL_INDEX_MIN_ROWS", "4096"))
+VISUAL_INDEX_NLIST = int(os.environ.get("ARTADVISOR_VISUAL_INDEX_NLIST", "0"))
+VISUAL_INDEX_NPROBE = int(os.environ.get("ARTADVISOR_VISUAL_INDEX_NPROBE", "8"))
+
+# Jurnalul de modificări al galeriei (append-only, în directorul galeriei): fiecare salvare / ștergere adaugă o
+# linie, iar listele din memorie aplică doar liniile noi; la GALLERY_JOURNAL_MAX_MB jurnalul este compactat.
+# GALLERY_WATCHER = 1 pornește un watcher inotify (Linux) pentru fișierele copiate direct în galerie
+GALLERY_JOURNAL_FILENAME = os.environ.get("ARTADVISOR_GALLERY_JOURNAL_FILENAME", "gallery_journal.log")
+GALLERY_JOURNAL_MAX_MB = int(os.environ.get("ARTADVISOR_GALLERY_JOURNAL_MAX_MB", "16"))
+GALLERY_WATCHER_ENABLED = os.environ.get("ARTADVISOR_GALLERY_WATCHER", "0") == "1"
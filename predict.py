@@ -1,124 +1,296 @@
-from predictors.style_predictor import predict_style
-from predictors.author_predictor import predict_author
-from predictors.emotion_predictor import predict_emotion
+from predictors.batching import get_batcher
+from predictors.executors import get_model_executor
+from predictors.thread_budget import apply_process_budget, model_thread_initializer
+from predictors.scheduler import scheduled, PRIORITY_INTERACTIVE, PRIORITY_BATCH
+from config import (
+    MICRO_BATCHING_ENABLED, INFERENCE_BACKEND, PREDICTION_CACHE_ENABLED, PARALLEL_MODELS_ENABLED, USE_INFERENCE_WORKER
+)
+import copy
+import functools
+import io
 import os
+import operator
+import numpy as np
 import streamlit as st
 from PIL import Image
 
-# Optimizare pentru imagini - redimensionare automată
-@st.cache_data(ttl=300)
-def optimize_image_for_analysis(image_path: str, max_size=(1024, 1024)):
+# Bugetul de fire (torch, OpenCV, BLAS, afinitate) se aplică înainte de încărcarea modelelor
+if not USE_INFERENCE_WORKER:
+    apply_process_budget()
+
+# Cu worker de inferență, procesul UI nu încarcă niciun model (și nu importă torch).
+# Backend-ul ONNX rulează doar cu onnxruntime + numpy; torch se importă numai pentru celelalte backend-uri
+if USE_INFERENCE_WORKER:
+    from predictors.worker_client import get_worker_client
+    MODEL_WEIGHT_FILES = []
+elif INFERENCE_BACKEND == "onnx":
+    from predictors.onnx_backend import prepare_image_numpy, predict_onnx_batch, ONNX_MODELS, _model_file
+    MODEL_WEIGHT_FILES = [_model_file(model_key) for model_key in ONNX_MODELS]
+else:
+    from predictors.style_predictor import predict_style_from_tensor, predict_style_batch, MODEL_PATH as STYLE_MODEL_PATH
+    from predictors.author_predictor import predict_author_from_tensor, predict_author_batch, MODEL_PATH as AUTHOR_MODEL_PATH
+    from predictors.emotion_predictor import predict_emotion_from_tensor, predict_emotion_batch, MODEL_PATH as EMOTION_MODEL_PATH
+    from predictors.preprocessing import prepare_image
+    MODEL_WEIGHT_FILES = [STYLE_MODEL_PATH, AUTHOR_MODEL_PATH, EMOTION_MODEL_PATH]
+
+from utils.prediction_cache import get_prediction_cache, image_content_hash, model_version
+from utils.single_flight import get_single_flight
+
+# Pragul peste care o emoție este considerată detectată
+EMOTION_THRESHOLD = 0.65
+
+def load_analysis_image(image_input, max_size=(1024, 1024)):
     """
-    Optimizează imaginea pentru analiză rapidă - redimensionează la o mărime rezonabilă.
+    Decodează imaginea în memorie și o reduce la max_size, fără fișiere temporare.
+    Acceptă o cale, bytes, un obiect file-like (ex. UploadedFile), un array numpy sau o imagine PIL.
     """
-    try:
-        with Image.open(image_path) as img:
-            img = img.convert('RGB')
-            
-            if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                
-                optimized_path = image_path.replace('.', '_optimized.')
-                img.save(optimized_path, 'JPEG', quality=85, optimize=True)
-                return optimized_path
-            
-            return image_path
-    except Exception as e:
-        print(f"Eroare la optimizarea imaginii: {e}")
-        return image_path
+    if isinstance(image_input, Image.Image):
+        image = image_input.convert('RGB')
+    elif isinstance(image_input, np.ndarray):
+        image = Image.fromarray(image_input.astype(np.uint8, copy=False)).convert('RGB')
+    else:
+        if isinstance(image_input, (bytes, bytearray, memoryview)):
+            image_input = io.BytesIO(image_input)
+        elif hasattr(image_input, 'seek'):
+            image_input.seek(0)
+        with Image.open(image_input) as img:
+            image = img.convert('RGB')
+
+    if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
+        # convert() a creat deja o copie, deci thumbnail nu modifică imaginea apelantului
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+    return image
+
+@functools.lru_cache(maxsize=None)
+def _with_images(predict_batch):
+    """Adaptează o funcție de lot la cereri (tensor, imagine RGB), pentru micro-batcher."""
+    return lambda items: predict_batch([t for t, _ in items], [rgb for _, rgb in items])
 
-@st.cache_data(ttl=600, show_spinner=False)
-def get_all_predictions(image_path: str):
+@functools.lru_cache(maxsize=None)
+def _onnx_batch_fn(model_key):
+    """Funcția de lot ONNX a unui model, pentru micro-batcher."""
+    return lambda items: predict_onnx_batch(model_key, [a for a, _ in items], [rgb for _, rgb in items])
+
+@functools.lru_cache(maxsize=None)
+def _batch_functions(model_key, batch_fn, priority):
+    # Aceleași funcții la fiecare apel: get_batcher refuză un batch_fn diferit pentru un nume existent
+    return scheduled(batch_fn, priority), model_thread_initializer(model_key)
+
+def _batcher(model_key, batch_fn, priority, name=None):
+    # Fiecare clasă de prioritate are propriul micro-batcher (și fir), ca loturile să nu blocheze cererile interactive
+    name = name or model_key
+    if priority != PRIORITY_INTERACTIVE:
+        name = f"{name}:{priority}"
+    batch_fn, initializer = _batch_functions(model_key, batch_fn, priority)
+    return get_batcher(name, batch_fn, initializer=initializer)
+
+def _executor_submit(model_key, priority, fn, *args):
+    return get_model_executor(model_key, priority).submit(scheduled(fn, priority), *args)
+
+def submit_style(image_tensor, original_rgb, priority=PRIORITY_INTERACTIVE):
+    """Trimite predicția stilului fără a aștepta rezultatul; returnează un Future."""
+    if MICRO_BATCHING_ENABLED:
+        return _batcher("stil", _with_images(predict_style_batch), priority).submit((image_tensor, original_rgb))
+    return _executor_submit("stil", priority, predict_style_from_tensor, image_tensor, original_rgb)
+
+def submit_author(image_tensor, original_rgb, priority=PRIORITY_INTERACTIVE):
+    """Trimite predicția autorului fără a aștepta rezultatul; returnează un Future."""
+    if MICRO_BATCHING_ENABLED:
+        return _batcher("autor", _with_images(predict_author_batch), priority).submit((image_tensor, original_rgb))
+    return _executor_submit("autor", priority, predict_author_from_tensor, image_tensor, original_rgb)
+
+def submit_emotion(image_tensor, priority=PRIORITY_INTERACTIVE):
+    """Trimite predicția emoțiilor fără a aștepta rezultatul; returnează un Future."""
+    if MICRO_BATCHING_ENABLED:
+        return _batcher("emotie", predict_emotion_batch, priority).submit(image_tensor)
+    return _executor_submit("emotie", priority, predict_emotion_from_tensor, image_tensor)
+
+def submit_onnx(model_key, image_array, original_rgb=None, priority=PRIORITY_INTERACTIVE):
+    """Trimite predicția unui model ONNX Runtime fără a aștepta rezultatul; returnează un Future."""
+    if MICRO_BATCHING_ENABLED:
+        return _batcher(model_key, _onnx_batch_fn(model_key), priority, name=f"onnx_{model_key}").submit((image_array, original_rgb))
+    return _executor_submit(model_key, priority, lambda: predict_onnx_batch(model_key, [image_array], [original_rgb])[0])
+
+def predict_style_tensor(image_tensor, original_rgb):
     """
-    Funcția centrală ULTRA-OPTIMIZATĂ care primește o imagine și returnează toate predicțiile.
-    Cu cache inteligent și optimizare de imagini.
+    Predicția stilului pe tensorul partajat. Cu micro-batching activ, cererile concurente sunt
+    grupate într-un singur forward; harta CAM rămâne un artefact leneș, calculat doar la cerere.
     """
-    if not os.path.exists(image_path):
-        return {"error": f"Fișierul imagine nu a fost găsit: {image_path}"}
+    return submit_style(image_tensor, original_rgb).result()
 
-    optimized_path = optimize_image_for_analysis(image_path)
+def predict_author_tensor(image_tensor, original_rgb):
+    """Predicția autorului pe tensorul partajat (vezi predict_style_tensor)."""
+    return submit_author(image_tensor, original_rgb).result()
+
+def predict_emotion_tensor(image_tensor):
+    """
+    Predicția emoțiilor pe tensorul partajat. Cu micro-batching activ, cererile concurente din
+    sesiuni diferite sunt grupate într-un singur forward al EmotionEnsemble (ramura ViT câștigă cel mai mult).
+    """
+    return submit_emotion(image_tensor).result()
+
+def predict_onnx(model_key, image_array, original_rgb=None):
+    """Predicția unui model pe backend-ul ONNX Runtime, cu micro-batching dacă este activ."""
+    return submit_onnx(model_key, image_array, original_rgb).result()
+
+def run_all_models(image_input, priority=PRIORITY_INTERACTIVE):
+    """
+    Decodează imaginea o singură dată și rulează cele trei modele pe backend-ul configurat.
+    Cu ARTADVISOR_PARALLEL_MODELS=1, cele trei forward-uri rulează concurent, fiecare pe firul său
+    cu bugetul propriu de fire intra-op; altfel rulează unul după altul. priority alege clasa
+    planificatorului (interactiv sau lot).
+    Returnează (style_results, author_results, emotion_results).
+    """
+    if INFERENCE_BACKEND == "onnx":
+        image_array, original_rgb = prepare_image_numpy(image_input)
+        submitters = (
+            lambda: submit_onnx("stil", image_array, original_rgb, priority),
+            lambda: submit_onnx("autor", image_array, original_rgb, priority),
+            lambda: submit_onnx("emotie", image_array, priority=priority)
+        )
+    else:
+        # OPTIMIZARE 3: Imaginea este decodată și normalizată o singură dată,
+        # iar același tensor 1x3x224x224 este folosit de toate cele trei modele
+        image_tensor, original_rgb = prepare_image(image_input)
+        submitters = (
+            lambda: submit_style(image_tensor, original_rgb, priority),
+            lambda: submit_author(image_tensor, original_rgb, priority),
+            lambda: submit_emotion(image_tensor, priority)
+        )
+
+    if PARALLEL_MODELS_ENABLED:
+        futures = [submit() for submit in submitters]
+        return tuple(future.result() for future in futures)
+    return tuple(submit().result() for submit in submitters)
+
+def run_emotion_model(image_input):
+    """Rulează doar modelul de emoții pe backend-ul configurat."""
+    if INFERENCE_BACKEND == "onnx":
+        image_array, _ = prepare_image_numpy(image_input)
+        return predict_onnx("emotie", image_array)
+    image_tensor, _ = prepare_image(image_input)
+    return predict_emotion_tensor(image_tensor)
+
+def merge_predictions(style_results, author_results, emotion_results):
+    """
+    Combină rezultatele celor trei predictori în formatul așteptat de aplicație.
+    Emoțiile sunt filtrate după pragul EMOTION_THRESHOLD.
+    """
+    if 'predictions' in style_results and not style_results.get('error'):
+        style_results['predictions_sorted'] = sorted(
+            style_results['predictions'].items(), 
+            key=operator.itemgetter(1), 
+            reverse=True
+        )
     
-    # OPTIMIZARE 2: Apelăm fiecare predictor cu cache activ
-    # Fiecare predictor își gestionează propriul cache pentru modele
+    if 'predictions' in author_results and not author_results.get('error'):
+        author_results['predictions_sorted'] = sorted(
+            author_results['predictions'].items(), 
+            key=operator.itemgetter(1), 
+            reverse=True
+        )
     
+    if 'predictions_sorted' in emotion_results and not emotion_results.get('error'):
+        all_emotions = emotion_results['predictions_sorted']
+        filtered_emotions = [(emotion, score) for emotion, score in all_emotions if score > EMOTION_THRESHOLD]
+        emotion_results['predictions_sorted'] = filtered_emotions
+    elif 'predictions' in emotion_results and not emotion_results.get('error'):
+        detected_emotions = {k: v for k, v in emotion_results['predictions'].items() if v > EMOTION_THRESHOLD}
+        emotion_results['predictions_sorted'] = sorted(
+            detected_emotions.items(), 
+            key=operator.itemgetter(1), 
+            reverse=True
+        )
+    else:
+        emotion_results['predictions_sorted'] = []
+
+    return {
+        "stil": style_results,
+        "autor": author_results,
+        "emotie": emotion_results
+    }
+
+def _attach_image(predictions, original_rgb):
+    """Reatașează imaginea decodată la hărțile CAM ale unui rezultat deserializat din cache."""
+    for key in ('stil', 'autor'):
+        artifact = predictions.get(key, {}).get('gradcam')
+        if artifact is not None:
+            artifact.attach_image(original_rgb)
+
+def _predict_uncoalesced(image, cache_key, priority):
+    """Cache-ul de predicții, apoi cele trei modele; rulează o singură dată per cheie printre apelurile concurente."""
+    if PREDICTION_CACHE_ENABLED:
+        cache = get_prediction_cache()
+        cached = cache.get(cache_key)
+        if cached is not None:
+            _attach_image(cached, np.array(image))
+            return cached
+
+    style_results, author_results, emotion_results = run_all_models(image, priority)
+    final_predictions = merge_predictions(style_results, author_results, emotion_results)
+
+    if PREDICTION_CACHE_ENABLED and not any(final_predictions[key].get('error') for key in ('stil', 'autor', 'emotie')):
+        cache.put(cache_key, final_predictions)
+
+    return final_predictions
+
+def get_all_predictions(image_input, priority=PRIORITY_INTERACTIVE):
+    """
+    Funcția centrală ULTRA-OPTIMIZATĂ care primește o imagine și returnează toate predicțiile.
+    Imaginea (cale, bytes, array sau PIL Image) este procesată complet în memorie, fără fișiere temporare.
+    priority: PRIORITY_INTERACTIVE (interfața) sau PRIORITY_BATCH (procesări în masă, doar pe capacitatea liberă).
+    Cache-ul este indexat după hash-ul pixelilor decodați și versiunea modelelor, deci aceeași
+    pictură încărcată din nou (alt upload, după restart) nu mai trece prin modele; cererile identice
+    concurente sunt coalescate pe aceeași cheie și așteaptă o singură rulare.
+    """
+    is_path = isinstance(image_input, (str, os.PathLike))
+    if is_path and not os.path.exists(image_input):
+        return {"error": f"Fișierul imagine nu a fost găsit: {image_input}"}
+
     try:
-        style_results = predict_style(optimized_path)
-        author_results = predict_author(optimized_path)
-        emotion_results = predict_emotion(optimized_path)
-        
-        import operator
-        
-        if 'predictions' in style_results and not style_results.get('error'):
-            style_results['predictions_sorted'] = sorted(
-                style_results['predictions'].items(), 
-                key=operator.itemgetter(1), 
-                reverse=True
-            )
-        
-        if 'predictions' in author_results and not author_results.get('error'):
-            author_results['predictions_sorted'] = sorted(
-                author_results['predictions'].items(), 
-                key=operator.itemgetter(1), 
-                reverse=True
-            )
-        
-        if 'predictions_sorted' in emotion_results and not emotion_results.get('error'):
-            all_emotions = emotion_results['predictions_sorted']
-            filtered_emotions = [(emotion, score) for emotion, score in all_emotions if score > 0.65]
-            emotion_results['predictions_sorted'] = filtered_emotions
-        elif 'predictions' in emotion_results and not emotion_results.get('error'):
-            detected_emotions = {k: v for k, v in emotion_results['predictions'].items() if v > 0.65}
-            emotion_results['predictions_sorted'] = sorted(
-                detected_emotions.items(), 
-                key=operator.itemgetter(1), 
-                reverse=True
-            )
-        else:
-            emotion_results['predictions_sorted'] = []
-
-        final_predictions = {
-            "stil": style_results,
-            "autor": author_results,
-            "emotie": emotion_results,
-            "optimized_image": optimized_path
-        }
+        image = load_analysis_image(image_input)
+
+        if USE_INFERENCE_WORKER:
+            # Worker-ul deține modelele și cache-ul de predicții; aici se reatașează doar imaginea
+            original_rgb = np.array(image)
+            final_predictions = get_worker_client().predict_all(original_rgb, priority)
+            if not final_predictions.get("error"):
+                _attach_image(final_predictions, original_rgb)
+                final_predictions["optimized_image"] = os.fspath(image_input) if is_path else None
+            return final_predictions
+
+        original_rgb = np.array(image)
+        content_key = get_prediction_cache().make_key(image_content_hash(original_rgb), model_version(MODEL_WEIGHT_FILES))
+
+        # Analizele identice concurente (aceeași pictură, aceleași modele) rulează o singură dată
+        predictions, shared = get_single_flight("predictii").do(content_key, _predict_uncoalesced, image, content_key, priority)
+        if shared:
+            # Rezultatul aparține altei sesiuni: copia primește propria imagine pentru hărțile CAM
+            predictions = copy.deepcopy(predictions)
+            _attach_image(predictions, original_rgb)
+
+        # Copie de nivel superior: rezultatul partajat rămâne nemodificat pentru celelalte sesiuni
+        final_predictions = dict(predictions)
+        final_predictions["optimized_image"] = os.fspath(image_input) if is_path else None
         
         return final_predictions
         
     except Exception as e:
         return {"error": f"Eroare în analiză: {str(e)}"}
 
-
 # Funcție pentru predicția emoțiilor dintr-o imagine (path sau PIL Image)
 def predict_emotions_from_image(image_input):
     """
-    Primește o imagine (cale sau PIL Image), o optimizează, rulează predicția de emoții și returnează scorurile relevante.
+    Primește o imagine (cale, bytes, array sau PIL Image), rulează predicția de emoții în memorie și returnează scorurile relevante.
     Folosită în laboratorul emoțional și alte componente.
     """
     try:
-        if isinstance(image_input, str):
-            image_path = image_input  
-        else:
-            import tempfile
-            import uuid
-            temp_dir = "temp"
-            os.makedirs(temp_dir, exist_ok=True)
-            temp_filename = f"temp_lab_{uuid.uuid4().hex}.jpg"
-            image_path = os.path.join(temp_dir, temp_filename)
-            image_input.save(image_path, 'JPEG', quality=95)
-       
-        optimized_path = optimize_image_for_analysis(image_path)
-       
-        emotion_results = predict_emotion(optimized_path)
-    
-        if not isinstance(image_input, str):
-            try:
-                if os.path.exists(image_path):
-                    os.remove(image_path)
-                if os.path.exists(optimized_path) and optimized_path != image_path:
-                    os.remove(optimized_path)
-            except:
-                pass  
+        if USE_INFERENCE_WORKER:
+            return get_worker_client().predict_emotions(np.array(load_analysis_image(image_input)))
+
+        emotion_results = run_emotion_model(load_analysis_image(image_input))
+
         # Scorurile emoțiilor sub formă de dicționar 
         if 'predictions_sorted' in emotion_results:
             return dict(emotion_results['predictions_sorted'])
@@ -128,3 +300,86 @@ def predict_emotions_from_image(image_input):
         print(f"Eroare în predicția emoțiilor: {e}")
         return {}
 
+
+def main(argv=None):
+    """Punctul de intrare în linia de comandă: python -m predict bulk <director>."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m predict", description="Instrumente ArtAdvisor fără interfață")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bulk = subparsers.add_parser("bulk", help="Analizează un director întreg și îl importă în galerie")
+    bulk.add_argument("input_dir", help="Directorul cu imagini (parcurs recursiv)")
+    bulk.add_argument("--gallery-dir", default="gallery_uploads", help="Directorul galeriei")
+    bulk.add_argument("--batch-size", type=int, default=16, help="Numărul de imagini per forward")
+    bulk.add_argument("--workers", type=int, default=None, help="Numărul de procese pentru decodare")
+    bulk.add_argument("--checkpoint", default=None, help="Fișierul de checkpoint pentru reluare")
+    bulk.add_argument("--no-gradcam", action="store_true", help="Nu genera hărțile Grad-CAM")
+
+    quantize = subparsers.add_parser("quantize", help="Calibrează backend-ul int8 și raportează diferențele față de fp32")
+    quantize.add_argument("calibration_dir", help="Directorul cu imagini reprezentative pentru calibrare")
+    quantize.add_argument("--models", nargs="+", default=["stil", "autor", "emotie"], choices=["stil", "autor", "emotie"])
+    quantize.add_argument("--max-images", type=int, default=64, help="Numărul maxim de imagini de calibrare")
+    quantize.add_argument("--min-agreement", type=float, default=0.95, help="Acordul top-1 minim pentru a salva artefactul")
+    quantize.add_argument("--min-speedup", type=float, default=1.1, help="Accelerarea minimă față de fp32 pentru a salva artefactul")
+    quantize.add_argument("--no-save", action="store_true", help="Doar raportul, fără artefact pre-cuantizat")
+
+    export = subparsers.add_parser("export-onnx", help="Exportă modelele în ONNX pentru backend-ul ONNX Runtime")
+    export.add_argument("--models", nargs="+", default=["stil", "autor", "emotie"], choices=["stil", "autor", "emotie"])
+    export.add_argument("--output-dir", default=None, help="Directorul pentru fișierele .onnx")
+    export.add_argument("--opset", type=int, default=17, help="Versiunea opset ONNX")
+
+    convert = subparsers.add_parser("convert-weights", help="Scrie ponderile în format .safetensors, pentru încărcarea mapată în memorie")
+    convert.add_argument("--models", nargs="+", default=["stil", "autor", "emotie"], choices=["stil", "autor", "emotie"])
+
+    args = parser.parse_args(argv)
+
+    if args.command == "bulk":
+        from utils.bulk_analysis import run_bulk_analysis
+        stats = run_bulk_analysis(
+            args.input_dir,
+            gallery_dir=args.gallery_dir,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            gradcam=not args.no_gradcam,
+            checkpoint_path=args.checkpoint
+        )
+        return 0 if stats["erori"] == 0 else 1
+
+    if args.command == "quantize":
+        from itertools import islice
+        from utils.bulk_analysis import iter_image_paths
+        from predictors.preprocessing import load_image_for_analysis
+        from predictors.quantization import calibrate_int8
+
+        paths = list(islice(iter_image_paths(args.calibration_dir), args.max_images))
+        if not paths:
+            print(f"Nu există imagini de calibrare în {args.calibration_dir}")
+            return 1
+        image_tensors = [load_image_for_analysis(path)[0] for path in paths]
+
+        for model_key in args.models:
+            report = calibrate_int8(model_key, image_tensors, min_agreement=args.min_agreement, save=not args.no_save,
+                                    min_speedup=args.min_speedup)
+            print(", ".join(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}" for key, value in report.items()))
+        return 0
+
+    if args.command == "export-onnx":
+        from predictors.onnx_backend import export_onnx
+        from config import ONNX_MODEL_DIR
+
+        for model_key in args.models:
+            model_file = export_onnx(model_key, model_dir=args.output_dir or ONNX_MODEL_DIR, opset=args.opset)
+            print(f"Model {model_key} exportat: {model_file}")
+        return 0
+
+    if args.command == "convert-weights":
+        from predictors.quantization import convert_weights
+
+        for model_key in args.models:
+            print(f"Ponderi {model_key} convertite: {convert_weights(model_key)}")
+        return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,12 +1,12 @@
 import torch
 import torch.nn as nn
-from torchvision import models, transforms
-from PIL import Image
+from torchvision import models
 import streamlit as st
 import operator
-from torchcam.methods import GradCAM
-import numpy as np
-import cv2
+from predictors.preprocessing import prepare_image, stack_image_tensors
+from predictors.gradcam import LazyCAM, forward_with_features
+from predictors.quantization import load_model_weights, build_model_skeleton
+from predictors.thread_budget import apply_process_budget
 
 MODEL_PATH = "models/model_autor.pth"
 AUTHOR_LABELS = ["Amedeo_Modigliani", "Anthony_Van_Dyck", "Aubrey_Beardsley", "Childe_Hassam", "Claude_Monet", "Ernst_Ludwig_Kirchner", "Francisco_Goya", "Gustave_Dore", "Gustave_Loiseau", "Ilya_Repin", "Isaac_Levitan", "Ivan_Aivazovsky", "Ivan_Bilibin", "Ivan_Shishkin", "Kuzma_Petrov", "Martiros_Saryan", "Nicholas_Roerich", "Odilon_Redon", "Paul_Cezanne", "Peter_Paul_Rubens", "Pierre_Auguste_Renoir", "Raphael_Kirchner", "Rembrandt", "Rene_Magritte", "Salvador_Dali", "Vincent_Van_Gogh", "Zdislav_Beksinski"]
@@ -19,70 +19,80 @@ def load_author_model():
     Arhitectura este definită direct, pentru a se potrivi perfect cu fișierul .pth salvat.
     """
     print("Încărcare model AUTOR... (rulează o singură dată)")
+    apply_process_budget()
+    model = build_model_skeleton(build_author_model, DEVICE)
+    return load_model_weights(model, MODEL_PATH, DEVICE)
+
+def build_author_model():
+    """Arhitectura modelului de autor (fără ponderi)."""
     model = models.efficientnet_b0(weights=None)
     in_features = model.classifier[1].in_features
     model.classifier = nn.Sequential(
         nn.Dropout(p=0.3),
         nn.Linear(in_features, len(AUTHOR_LABELS))
     )
-    
-    try:
-        model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE, weights_only=True))
-    except TypeError:
-        model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
-    model.to(DEVICE)
-    model.eval()
     return model
 
-def get_prediction_transforms(img_size=224):
-    return transforms.Compose([
-        transforms.Resize((img_size, img_size)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-    ])
-
 def predict_author(image_path: str):
     """
     Predicția autorului cu Grad-CAM îmbunătățit (versiunea colegului integrată).
-    Returnează format compatibil cu aplicația existentă: {"predictions_sorted": [...], "gradcam_image": ...}
+    Returnează {"predictions_sorted": [...], "gradcam": LazyCAM}; harta se obține cu get_gradcam_image().
     """
-    model = load_author_model()
     try:
-        transform = get_prediction_transforms()
-        original_image = Image.open(image_path).convert('RGB')
-        image_tensor = transform(original_image).unsqueeze(0).to(DEVICE)
+        image_tensor, original_rgb = prepare_image(image_path)
+    except Exception as e:
+        print(f"Eroare detaliată în author_predictor: {e}")
+        return {"error": f"Eroare în author_predictor: {e}", "predictions_sorted": []}
+    return predict_author_from_tensor(image_tensor, original_rgb)
 
-        # Generarea Predicției și a Hărții Grad-CAM
-        with GradCAM(model, target_layer=model.features[-1]) as cam_extractor:
-            outputs = model(image_tensor)
+def predict_author_from_tensor(image_tensor, original_rgb):
+    """
+    Predicția pe un tensor deja preprocesat (1x3x224x224), partajat între predictori.
+    Forward-ul rulează sub inference_mode și păstrează harta features[-1]; harta de activare este un
+    artefact leneș ("gradcam"), calculat fără backward doar când este cerut (vezi predictors.gradcam).
+    """
+    model = load_author_model()
+    try:
+        with torch.inference_mode():
+            outputs, feature_map = forward_with_features(model, image_tensor.to(DEVICE))
             probabilities = torch.softmax(outputs, dim=1).cpu().squeeze()
-            predicted_class_idx = probabilities.argmax().item()
-            activation_map = cam_extractor(predicted_class_idx, outputs)
-        
-        results = {author: prob.item() for author, prob in zip(AUTHOR_LABELS, probabilities)}
+
+        predicted_class_idx = probabilities.argmax().item()
+        results = {author: prob for author, prob in zip(AUTHOR_LABELS, probabilities.tolist())}
         predictions_sorted = sorted(results.items(), key=operator.itemgetter(1), reverse=True)
-        
-        # Extragem harta Grad-CAM și o normalizăm
-        cam = activation_map[0].squeeze(0) 
-        cam_min, cam_max = cam.min(), cam.max()
-        cam_normalized = (cam - cam_min) / (cam_max - cam_min + 1e-8)
-        cam_np = cam_normalized.cpu().numpy()
 
-        # Resize direct pe numpy array cu interpolare CUBIC pentru calitate mai bună
-        cam_resized_np = cv2.resize(cam_np, original_image.size, interpolation=cv2.INTER_CUBIC)
+        gradcam = LazyCAM("autor", feature_map[0], predicted_class_idx, original_rgb, image_tensor)
 
-        heatmap_colored = cv2.applyColorMap(np.uint8(255 * cam_resized_np), cv2.COLORMAP_JET)
+        return {"predictions_sorted": predictions_sorted, "gradcam": gradcam}
 
-        orig_np = np.array(original_image.convert("RGB"))
-        if orig_np.shape[2] == 4:
-            orig_np = orig_np[:, :, :3]
+    except Exception as e:
+        print(f"Eroare detaliată în author_predictor: {e}")
+        return {"error": f"Eroare în author_predictor: {e}", "predictions_sorted": []}
 
-        overlay_np = cv2.addWeighted(heatmap_colored, 0.4, orig_np, 0.6, 0)
+def predict_author_batch(image_tensors, original_rgbs=None):
+    """
+    Predicția autorului pentru un lot de tensori preprocesați, într-un singur forward.
+    Returnează câte un rezultat {"predictions_sorted": [...], "gradcam": LazyCAM} pentru fiecare imagine;
+    suprapunerea CAM poate fi randată doar pentru imaginile care au original_rgbs.
+    """
+    model = load_author_model()
+    try:
+        batch = stack_image_tensors(image_tensors).to(DEVICE)
+        original_rgbs = original_rgbs or [None] * batch.shape[0]
 
-        overlay_img = Image.fromarray(overlay_np)
+        with torch.inference_mode():
+            outputs, feature_maps = forward_with_features(model, batch)
+            probabilities = torch.softmax(outputs, dim=1).cpu()
 
-        return {"predictions_sorted": predictions_sorted, "gradcam_image": overlay_img}
+        results = []
+        for i, row in enumerate(probabilities):
+            predicted_class_idx = row.argmax().item()
+            predictions_sorted = sorted(zip(AUTHOR_LABELS, row.tolist()), key=operator.itemgetter(1), reverse=True)
+            # clone(): fiecare rezultat păstrează doar propria hartă, nu întregul lot
+            gradcam = LazyCAM("autor", feature_maps[i].clone(), predicted_class_idx, original_rgbs[i], image_tensors[i])
+            results.append({"predictions_sorted": predictions_sorted, "gradcam": gradcam})
+        return results
 
     except Exception as e:
-        print(f"Eroare detaliată în author_predictor: {e}")
-        return {"error": str(e), "predictions_sorted": []}
\ No newline at end of file
+        print(f"Eroare detaliată în author_predictor (lot): {e}")
+        return [{"error": f"Eroare în author_predictor: {e}", "predictions_sorted": []} for _ in range(len(image_tensors))]
@@ -0,0 +1,128 @@
+"""
+Micro-batching în proces pentru cele trei modele ArtAdvisor.
+Cererile venite din sesiuni Streamlit concurente sunt colectate câteva milisecunde (sau până la N),
+rulate într-un singur forward pe lot, iar fiecare apelant primește propriul rezultat.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from config import MICRO_BATCH_MAX_SIZE, MICRO_BATCH_MAX_WAIT_MS
+
+class MicroBatcher:
+    """
+    Colectează cereri individuale și le execută în loturi printr-o funcție batch_fn(list) -> list.
+    Rezultatele sunt returnate prin Future, în aceeași ordine în care au fost trimise în lot.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=MICRO_BATCH_MAX_SIZE, max_wait_ms=MICRO_BATCH_MAX_WAIT_MS, name="batcher",
+                 initializer=None):
+        self.batch_fn = batch_fn
+        self.initializer = initializer
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._init_error = None
+        self._thread = threading.Thread(target=self._run, name=f"micro-batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        """Trimite o cerere în coadă și returnează un Future cu rezultatul ei."""
+        future = Future()
+        if self._init_error is not None:
+            future.set_exception(self._init_error)
+            return future
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        """Trimite cererea și așteaptă rezultatul (apel blocant)."""
+        return self.submit(item).result(timeout=timeout)
+
+    def stats(self):
+        """Statistici despre loturile rulate."""
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+                "pending": self._queue.qsize(),
+            }
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _fail_forever(self, error):
+        # Firul rămâne activ doar ca să respingă cererile ajunse în coadă înainte ca submit să vadă eroarea
+        while True:
+            _, future = self._queue.get()
+            future.set_exception(error)
+
+    def _run(self):
+        if self.initializer is not None:
+            try:
+                self.initializer()
+            except Exception as e:
+                print(f"Eroare la inițializarea micro-batcher-ului {self.name}: {e}")
+                self._init_error = RuntimeError(f"Micro-batcher-ul {self.name} nu a putut fi inițializat: {e}")
+                self._fail_forever(self._init_error)
+        while True:
+            batch = self._collect_batch()
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+
+            try:
+                results = list(self.batch_fn(items))
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"Micro-batcher-ul {self.name} a primit {len(results)} rezultate pentru {len(items)} cereri"
+                    )
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(items)
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+def get_batcher(name, batch_fn, initializer=None):
+    """
+    Returnează micro-batcher-ul unic din proces pentru un model (creat la primul apel).
+    initializer rulează o singură dată pe firul batcher-ului (ex. bugetul de fire al modelului).
+    Un nume deja înregistrat cu alt batch_fn sau alt initializer ridică ValueError.
+    """
+    with _batchers_lock:
+        if name not in _batchers:
+            _batchers[name] = MicroBatcher(batch_fn, name=name, initializer=initializer)
+        batcher = _batchers[name]
+        if batcher.batch_fn is not batch_fn or batcher.initializer is not initializer:
+            raise ValueError(f"Micro-batcher-ul {name} este deja înregistrat cu altă funcție de lot sau alt initializer")
+        return batcher
+
+def get_batcher_stats():
+    """Statisticile tuturor micro-batcher-elor active."""
+    with _batchers_lock:
+        return {name: batcher.stats() for name, batcher in _batchers.items()}
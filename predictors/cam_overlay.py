@@ -0,0 +1,133 @@
+"""
+Randarea hărților de activare (CAM) peste imaginea originală.
+Modul fără dependență de torch, folosit atât de backend-ul PyTorch, cât și de cel ONNX Runtime.
+"""
+
+import threading
+import weakref
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from utils.artifact_store import get_artifact_store
+
+def normalize_cam(cam):
+    """Normalizare min-max a unei hărți de activare (numpy) în intervalul [0, 1]."""
+    cam_min, cam_max = cam.min(), cam.max()
+    return (cam - cam_min) / (cam_max - cam_min + 1e-8)
+
+def render_cam_overlay(cam, original_rgb):
+    """Normalizează harta de activare, o redimensionează la imaginea originală și o suprapune peste ea."""
+    cam_np = normalize_cam(np.asarray(cam, dtype=np.float32))
+
+    # Resize direct pe numpy array cu interpolare CUBIC pentru calitate mai bună
+    cam_resized_np = cv2.resize(cam_np, (original_rgb.shape[1], original_rgb.shape[0]), interpolation=cv2.INTER_CUBIC)
+
+    heatmap_colored = cv2.applyColorMap(np.uint8(255 * np.clip(cam_resized_np, 0, 1)), cv2.COLORMAP_JET)
+    overlay_np = cv2.addWeighted(heatmap_colored, 0.4, original_rgb, 0.6, 0)
+
+    return Image.fromarray(overlay_np)
+
+def get_gradcam_image(results, class_idx=None):
+    """
+    Returnează imaginea CAM dintr-un rezultat de predictor, calculând-o la cerere.
+    Acceptă atât artefactul leneș ('gradcam'), cât și o imagine deja calculată ('gradcam_image').
+    """
+    if not results:
+        return None
+    if results.get('gradcam_image') is not None and class_idx is None:
+        return results['gradcam_image']
+    artifact = results.get('gradcam')
+    if artifact is None:
+        return None
+    try:
+        return artifact.render(class_idx)
+    except Exception as e:
+        print(f"Eroare la generarea Grad-CAM: {e}")
+        return None
+
+def _discard_refs(refs):
+    get_artifact_store().discard(*refs.values())
+
+class CAMArtifacts:
+    """
+    Partea comună LazyCAM/NumpyCAM: imaginea decodată și suprapunerile randate stau în depozitul de artefacte
+    (limitat în bytes, cu evacuare pe disc), nu în obiect; referințele sunt eliberate odată cu obiectul.
+    """
+
+    def _init_artifacts(self, original_rgb=None):
+        self._refs = {}
+        self._overlays = {}
+        self._lock = threading.Lock()
+        weakref.finalize(self, _discard_refs, self._refs)
+        self.original_rgb = original_rgb
+
+    @property
+    def original_rgb(self):
+        ref = self._refs.get('imagine')
+        return ref.load() if ref is not None else None
+
+    @original_rgb.setter
+    def original_rgb(self, value):
+        previous = self._refs.pop('imagine', None)
+        if value is not None:
+            self._refs['imagine'] = get_artifact_store().put(value, "imagine_cam")
+        get_artifact_store().discard(previous)
+
+    def _cached_overlay(self, class_idx, compute):
+        """Suprapunerea pentru clasa dată: din depozit sau calculată cu compute(original_rgb) (sub lock)."""
+        ref = self._overlays.get(class_idx)
+        overlay = ref.load() if ref is not None else None
+        if overlay is None:
+            original_rgb = self.original_rgb
+            if original_rgb is None:
+                raise ValueError("Imaginea originală lipsește pentru suprapunerea CAM")
+            overlay = compute(original_rgb)
+            ref = get_artifact_store().put(overlay, "suprapunere_cam")
+            self._refs[('suprapunere', class_idx)] = ref
+            self._overlays[class_idx] = ref
+        return overlay
+
+    def attach_image(self, original_rgb):
+        """Atașează imaginea decodată (după deserializare), necesară pentru suprapunere."""
+        self.original_rgb = original_rgb
+
+    def __getstate__(self):
+        # Serializarea (cache, IPC) păstrează doar harta de activare; imaginea se reatașează cu attach_image()
+        state = self.__dict__.copy()
+        for name in ('_lock', '_refs', '_overlays'):
+            state.pop(name, None)
+        if 'image_tensor' in state:
+            state['image_tensor'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_artifacts()
+
+class NumpyCAM(CAMArtifacts):
+    """
+    Echivalentul LazyCAM fără torch: harta features[-1] și ponderile clasificatorului în numpy.
+    Folosit de backend-ul ONNX și pentru rezultatele primite de la worker-ul de inferență.
+    """
+
+    def __init__(self, feature_map, classifier, class_idx, original_rgb=None):
+        self.feature_map = feature_map
+        self.classifier = classifier
+        self.class_idx = class_idx
+        self._init_artifacts(original_rgb)
+
+    def heatmaps(self, class_indices):
+        cams = np.maximum(np.einsum('kc,chw->khw', self.classifier[list(class_indices)], self.feature_map), 0)
+        return {idx: normalize_cam(cam) for idx, cam in zip(class_indices, cams)}
+
+    def render(self, class_idx=None):
+        class_idx = self.class_idx if class_idx is None else class_idx
+
+        def _compute(original_rgb):
+            cam = np.maximum(np.einsum('c,chw->hw', self.classifier[class_idx], self.feature_map), 0)
+            return render_cam_overlay(cam, original_rgb)
+
+        with self._lock:
+            return self._cached_overlay(class_idx, _compute)
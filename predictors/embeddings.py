@@ -0,0 +1,25 @@
+"""
+Embedding-ul vizual al unei imagini, pentru căutarea operelor asemănătoare.
+
+Modelul de emoții concatenează deja, în fiecare forward, ieșirea avgpool a EfficientNet-B2 (1408) și
+token-ul CLS al ViT-B/16 (768); embedding-ul este acest vector, cu fiecare parte normalizată L2 separat
+(ca niciuna să nu domine) și apoi întregul normalizat, deci produsul scalar este similaritatea cosinus.
+Modul fără torch: este folosit atât de backend-ul PyTorch, cât și de cel ONNX Runtime.
+"""
+
+import numpy as np
+
+EFFNET_B2_FEATURES = 1408
+VIT_B16_FEATURES = 768
+EMBEDDING_DIM = EFFNET_B2_FEATURES + VIT_B16_FEATURES
+
+def _l2_normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def visual_embeddings(features, effnet_dim=EFFNET_B2_FEATURES):
+    """Embedding-urile float32 (N x EMBEDDING_DIM) din caracteristicile concatenate ale ansamblului (N x 2176)."""
+    features = np.asarray(features, dtype=np.float32)
+    features = features.reshape(-1, features.shape[-1])
+    combined = np.concatenate([_l2_normalize(features[:, :effnet_dim]), _l2_normalize(features[:, effnet_dim:])], axis=1)
+    return _l2_normalize(combined).astype(np.float32, copy=False)
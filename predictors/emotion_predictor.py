@@ -1,10 +1,14 @@
 import torch
 import torch.nn as nn
-from torchvision import models, transforms
-from PIL import Image
+from torchvision import models
 import torchvision.models.vision_transformer as vit
 import streamlit as st
 import operator # Am adăugat importul pentru sortare
+from predictors.preprocessing import prepare_image, stack_image_tensors
+from predictors.quantization import load_model_weights, build_model_skeleton
+from predictors.thread_budget import apply_process_budget
+from predictors.embeddings import visual_embeddings
+from config import EMBEDDINGS_ENABLED
 
 # --- CONSTANTE ȘI CONFIGURARE ---
 MODEL_PATH = "models/model_licenta_definitiv.pth"
@@ -37,46 +41,56 @@ class EmotionEnsemble(nn.Module):
             nn.Dropout(p=dropout_rate),
             nn.Linear(in_features_effnet + in_features_vit, num_classes)
         )
-    def forward(self, x):
+    def forward_features(self, x):
+        """Caracteristicile concatenate: avgpool EfficientNet-B2 + token-ul CLS al ViT (baza embedding-ului vizual)."""
         eff_features = self.effnet(x)
         vit_features = self.vit(x)
-        combined_features = torch.cat((eff_features, vit_features), dim=1)
+        return torch.cat((eff_features, vit_features), dim=1)
+
+    def forward(self, x):
+        combined_features = self.forward_features(x)
         output = self.classifier(combined_features)
         return output
+
+def forward_with_embeddings(model, image_tensor):
+    """
+    Forward identic cu model(x) care returnează și embedding-urile vizuale (numpy N x D), calculate din
+    caracteristicile deja produse de forward; None dacă embedding-urile sunt dezactivate.
+    """
+    if not EMBEDDINGS_ENABLED:
+        return model(image_tensor), None
+    combined_features = model.forward_features(image_tensor)
+    return model.classifier(combined_features), visual_embeddings(combined_features.float().cpu().numpy())
         
 # --- FUNCȚIA DE ÎNCĂRCARE A MODELULUI CU CACHING ---
 @st.cache_resource
 def load_emotion_model():
     print("Încărcare model EMOȚIE... (rulează o singură dată)")
-    model = EmotionEnsemble(num_classes=len(EMOTIONS_KEYS))
-    
-    try:
-        model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE, weights_only=True))
-    except TypeError:
-        model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
+    apply_process_budget()
+    model = build_model_skeleton(build_emotion_model, DEVICE)
+    return load_model_weights(model, MODEL_PATH, DEVICE)
 
-    model.to(DEVICE)
-    model.eval()
-    return model
+def build_emotion_model():
+    return EmotionEnsemble(num_classes=len(EMOTIONS_KEYS))
 
 # --- DEFINIȚIA TRANSFORMĂRILOR ---
-def get_prediction_transforms(img_size=224):
-    return transforms.Compose([
-        transforms.Resize((img_size, img_size)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-    ])
-
 # --- FUNCȚIA PRINCIPALĂ DE PREDICTIE ---
 def predict_emotion(image_path: str):
+    try:
+        image_tensor, _ = prepare_image(image_path)
+    except Exception as e:
+        print(f"Eroare detaliată în emotion_predictor: {e}")
+        return {"error": f"Eroare în emotion_predictor: {e}", "predictions_sorted": []}
+    return predict_emotion_from_tensor(image_tensor)
+
+# --- PREDICȚIE PE TENSOR PREPROCESAT (partajat între predictori) ---
+def predict_emotion_from_tensor(image_tensor):
     model = load_emotion_model()
     try:
-        transform = get_prediction_transforms()
-        image = Image.open(image_path).convert('RGB')
-        image_tensor = transform(image).unsqueeze(0).to(DEVICE)
+        image_tensor = image_tensor.to(DEVICE)
 
-        with torch.no_grad():
-            outputs = model(image_tensor)
+        with torch.inference_mode():
+            outputs, embeddings = forward_with_embeddings(model, image_tensor)
             # Acest model este multi-label -- sigmoid
             probabilities = torch.sigmoid(outputs).cpu().squeeze()
         
@@ -86,8 +100,35 @@ def predict_emotion(image_path: str):
         # Sortăm și formatăm rezultatul pentru app.py
         predictions_sorted = sorted(results.items(), key=operator.itemgetter(1), reverse=True)
         
-        return {"predictions_sorted": predictions_sorted}
+        result = {"predictions_sorted": predictions_sorted}
+        if embeddings is not None:
+            result["embedding"] = embeddings[0]
+        return result
 
     except Exception as e:
         print(f"Eroare detaliată în emotion_predictor: {e}")
-        return {"error": f"Eroare în emotion_predictor: {e}", "predictions_sorted": []}
\ No newline at end of file
+        return {"error": f"Eroare în emotion_predictor: {e}", "predictions_sorted": []}
+
+# --- PREDICȚIE PE LOT (un singur forward pentru mai multe imagini) ---
+def predict_emotion_batch(image_tensors):
+    model = load_emotion_model()
+    try:
+        batch = stack_image_tensors(image_tensors).to(DEVICE)
+
+        with torch.inference_mode():
+            outputs, embeddings = forward_with_embeddings(model, batch)
+            probabilities = torch.sigmoid(outputs).cpu()
+
+        results = []
+        for index, row in enumerate(probabilities):
+            scores = {EMOTIONS_MAP[EMOTIONS_KEYS[i]]: prob for i, prob in enumerate(row.tolist())}
+            result = {"predictions_sorted": sorted(scores.items(), key=operator.itemgetter(1), reverse=True)}
+            if embeddings is not None:
+                # copy(): fiecare rezultat păstrează doar propriul vector, nu întregul lot
+                result["embedding"] = embeddings[index].copy()
+            results.append(result)
+        return results
+
+    except Exception as e:
+        print(f"Eroare detaliată în emotion_predictor (lot): {e}")
+        return [{"error": f"Eroare în emotion_predictor: {e}", "predictions_sorted": []} for _ in range(len(image_tensors))]
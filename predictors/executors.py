@@ -0,0 +1,31 @@
+"""
+Execuția concurentă a celor trei modele.
+
+Fiecare model rulează pe propriul fir dedicat (executor cu un singur worker), cu un buget propriu de fire
+intra-op din bugetul central (vezi predictors.thread_budget), astfel încât cele trei forward-uri pot rula
+simultan fără să suprasolicite nucleele. PyTorch eliberează GIL-ul în timpul operațiilor, iar cu backend-ul
+OpenMP numărul de fire setat cu torch.set_num_threads() se aplică firului care îl setează.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from predictors.thread_budget import model_thread_initializer
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+def get_model_executor(model_key, lane=None):
+    """
+    Executorul (un singur fir, cu bugetul modelului) pe care rulează forward-urile unui model.
+    lane separă clasele de prioritate, ca un lot în așteptare să nu blocheze firul cererilor interactive.
+    """
+    name = f"{model_key}:{lane}" if lane else model_key
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix=f"model-{name.replace(':', '-')}",
+                initializer=model_thread_initializer(model_key)
+            )
+        return _executors[name]
@@ -0,0 +1,144 @@
+"""
+Hărți de activare (CAM) la cerere pentru modelele de stil și autor.
+
+Ambele modele sunt EfficientNet-B0 cu global average pooling urmat de un singur strat Linear, deci
+harta de activare se calculează exact din ieșirea features[-1] și ponderile clasificatorului, fără
+gradienți: CAM_c = sum_k w_ck * A_k. Harta features[-1] este păstrată din forward-ul normal de predicție,
+astfel că hărțile pentru oricare dintre clasele top-k costă o singură sumă ponderată.
+Implementarea Grad-CAM prin torchcam rămâne disponibilă ca referință pentru modul de validare.
+"""
+
+import importlib
+
+import torch
+
+from config import CAM_VALIDATION
+from predictors.preprocessing import stack_image_tensors
+from predictors.cam_overlay import normalize_cam, render_cam_overlay, get_gradcam_image, NumpyCAM, CAMArtifacts
+
+# Cheia rezultatului -> (modulul predictorului, funcția de încărcare a modelului)
+_MODEL_LOADERS = {
+    "stil": ("predictors.style_predictor", "load_style_model"),
+    "autor": ("predictors.author_predictor", "load_author_model"),
+}
+
+def _load_model(model_key):
+    module_name, loader_name = _MODEL_LOADERS[model_key]
+    return getattr(importlib.import_module(module_name), loader_name)()
+
+def forward_with_features(model, image_tensor):
+    """
+    Forward EfficientNet identic cu model(x), care returnează și harta de activare features[-1].
+    Returnează (logits NxK, feature_map NxCxHxW).
+    """
+    feature_map = model.features(image_tensor)
+    pooled = torch.flatten(model.avgpool(feature_map), 1)
+    return model.classifier(pooled), feature_map
+
+def classifier_weight(model):
+    """Ponderile stratului Linear final (K x C), decuantizate dacă backend-ul int8 este activ."""
+    weight = model.classifier[-1].weight
+    if callable(weight):
+        weight = weight().dequantize()
+    return weight
+
+def class_activation_maps(feature_map, weight, class_indices):
+    """
+    Calculează hărțile CAM pentru mai multe clase într-o singură sumă ponderată.
+    feature_map: CxHxW, weight: KxC. Returnează un tensor len(class_indices) x H x W, cu ReLU aplicat.
+    """
+    selected = weight[list(class_indices)].to(feature_map.device, feature_map.dtype)
+    cams = torch.einsum('kc,chw->khw', selected, feature_map)
+    return torch.relu(cams)
+
+def compute_gradcam_map(model, image_tensor, class_idx):
+    """Harta Grad-CAM de referință (torchcam: forward + backward), folosită doar pentru validare."""
+    from torchcam.methods import GradCAM
+
+    device = next(model.parameters()).device
+    # Gradientul pornește din imagine: backward-ul funcționează și cu ponderi fără requires_grad
+    image_tensor = image_tensor.detach().to(device).requires_grad_(True)
+    try:
+        with torch.enable_grad(), GradCAM(model, target_layer=model.features[-1]) as cam_extractor:
+            outputs = model(image_tensor)
+            activation_map = cam_extractor(class_idx, outputs)
+    finally:
+        # Modelul este partajat: gradienții ponderilor nu sunt păstrați după validare
+        model.zero_grad(set_to_none=True)
+    return activation_map[0].squeeze(0).detach()
+
+def validate_cam(model_key, image_tensor, class_indices=None, top_k=3):
+    """
+    Modul de validare: compară hărțile CAM fără backward cu ieșirea GradCAM (torchcam).
+    Returnează, pentru fiecare clasă, diferența absolută maximă dintre hărțile normalizate.
+    Pentru GAP + Linear cele două sunt egale matematic, deci diferențele trebuie să fie ~0.
+    """
+    model = _load_model(model_key)
+    device = next(model.parameters()).device
+    image_tensor = stack_image_tensors(image_tensor)
+
+    with torch.inference_mode():
+        logits, feature_map = forward_with_features(model, image_tensor.to(device))
+        if class_indices is None:
+            class_indices = logits[0].topk(top_k).indices.tolist()
+        cams = class_activation_maps(feature_map[0], classifier_weight(model), class_indices)
+
+    report = {}
+    for class_idx, cam in zip(class_indices, cams):
+        reference = compute_gradcam_map(model, image_tensor, class_idx)
+        cam_normalized = normalize_cam(cam.cpu().numpy())
+        reference_normalized = normalize_cam(reference.cpu().numpy())
+        report[class_idx] = float(abs(cam_normalized - reference_normalized).max())
+    return report
+
+class LazyCAM(CAMArtifacts):
+    """
+    Harta de activare a unei predicții, calculată la primul render() și păstrată apoi în cache.
+    Ține doar harta features[-1] din forward-ul de predicție și imaginea decodată, nu modelul.
+    """
+
+    def __init__(self, model_key, feature_map, class_idx, original_rgb=None, image_tensor=None):
+        self.model_key = model_key
+        self.feature_map = feature_map
+        self.class_idx = class_idx
+        self.image_tensor = image_tensor
+        self._init_artifacts(original_rgb)
+
+    def heatmaps(self, class_indices):
+        """Hărțile CAM normalizate (numpy HxW) pentru mai multe clase, dintr-o singură sumă ponderată."""
+        model = _load_model(self.model_key)
+        with torch.inference_mode():
+            cams = class_activation_maps(self.feature_map, classifier_weight(model), class_indices)
+            return {idx: normalize_cam(cam.cpu().numpy()) for idx, cam in zip(class_indices, cams)}
+
+    def render(self, class_idx=None):
+        """Returnează suprapunerea CAM pentru clasa cerută (implicit cea prezisă), calculată o singură dată."""
+        class_idx = self.class_idx if class_idx is None else class_idx
+
+        def _compute(original_rgb):
+            model = _load_model(self.model_key)
+            with torch.inference_mode():
+                cam = class_activation_maps(self.feature_map, classifier_weight(model), [class_idx])[0]
+                overlay = render_cam_overlay(cam.cpu().numpy(), original_rgb)
+
+            if CAM_VALIDATION and self.image_tensor is not None:
+                report = validate_cam(self.model_key, self.image_tensor, [class_idx])
+                print(f"Validare CAM ({self.model_key}): diferență maximă față de GradCAM {report[class_idx]:.2e}")
+            return overlay
+
+        with self._lock:
+            return self._cached_overlay(class_idx, _compute)
+
+    @property
+    def is_ready(self):
+        return self.class_idx in self._overlays
+
+    def to_numpy(self):
+        """Echivalentul fără torch (NumpyCAM), pentru procesele care nu încarcă modelele (ex. clienții worker-ului)."""
+        weight = classifier_weight(_load_model(self.model_key))
+        return NumpyCAM(
+            self.feature_map.detach().float().cpu().numpy(),
+            weight.detach().float().cpu().numpy(),
+            self.class_idx,
+            self.original_rgb
+        )
@@ -0,0 +1,169 @@
+"""
+Backend ONNX Runtime pentru cele trei clasificatoare.
+
+export_onnx() exportă modelele construite de load_*_model în ONNX, cu axa de lot dinamică. Pentru stil și
+autor se exportă și harta features[-1], iar ponderile clasificatorului sunt salvate separat, astfel încât
+hărțile CAM se calculează tot fără torch; pentru emoții se exportă și caracteristicile concatenate, din care
+se obține embedding-ul vizual (predictors.embeddings). Execuția (ARTADVISOR_INFERENCE_BACKEND=onnx) folosește doar
+onnxruntime, numpy și PIL: procesele de servire nu mai importă torch.
+"""
+
+import json
+import os
+
+import numpy as np
+import streamlit as st
+
+from config import ONNX_MODEL_DIR, ONNX_INTRA_OP_THREADS, ONNX_INTER_OP_THREADS, EMBEDDINGS_ENABLED
+from predictors.cam_overlay import NumpyCAM
+from predictors.embeddings import visual_embeddings
+from predictors.thread_budget import model_thread_budget
+from predictors.preprocessing import IMG_SIZE, load_array_for_analysis
+
+ONNX_MODELS = ("stil", "autor", "emotie")
+
+def _model_file(model_key, model_dir=ONNX_MODEL_DIR):
+    return os.path.join(model_dir, f"{model_key}.onnx")
+
+def _metadata_file(model_key, model_dir=ONNX_MODEL_DIR):
+    return os.path.join(model_dir, f"{model_key}.json")
+
+def _classifier_file(model_key, model_dir=ONNX_MODEL_DIR):
+    return os.path.join(model_dir, f"{model_key}_classifier.npy")
+
+# --- EXPORT (necesită torch) ---
+def export_onnx(model_key, model_dir=ONNX_MODEL_DIR, opset=17):
+    """
+    Exportă un model în ONNX cu axa de lot dinamică și scrie metadatele necesare execuției fără torch.
+    Returnează calea fișierului .onnx.
+    """
+    import torch
+    import torch.nn as nn
+    from predictors.quantization import build_pretrained_model
+    from predictors.gradcam import forward_with_features, classifier_weight
+
+    os.makedirs(model_dir, exist_ok=True)
+    model = build_pretrained_model(model_key, quantized=False)
+
+    if model_key == "emotie":
+        from predictors.emotion_predictor import EMOTIONS_MAP, EMOTIONS_KEYS
+        labels = [EMOTIONS_MAP[key] for key in EMOTIONS_KEYS]
+
+        class _WithEmbeddingFeatures(nn.Module):
+            def __init__(self, inner):
+                super().__init__()
+                self.inner = inner
+
+            def forward(self, x):
+                combined_features = self.inner.forward_features(x)
+                return self.inner.classifier(combined_features), combined_features
+
+        export_model, output_names, activation = _WithEmbeddingFeatures(model).eval(), ["logits", "features"], "sigmoid"
+    else:
+        if model_key == "stil":
+            from predictors.style_predictor import STYLE_LABELS as labels
+        else:
+            from predictors.author_predictor import AUTHOR_LABELS as labels
+
+        class _WithFeatures(nn.Module):
+            def __init__(self, inner):
+                super().__init__()
+                self.inner = inner
+
+            def forward(self, x):
+                return forward_with_features(self.inner, x)
+
+        export_model, output_names, activation = _WithFeatures(model).eval(), ["logits", "features"], "softmax"
+        np.save(_classifier_file(model_key, model_dir), classifier_weight(model).detach().cpu().numpy().astype(np.float32))
+
+    dummy = torch.zeros(1, 3, IMG_SIZE, IMG_SIZE)
+    dynamic_axes = {name: {0: "batch"} for name in ["input"] + output_names}
+    model_file = _model_file(model_key, model_dir)
+    torch.onnx.export(
+        export_model, dummy, model_file,
+        input_names=["input"], output_names=output_names,
+        dynamic_axes=dynamic_axes, opset_version=opset
+    )
+
+    with open(_metadata_file(model_key, model_dir), 'w', encoding='utf-8') as f:
+        json.dump({
+            "labels": list(labels), "activation": activation,
+            "cam": model_key != "emotie", "embedding": model_key == "emotie"
+        }, f, ensure_ascii=False, indent=2)
+
+    return model_file
+
+def onnx_models_available(model_dir=ONNX_MODEL_DIR):
+    """Verifică dacă toate modelele au fost exportate."""
+    return all(os.path.exists(_model_file(key, model_dir)) and os.path.exists(_metadata_file(key, model_dir))
+               for key in ONNX_MODELS)
+
+# --- EXECUȚIE (doar onnxruntime + numpy) ---
+@st.cache_resource
+def load_onnx_model(model_key):
+    """Încarcă sesiunea ONNX Runtime (CPU, optimizări de graf complete) și metadatele unui model."""
+    import onnxruntime as ort
+
+    print(f"Încărcare model ONNX {model_key.upper()}... (rulează o singură dată)")
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    # Fără o valoare explicită, fiecare sesiune primește bugetul de fire al modelului (vezi predictors.thread_budget)
+    options.intra_op_num_threads = ONNX_INTRA_OP_THREADS or model_thread_budget(model_key)
+    options.inter_op_num_threads = ONNX_INTER_OP_THREADS
+
+    session = ort.InferenceSession(_model_file(model_key), sess_options=options, providers=["CPUExecutionProvider"])
+
+    with open(_metadata_file(model_key), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+
+    classifier = np.load(_classifier_file(model_key)) if metadata.get("cam") else None
+    return session, metadata, classifier
+
+def prepare_image_numpy(image_input, max_size=(1024, 1024)):
+    """
+    Preprocesarea comună (predictors.preprocessing), fără torch: decodare o singură dată, reducere la max_size,
+    redimensionare biliniară cu antialiasing și normalizare ImageNet, identice cu calea PyTorch.
+    Returnează (array 1x3x224x224 float32, original_rgb HxWx3 uint8).
+    """
+    return load_array_for_analysis(image_input, max_size)
+
+def _softmax(logits):
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+def _sigmoid(logits):
+    return 1.0 / (1.0 + np.exp(-logits))
+
+def predict_onnx_batch(model_key, image_arrays, original_rgbs=None):
+    """
+    Rulează un model ONNX pe un lot (listă de array-uri 1x3x224x224 sau un array Nx3x224x224).
+    Returnează câte un rezultat {"predictions_sorted": [...], "gradcam": NumpyCAM} per imagine,
+    în același format ca predictorii PyTorch.
+    """
+    session, metadata, classifier = load_onnx_model(model_key)
+    batch = image_arrays if isinstance(image_arrays, np.ndarray) else np.concatenate(image_arrays, axis=0)
+    original_rgbs = original_rgbs or [None] * batch.shape[0]
+
+    try:
+        outputs = session.run(None, {"input": batch.astype(np.float32, copy=False)})
+        logits = outputs[0]
+        probabilities = _sigmoid(logits) if metadata["activation"] == "sigmoid" else _softmax(logits)
+        # Exporturile mai vechi ale modelului de emoții nu au ieșirea "features"
+        embeddings = visual_embeddings(outputs[1]) if EMBEDDINGS_ENABLED and metadata.get("embedding") else None
+
+        results = []
+        for i, row in enumerate(probabilities):
+            order = np.argsort(-row)
+            result = {"predictions_sorted": [(metadata["labels"][j], float(row[j])) for j in order]}
+            if classifier is not None:
+                result["gradcam"] = NumpyCAM(outputs[1][i].copy(), classifier, int(order[0]), original_rgbs[i])
+            if embeddings is not None:
+                result["embedding"] = embeddings[i].copy()
+            results.append(result)
+        return results
+
+    except Exception as e:
+        print(f"Eroare detaliată în backend-ul ONNX ({model_key}): {e}")
+        return [{"error": f"Eroare în backend-ul ONNX: {e}", "predictions_sorted": []} for _ in range(batch.shape[0])]
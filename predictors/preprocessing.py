@@ -0,0 +1,134 @@
+"""
+Preprocesare comună pentru predictorii ArtAdvisor.
+Imaginea este decodată o singură dată într-un tensor uint8, apoi redimensionată și normalizată
+cu operații vectorizate pe tensori. Același tensor 1x3x224x224 este dat tuturor modelelor.
+
+Backend-ul ONNX (fără torch) folosește aceeași preprocesare prin preprocess_array: redimensionarea biliniară
+cu antialiasing a lui F.interpolate este reprodusă în numpy, cu aceleași ponderi, deci ambele backend-uri
+primesc aceleași intrări. torch este importat doar de funcțiile care lucrează cu tensori.
+"""
+
+import functools
+
+import numpy as np
+from PIL import Image
+
+IMG_SIZE = 224
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+def decode_image(image_input) -> "torch.Tensor":
+    """
+    Decodează imaginea o singură dată într-un tensor uint8 de forma 3xHxW (RGB).
+    Acceptă o cale către fișier, o imagine PIL sau un tensor deja decodat.
+    """
+    import torch
+
+    if isinstance(image_input, torch.Tensor):
+        return image_input
+
+    if isinstance(image_input, Image.Image):
+        image = image_input.convert('RGB')
+    else:
+        with Image.open(image_input) as img:
+            image = img.convert('RGB')
+
+    return torch.from_numpy(np.array(image)).permute(2, 0, 1)
+
+def preprocess_tensor(image_uint8: "torch.Tensor", img_size=IMG_SIZE) -> "torch.Tensor":
+    """
+    Redimensionează și normalizează un tensor uint8 3xHxW într-un tensor float 1x3xSxS.
+    Echivalentul vectorizat al Resize -> ToTensor -> Normalize.
+    """
+    import torch
+    import torch.nn.functional as F
+
+    x = image_uint8.unsqueeze(0).float()
+    x = F.interpolate(x, size=(img_size, img_size), mode='bilinear', align_corners=False, antialias=True)
+    x = x.div_(255.0)
+    return x.sub_(torch.from_numpy(IMAGENET_MEAN).view(1, 3, 1, 1)).div_(torch.from_numpy(IMAGENET_STD).view(1, 3, 1, 1))
+
+@functools.lru_cache(maxsize=64)
+def _resize_weights(in_size, out_size):
+    """
+    Matricea out_size x in_size a redimensionării biliniare cu antialiasing, calculată ca în
+    F.interpolate(mode='bilinear', align_corners=False, antialias=True): filtru triunghiular lărgit cu factorul
+    de reducere, ponderi normalizate pe fiecare rând.
+    """
+    scale = in_size / out_size
+    support = scale if scale >= 1.0 else 1.0
+    invscale = 1.0 / scale if scale >= 1.0 else 1.0
+    weights = np.zeros((out_size, in_size), dtype=np.float64)
+    for i in range(out_size):
+        center = scale * (i + 0.5)
+        # int() trunchiază spre zero, ca în implementarea torch
+        xmin = max(int(center - support + 0.5), 0)
+        xmax = min(int(center + support + 0.5), in_size)
+        taps = np.maximum(0.0, 1.0 - np.abs((np.arange(xmin, xmax) - center + 0.5) * invscale))
+        total = taps.sum()
+        weights[i, xmin:xmax] = taps / total if total else taps
+    return weights.astype(np.float32)
+
+def preprocess_array(original_rgb: np.ndarray, img_size=IMG_SIZE) -> np.ndarray:
+    """
+    Echivalentul numpy al preprocess_tensor: array uint8 HxWx3 -> array float32 1x3xSxS contiguu.
+    """
+    height, width = original_rgb.shape[:2]
+    x = np.asarray(original_rgb, dtype=np.float32)
+    # Redimensionare separabilă: întâi pe lățime, apoi pe înălțime
+    x = np.tensordot(x, _resize_weights(width, img_size), axes=([1], [1]))        # H x 3 x S
+    x = np.tensordot(_resize_weights(height, img_size), x, axes=([1], [0]))       # S x 3 x S
+    x = (x.transpose(1, 0, 2) / 255.0 - IMAGENET_MEAN[:, None, None]) / IMAGENET_STD[:, None, None]
+    return np.ascontiguousarray(x[None], dtype=np.float32)
+
+def tensor_to_rgb_array(image_uint8: "torch.Tensor") -> np.ndarray:
+    """Convertește tensorul uint8 3xHxW într-un array numpy HxWx3 pentru suprapunerea Grad-CAM."""
+    return image_uint8.permute(1, 2, 0).contiguous().numpy()
+
+def prepare_image(image_input):
+    """
+    Decodează și preprocesează imaginea o singură dată.
+    Returnează (image_tensor 1x3x224x224, original_rgb HxWx3 uint8).
+    """
+    image_uint8 = decode_image(image_input)
+    return preprocess_tensor(image_uint8), tensor_to_rgb_array(image_uint8)
+
+def load_analysis_rgb(image_input, max_size=(1024, 1024)) -> Image.Image:
+    """
+    Decodează imaginea în RGB și o reduce la max_size (LANCZOS), în memorie, fără a scrie pe disc.
+    """
+    if isinstance(image_input, Image.Image):
+        image = image_input.convert('RGB')
+    else:
+        with Image.open(image_input) as img:
+            image = img.convert('RGB')
+
+    if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+    return image
+
+def load_image_for_analysis(image_input, max_size=(1024, 1024)):
+    """
+    Decodează imaginea, o reduce la max_size și o preprocesează.
+    Returnează (image_tensor 1x3x224x224, original_rgb HxWx3 uint8).
+    """
+    return prepare_image(load_analysis_rgb(image_input, max_size))
+
+def load_array_for_analysis(image_input, max_size=(1024, 1024)):
+    """
+    Varianta fără torch a load_image_for_analysis, pentru backend-ul ONNX.
+    Returnează (array 1x3x224x224 float32, original_rgb HxWx3 uint8).
+    """
+    original_rgb = np.array(load_analysis_rgb(image_input, max_size))
+    return preprocess_array(original_rgb), original_rgb
+
+def stack_image_tensors(image_tensors) -> "torch.Tensor":
+    """
+    Combină o listă de tensori preprocesați (1x3xSxS sau 3xSxS) într-un lot Nx3xSxS.
+    Un tensor deja stivuit (Nx3xSxS) este returnat neschimbat.
+    """
+    import torch
+
+    if isinstance(image_tensors, torch.Tensor):
+        return image_tensors if image_tensors.dim() == 4 else image_tensors.unsqueeze(0)
+    return torch.cat([t if t.dim() == 4 else t.unsqueeze(0) for t in image_tensors], dim=0)
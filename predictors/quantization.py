@@ -0,0 +1,232 @@
+"""
+Încărcarea ponderilor și backend-ul de inferență int8 pentru nodurile fără GPU.
+
+Pe CPU, ponderile fp32 sunt mapate în memorie (ARTADVISOR_WEIGHTS_MMAP=1, implicit): din <model>.safetensors
+dacă există (produs cu python -m predict convert-weights), altfel cu torch.load(mmap=True). Modelul este
+construit pe device-ul "meta" și primește direct tensorii mapați (load_state_dict(assign=True)), deci paginile
+vin din page cache-ul partajat de sistem: fiecare proces în plus care încarcă aceleași fișiere nu mai
+adaugă o copie privată a ponderilor, iar pornirea nu mai citește fișierele integral.
+
+Backend-ul int8 este selectat prin ARTADVISOR_INFERENCE_BACKEND=int8 (vezi config.INFERENCE_BACKEND). La încărcare,
+straturile nn.Linear sunt cuantizate dinamic în int8. quantize_dynamic potrivește tipul exact, deci în encoder-ul
+ViT-B/16 al EmotionEnsemble sunt convertite doar MLP-urile: proiecțiile atenției rămân fp32 (in_proj_weight este
+un parametru simplu, iar out_proj este NonDynamicallyQuantizableLinear, citit direct de forward-ul atenției).
+La modelele EfficientNet de stil și autor se convertește doar clasificatorul final, deci int8 nu le accelerează
+practic; compare_backends raportează per model ce fracțiune din ponderi a fost convertită, iar calibrate_int8
+nu salvează artefactul fără o accelerare măsurată. Dacă există un artefact pre-cuantizat (<model>.int8.pth,
+produs de calibrate_int8), acesta este încărcat direct, fără ponderile fp32. Ponderile cuantizate sunt
+reîmpachetate, deci ocupă memorie privată în fiecare proces.
+"""
+
+import importlib
+import io
+import os
+import time
+
+import torch
+import torch.nn as nn
+
+from config import INFERENCE_BACKEND, WEIGHTS_MMAP
+
+# Cheia modelului -> (modulul predictorului, funcția care construiește arhitectura)
+_MODEL_BUILDERS = {
+    "stil": ("predictors.style_predictor", "build_style_model"),
+    "autor": ("predictors.author_predictor", "build_author_model"),
+    "emotie": ("predictors.emotion_predictor", "build_emotion_model"),
+}
+
+def quantized_artifact_path(model_path):
+    """Calea artefactului pre-cuantizat corespunzător unui fișier de ponderi fp32."""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.int8{ext}"
+
+def is_quantized_backend(device):
+    """Cuantizarea dinamică rulează doar pe CPU."""
+    return INFERENCE_BACKEND == "int8" and device.type == "cpu"
+
+def quantize_dynamic_int8(model):
+    """Cuantizează dinamic (int8) straturile de tip exact nn.Linear (nu și proiecțiile MultiheadAttention)."""
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+def quantization_coverage(fp32_model, int8_model):
+    """
+    Ce a convertit cuantizarea dinamică: numărul straturilor int8, fracțiunea din ponderile modelului fp32
+    aflată în aceste straturi și numărul blocurilor de atenție rămase fp32.
+    """
+    fp32_modules = dict(fp32_model.named_modules())
+    converted = [
+        name for name, module in int8_model.named_modules()
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear)
+    ]
+    total = sum(parameter.numel() for parameter in fp32_model.parameters())
+    int8_params = sum(fp32_modules[name].weight.numel() for name in converted if name in fp32_modules)
+    attention = sum(isinstance(module, nn.MultiheadAttention) for module in fp32_modules.values())
+    return {
+        "straturi_int8": len(converted),
+        "fractie_ponderi_int8": int8_params / total if total else 0.0,
+        "atentie_fp32": attention,
+    }
+
+def safetensors_path(model_path):
+    """Calea fișierului .safetensors corespunzător unui fișier de ponderi .pth."""
+    root, _ = os.path.splitext(model_path)
+    return f"{root}.safetensors"
+
+def uses_mmap(device):
+    """Maparea în memorie are sens doar pentru ponderi fp32 pe CPU."""
+    return WEIGHTS_MMAP and device.type == "cpu" and not is_quantized_backend(device)
+
+def _torch_load(path, device, mmap=False):
+    if mmap:
+        try:
+            return torch.load(path, map_location=device, weights_only=True, mmap=True)
+        except (TypeError, RuntimeError) as e:
+            # Versiune torch fără mmap sau fișier salvat în formatul vechi (ne-zip)
+            print(f"Maparea în memorie nu este disponibilă pentru {path}: {e}")
+    try:
+        return torch.load(path, map_location=device, weights_only=True)
+    except TypeError:
+        return torch.load(path, map_location=device)
+
+def load_state_dict_file(model_path, device, mmap=False):
+    """
+    Citește ponderile unui model. Cu mmap, preferă fișierul .safetensors (mapat de safetensors),
+    apoi torch.load(mmap=True); tensorii rezultați sunt vederi peste fișierul mapat, nu copii.
+    """
+    if mmap:
+        st_path = safetensors_path(model_path)
+        if os.path.exists(st_path):
+            try:
+                from safetensors.torch import load_file
+                return load_file(st_path, device="cpu")
+            except ImportError:
+                print("Pachetul safetensors nu este instalat; se folosește torch.load(mmap=True)")
+    return _torch_load(model_path, device, mmap=mmap)
+
+def build_model_skeleton(builder, device):
+    """
+    Construiește arhitectura pentru încărcarea ponderilor. Cu mmap, modulele sunt create pe device-ul "meta"
+    (fără alocare și fără inițializare aleatoare), iar load_model_weights le atribuie tensorii mapați.
+    """
+    if uses_mmap(device):
+        with torch.device("meta"):
+            return builder()
+    return builder()
+
+def load_model_weights(model, model_path, device):
+    """
+    Încarcă ponderile în arhitectura dată și aplică backend-ul de inferență configurat.
+    Returnează modelul în modul eval, pe device.
+    """
+    quantized = is_quantized_backend(device)
+    artifact_path = quantized_artifact_path(model_path)
+
+    if quantized and os.path.exists(artifact_path):
+        model = quantize_dynamic_int8(model.eval())
+        # Artefactul este produs local de calibrate_int8; tensorii cuantizați necesită unpickling complet
+        model.load_state_dict(torch.load(artifact_path, map_location=device, weights_only=False))
+        return model.eval()
+
+    if uses_mmap(device):
+        # assign=True păstrează tensorii mapați în loc să îi copieze în parametrii modelului
+        model.load_state_dict(load_state_dict_file(model_path, device, mmap=True), assign=True)
+        return model.eval()
+
+    model.load_state_dict(_torch_load(model_path, device))
+    model.to(device)
+    model.eval()
+
+    if quantized:
+        model = quantize_dynamic_int8(model)
+    return model
+
+def build_pretrained_model(model_key, quantized=False):
+    """Construiește un model nou (necache-uit) cu ponderile fp32, opțional cuantizat, pe CPU."""
+    module_name, builder_name = _MODEL_BUILDERS[model_key]
+    module = importlib.import_module(module_name)
+    model = getattr(module, builder_name)()
+    model.load_state_dict(_torch_load(module.MODEL_PATH, torch.device("cpu")))
+    model.eval()
+    return quantize_dynamic_int8(model) if quantized else model
+
+def convert_weights(model_key):
+    """
+    Scrie ponderile fp32 ale unui model în format .safetensors (tensori contigui, aliniați),
+    lângă fișierul .pth. Returnează calea fișierului scris.
+    """
+    from safetensors.torch import save_file
+
+    model_path = _model_path(model_key)
+    state_dict = _torch_load(model_path, torch.device("cpu"))
+    output_path = safetensors_path(model_path)
+    save_file({name: tensor.contiguous() for name, tensor in state_dict.items()}, output_path)
+    return output_path
+
+def _model_path(model_key):
+    return importlib.import_module(_MODEL_BUILDERS[model_key][0]).MODEL_PATH
+
+def model_size_mb(model):
+    """Mărimea state_dict-ului serializat, în MB."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes / (1024 * 1024)
+
+def _run(model, image_tensors):
+    latencies = []
+    outputs = []
+    with torch.inference_mode():
+        model(image_tensors[0])  # warm-up
+        for image_tensor in image_tensors:
+            start = time.perf_counter()
+            outputs.append(model(image_tensor))
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return torch.cat(outputs), latencies[len(latencies) // 2]
+
+def compare_backends(model_key, image_tensors, top_k=3):
+    """
+    Raport fp32 vs int8 pe imaginile de calibrare: latența mediană per imagine, acordul top-1 și top-k,
+    mărimea modelului. Returnează (raport, model int8).
+    """
+    fp32_model = build_pretrained_model(model_key, quantized=False)
+    int8_model = build_pretrained_model(model_key, quantized=True)
+
+    fp32_outputs, fp32_ms = _run(fp32_model, image_tensors)
+    int8_outputs, int8_ms = _run(int8_model, image_tensors)
+
+    k = min(top_k, fp32_outputs.shape[1])
+    fp32_topk = fp32_outputs.topk(k, dim=1).indices.tolist()
+    int8_topk = int8_outputs.topk(k, dim=1).indices.tolist()
+
+    top1_agreement = sum(a[0] == b[0] for a, b in zip(fp32_topk, int8_topk)) / len(fp32_topk)
+    topk_agreement = sum(len(set(a) & set(b)) / k for a, b in zip(fp32_topk, int8_topk)) / len(fp32_topk)
+
+    report = {
+        "model": model_key,
+        "imagini": len(image_tensors),
+        "fp32_ms": fp32_ms,
+        "int8_ms": int8_ms,
+        "accelerare": fp32_ms / int8_ms if int8_ms else 0.0,
+        "acord_top1": top1_agreement,
+        f"acord_top{k}": topk_agreement,
+        "fp32_mb": model_size_mb(fp32_model),
+        "int8_mb": model_size_mb(int8_model),
+        **quantization_coverage(fp32_model, int8_model),
+    }
+    return report, int8_model
+
+def calibrate_int8(model_key, image_tensors, min_agreement=0.95, top_k=3, save=True, min_speedup=1.1):
+    """
+    Calibrează backend-ul int8 pe imagini reprezentative: compară cu fp32 și, dacă acordul top-1
+    este cel puțin min_agreement și accelerarea măsurată cel puțin min_speedup, salvează artefactul
+    pre-cuantizat lângă ponderile fp32 (modelele pe care int8 nu le accelerează rămân fp32).
+    """
+    report, int8_model = compare_backends(model_key, image_tensors, top_k=top_k)
+    report["acceptat"] = report["acord_top1"] >= min_agreement and report["accelerare"] >= min_speedup
+
+    if save and report["acceptat"]:
+        artifact_path = quantized_artifact_path(_model_path(model_key))
+        torch.save(int8_model.state_dict(), artifact_path)
+        report["artefact"] = artifact_path
+
+    return report
@@ -0,0 +1,125 @@
+"""
+Planificatorul inferenței: două clase de prioritate, interactiv (analizele din interfață) și lot
+(procesarea în masă a colecțiilor).
+
+Fiecare forward obține un loc (slot) de la planificator înainte să ruleze. Clasele au limite proprii de
+concurență, iar un forward de lot pornește doar când nu rulează și nu așteaptă nicio cerere interactivă:
+lucrul în masă folosește doar capacitatea rămasă liberă. Loturile mari sunt împărțite în bucăți
+(ARTADVISOR_SCHEDULER_BATCH_CHUNK), deci o cerere interactivă așteaptă cel mult o bucată aflată deja în
+execuție (preempțiune la granița dintre loturi). Timpii de așteptare în coadă sunt păstrați per clasă.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import (
+    SCHEDULER_ENABLED, SCHEDULER_INTERACTIVE_CONCURRENCY, SCHEDULER_BATCH_CONCURRENCY, SCHEDULER_BATCH_CHUNK
+)
+
+PRIORITY_INTERACTIVE = "interactiv"
+PRIORITY_BATCH = "lot"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+class InferenceScheduler:
+    """Porți de admitere pentru forward-uri, cu prioritate strictă a cererilor interactive."""
+
+    def __init__(self, interactive_limit=SCHEDULER_INTERACTIVE_CONCURRENCY, batch_limit=SCHEDULER_BATCH_CONCURRENCY,
+                 history=1024):
+        self.limits = {PRIORITY_INTERACTIVE: max(1, interactive_limit), PRIORITY_BATCH: max(1, batch_limit)}
+        self._condition = threading.Condition()
+        self._running = dict.fromkeys(PRIORITIES, 0)
+        self._waiting = dict.fromkeys(PRIORITIES, 0)
+        self._completed = dict.fromkeys(PRIORITIES, 0)
+        self._wait_ms = {priority: deque(maxlen=history) for priority in PRIORITIES}
+
+    def _can_run(self, priority):
+        if self._running[priority] >= self.limits[priority]:
+            return False
+        if priority == PRIORITY_BATCH:
+            return self._running[PRIORITY_INTERACTIVE] == 0 and self._waiting[PRIORITY_INTERACTIVE] == 0
+        return True
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE):
+        """Blochează până când forward-ul poate rula. Returnează timpul de așteptare în ms."""
+        if priority not in self.limits:
+            raise ValueError(f"Prioritate necunoscută: {priority}")
+
+        start = time.perf_counter()
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                while not self._can_run(priority):
+                    self._condition.wait()
+            finally:
+                self._waiting[priority] -= 1
+            self._running[priority] += 1
+            waited_ms = (time.perf_counter() - start) * 1000
+            self._wait_ms[priority].append(waited_ms)
+        return waited_ms
+
+    def release(self, priority=PRIORITY_INTERACTIVE):
+        with self._condition:
+            self._running[priority] -= 1
+            self._completed[priority] += 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_INTERACTIVE):
+        """Context în care rulează un forward din clasa dată."""
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def stats(self):
+        """Per clasă: limita, în execuție, în așteptare, finalizate și timpii de așteptare p50/p95/max (ms)."""
+        with self._condition:
+            return {
+                priority: {
+                    "limita": self.limits[priority],
+                    "in_executie": self._running[priority],
+                    "in_asteptare": self._waiting[priority],
+                    "finalizate": self._completed[priority],
+                    "asteptare_p50_ms": round(_percentile(self._wait_ms[priority], 0.50), 2),
+                    "asteptare_p95_ms": round(_percentile(self._wait_ms[priority], 0.95), 2),
+                    "asteptare_max_ms": round(max(self._wait_ms[priority], default=0.0), 2),
+                }
+                for priority in PRIORITIES
+            }
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """Planificatorul unic din proces."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = InferenceScheduler()
+        return _scheduler
+
+def scheduled(fn, priority=PRIORITY_INTERACTIVE):
+    """Învelește o funcție de inferență astfel încât fiecare apel să ruleze într-un slot al planificatorului."""
+    if not SCHEDULER_ENABLED:
+        return fn
+
+    def _run(*args, **kwargs):
+        with get_scheduler().slot(priority):
+            return fn(*args, **kwargs)
+
+    return _run
+
+def iter_chunks(items, chunk_size=SCHEDULER_BATCH_CHUNK):
+    """Împarte un lot în bucăți; între bucăți, cererile interactive pot prelua modelele."""
+    chunk_size = max(1, chunk_size)
+    for start in range(0, len(items), chunk_size):
+        yield items[start:start + chunk_size]
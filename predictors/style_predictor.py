@@ -1,15 +1,12 @@
 import torch
 import torch.nn as nn
-from torchvision import models, transforms
-from PIL import Image
-import os
+from torchvision import models
 import streamlit as st
 import operator
-from torchcam.methods import GradCAM
-from torchcam.utils import overlay_mask
-import numpy as np
-from torchvision.transforms.functional import to_pil_image, resize
-import cv2
+from predictors.preprocessing import prepare_image, stack_image_tensors
+from predictors.gradcam import LazyCAM, forward_with_features
+from predictors.quantization import load_model_weights, build_model_skeleton
+from predictors.thread_budget import apply_process_budget
 
 MODEL_PATH = "models/model_stil_efficientnet.pth"
 STYLE_LABELS = [
@@ -27,68 +24,77 @@ def load_style_model():
     Arhitectura este definită direct, pentru a se potrivi perfect cu fișierul .pth salvat.
     """
     print("Încărcare model STIL... (rulează o singură dată)")
+    apply_process_budget()
+    model = build_model_skeleton(build_style_model, DEVICE)
+    return load_model_weights(model, MODEL_PATH, DEVICE)
+
+def build_style_model():
+    """Arhitectura modelului de stil (fără ponderi)."""
     model = models.efficientnet_b0(weights=None)
     in_features = model.classifier[1].in_features
     model.classifier[1] = nn.Linear(in_features, len(STYLE_LABELS))
-    
-    try:
-        model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE, weights_only=True))
-    except TypeError:
-        model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
-    model.to(DEVICE)
-    model.eval()
     return model
 
-def get_prediction_transforms(img_size=224):
-    return transforms.Compose([
-        transforms.Resize((img_size, img_size)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-    ])
-
 def predict_style(image_path: str):
     """
     Predicția stilului cu Grad-CAM îmbunătățit (versiunea colegului integrată).
-    Returnează format compatibil cu aplicația existentă: {"predictions_sorted": [...], "gradcam_image": ...}
+    Returnează {"predictions_sorted": [...], "gradcam": LazyCAM}; harta se obține cu get_gradcam_image().
     """
-    model = load_style_model()
     try:
-        transform = get_prediction_transforms()
-        original_image = Image.open(image_path).convert('RGB')
-        image_tensor = transform(original_image).unsqueeze(0).to(DEVICE)
+        image_tensor, original_rgb = prepare_image(image_path)
+    except Exception as e:
+        print(f"Eroare detaliată în style_predictor: {e}")
+        return {"error": f"Eroare în style_predictor: {e}", "predictions_sorted": []}
+    return predict_style_from_tensor(image_tensor, original_rgb)
 
-        # Generarea Predicției și a Hărții Grad-CAM 
-        with GradCAM(model, target_layer=model.features[-1]) as cam_extractor:
-            outputs = model(image_tensor)
-            
+def predict_style_from_tensor(image_tensor, original_rgb):
+    """
+    Predicția pe un tensor deja preprocesat (1x3x224x224), partajat între predictori.
+    Forward-ul rulează sub inference_mode și păstrează harta features[-1]; harta de activare este un
+    artefact leneș ("gradcam"), calculat fără backward doar când este cerut (vezi predictors.gradcam).
+    """
+    model = load_style_model()
+    try:
+        with torch.inference_mode():
+            outputs, feature_map = forward_with_features(model, image_tensor.to(DEVICE))
             probabilities = torch.softmax(outputs, dim=1).cpu().squeeze()
-            predicted_class_idx = probabilities.argmax().item()
-            
-            activation_map = cam_extractor(predicted_class_idx, outputs)
 
-        results = {style: prob.item() for style, prob in zip(STYLE_LABELS, probabilities)}
+        predicted_class_idx = probabilities.argmax().item()
+        results = {style: prob for style, prob in zip(STYLE_LABELS, probabilities.tolist())}
         predictions_sorted = sorted(results.items(), key=operator.itemgetter(1), reverse=True)
 
-        cam = activation_map[0].squeeze(0)
-        cam_min, cam_max = cam.min(), cam.max()
-        cam_normalized = (cam - cam_min) / (cam_max - cam_min + 1e-8)
-        cam_np = cam_normalized.cpu().numpy()
-
-        # Resize direct pe numpy array cu interpolare CUBIC pentru calitate mai bună
-        cam_resized_np = cv2.resize(cam_np, original_image.size, interpolation=cv2.INTER_CUBIC)
+        gradcam = LazyCAM("stil", feature_map[0], predicted_class_idx, original_rgb, image_tensor)
 
-        heatmap_colored = cv2.applyColorMap(np.uint8(255 * cam_resized_np), cv2.COLORMAP_JET)
+        return {"predictions_sorted": predictions_sorted, "gradcam": gradcam}
 
-        orig_np = np.array(original_image.convert("RGB"))
-        if orig_np.shape[2] == 4:
-            orig_np = orig_np[:, :, :3]
+    except Exception as e:
+        print(f"Eroare detaliată în style_predictor: {e}")
+        return {"error": f"Eroare în style_predictor: {e}", "predictions_sorted": []}
 
-        overlay_np = cv2.addWeighted(heatmap_colored, 0.4, orig_np, 0.6, 0)
+def predict_style_batch(image_tensors, original_rgbs=None):
+    """
+    Predicția stilului pentru un lot de tensori preprocesați, într-un singur forward.
+    Returnează câte un rezultat {"predictions_sorted": [...], "gradcam": LazyCAM} pentru fiecare imagine;
+    suprapunerea CAM poate fi randată doar pentru imaginile care au original_rgbs.
+    """
+    model = load_style_model()
+    try:
+        batch = stack_image_tensors(image_tensors).to(DEVICE)
+        original_rgbs = original_rgbs or [None] * batch.shape[0]
 
-        overlay_img = Image.fromarray(overlay_np)
+        with torch.inference_mode():
+            outputs, feature_maps = forward_with_features(model, batch)
+            probabilities = torch.softmax(outputs, dim=1).cpu()
 
-        return {"predictions_sorted": predictions_sorted, "gradcam_image": overlay_img}
+        results = []
+        for i, row in enumerate(probabilities):
+            predicted_class_idx = row.argmax().item()
+            predictions_sorted = sorted(zip(STYLE_LABELS, row.tolist()), key=operator.itemgetter(1), reverse=True)
+            # clone(): fiecare rezultat păstrează doar propria hartă, nu întregul lot
+            gradcam = LazyCAM("stil", feature_maps[i].clone(), predicted_class_idx, original_rgbs[i], image_tensors[i])
+            results.append({"predictions_sorted": predictions_sorted, "gradcam": gradcam})
+        return results
 
     except Exception as e:
-        print(f"Eroare detaliată în style_predictor: {e}")
-        return {"error": f"Eroare în style_predictor: {e}", "predictions_sorted": []}
\ No newline at end of file
+        print(f"Eroare detaliată în style_predictor (lot): {e}")
+        return [{"error": f"Eroare în style_predictor: {e}", "predictions_sorted": []} for _ in range(len(image_tensors))]
@@ -0,0 +1,159 @@
+"""
+Bugetul central de fire CPU pentru inferență.
+
+Torch (intra-op și inter-op), OpenCV și bibliotecile BLAS ale numpy/sklearn au fiecare propriul pool de fire,
+dimensionat implicit după numărul de nuclee; cu mai multe sesiuni concurente într-un proces, acestea se
+suprasolicită reciproc. apply_process_budget() le configurează o singură dată per proces dintr-un buget
+comun (ARTADVISOR_CPU_THREADS, implicit nucleele disponibile), opțional fixând procesul pe un set de
+nuclee (ARTADVISOR_CPU_AFFINITY, ex. "0-7" sau "0,2,4-6"). Bugetul intra-op este împărțit apoi între
+cele trei modele, fiecare rulând pe firul său dedicat (vezi predictors.executors).
+"""
+
+import os
+import threading
+
+from config import (
+    INFERENCE_BACKEND, PARALLEL_MODELS_ENABLED, MODEL_THREAD_SPLIT, CPU_THREAD_BUDGET, CPU_AFFINITY,
+    TORCH_INTEROP_THREADS, OPENCV_THREADS, BLAS_THREADS
+)
+
+# Ponderea implicită din buget: EmotionEnsemble (EfficientNet-B2 + ViT-B/16) e cel mai scump
+_DEFAULT_WEIGHTS = {"stil": 1, "autor": 1, "emotie": 2}
+
+_BLAS_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "BLIS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+_applied = None
+_apply_lock = threading.Lock()
+
+def parse_cpu_set(spec):
+    """Interpretează o listă de nuclee de forma "0-3,6,8-9"."""
+    cpus = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+def _parse_split(split):
+    budget = {}
+    for part in split.split(','):
+        if '=' in part:
+            key, value = part.split('=', 1)
+            budget[key.strip()] = max(1, int(value))
+    return budget
+
+def available_cores():
+    """Nucleele pe care procesul are voie să ruleze (după afinitate, dacă platforma o suportă)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def total_thread_budget():
+    """Bugetul total de fire intra-op pentru inferență."""
+    return CPU_THREAD_BUDGET if CPU_THREAD_BUDGET > 0 else available_cores()
+
+def model_thread_budget(model_key):
+    """Numărul de fire intra-op alocat unui model din bugetul total."""
+    budget = total_thread_budget()
+    if not PARALLEL_MODELS_ENABLED:
+        return budget
+
+    configured = _parse_split(MODEL_THREAD_SPLIT) if MODEL_THREAD_SPLIT else {}
+    if model_key in configured:
+        return configured[model_key]
+
+    total_weight = sum(_DEFAULT_WEIGHTS.values())
+    return max(1, budget * _DEFAULT_WEIGHTS.get(model_key, 1) // total_weight)
+
+def model_thread_initializer(model_key):
+    """Funcția rulată la pornirea firului dedicat unui model: îi setează bugetul de fire."""
+    threads = model_thread_budget(model_key)
+
+    def _initialize():
+        apply_process_budget()
+        if INFERENCE_BACKEND != "onnx":
+            import torch
+            torch.set_num_threads(threads)
+
+    return _initialize
+
+def _apply_affinity():
+    if not CPU_AFFINITY:
+        return None
+    cpus = parse_cpu_set(CPU_AFFINITY)
+    try:
+        os.sched_setaffinity(0, cpus)
+        return sorted(cpus)
+    except (AttributeError, OSError, ValueError) as e:
+        print(f"Afinitatea CPU {CPU_AFFINITY} nu a putut fi aplicată: {e}")
+        return None
+
+def _apply_blas():
+    # Variabilele de mediu au efect doar pentru bibliotecile încă neîncărcate; threadpoolctl le limitează și pe celelalte
+    for name in _BLAS_ENV_VARS:
+        os.environ[name] = str(BLAS_THREADS)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=BLAS_THREADS, user_api="blas")
+        return True
+    except ImportError:
+        return False
+
+def _apply_opencv():
+    try:
+        import cv2
+    except ImportError:
+        return False
+    cv2.setNumThreads(OPENCV_THREADS)
+    return True
+
+def _apply_torch():
+    if INFERENCE_BACKEND == "onnx":
+        return False
+    import torch
+    try:
+        # Poate fi setat doar înainte de prima lucrare paralelă din proces
+        torch.set_num_interop_threads(TORCH_INTEROP_THREADS)
+    except RuntimeError:
+        pass
+    torch.set_num_threads(total_thread_budget())
+    return True
+
+def apply_process_budget():
+    """
+    Aplică bugetul de fire o singură dată per proces (apelurile ulterioare nu mai au efect):
+    afinitatea CPU, firele BLAS, OpenCV și torch. Returnează setările aplicate.
+    """
+    global _applied
+    with _apply_lock:
+        if _applied is None:
+            affinity = _apply_affinity()
+            _applied = {
+                "afinitate": affinity,
+                "blas_threadpoolctl": _apply_blas(),
+                "opencv": _apply_opencv(),
+                "torch": _apply_torch(),
+            }
+        return _applied
+
+def get_thread_settings():
+    """Setările curente: bugetul, împărțirea pe modele și ce a fost aplicat în proces."""
+    settings = {
+        "nuclee_disponibile": available_cores(),
+        "buget_total": total_thread_budget(),
+        "modele": {model_key: model_thread_budget(model_key) for model_key in _DEFAULT_WEIGHTS},
+        "torch_interop": TORCH_INTEROP_THREADS,
+        "opencv": OPENCV_THREADS,
+        "blas": BLAS_THREADS,
+        "afinitate_configurata": CPU_AFFINITY or None,
+        "paralel": PARALLEL_MODELS_ENABLED,
+    }
+    with _apply_lock:
+        settings["aplicat"] = dict(_applied) if _applied is not None else None
+    return settings
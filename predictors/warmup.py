@@ -0,0 +1,203 @@
+"""
+Încălzirea modelelor la pornirea serverului și semnalul de disponibilitate (readiness).
+
+start_warmup() pornește, o singură dată per proces, un fir de fundal care încarcă cele trei modele
+și rulează forward-uri fictive la mărimile de lot folosite la servire, pe aceleași fire dedicate
+(micro-batcher sau executor) ca cererile reale: primul utilizator nu mai plătește încărcarea ponderilor,
+alocările și inițializarea kernel-urilor. Cu worker de inferență (ARTADVISOR_INFERENCE_WORKER), procesele client
+(Streamlit, API) nu încarcă niciun model: încălzirea doar așteaptă, prin ping, ca worker-ul să fie pregătit,
+iar modelele sunt încălzite o singură dată, în procesul worker. get_readiness() raportează starea și timpii per model, iar
+start_readiness_server() expune /health și /ready pentru load balancer.
+"""
+
+import importlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import MICRO_BATCHING_ENABLED, MICRO_BATCH_MAX_SIZE, USE_INFERENCE_WORKER, INFERENCE_BACKEND, READINESS_HOST
+
+MODEL_KEYS = ("stil", "autor", "emotie")
+
+# Cheia modelului -> (modulul predictorului, funcția de încărcare a modelului)
+_MODEL_LOADERS = {
+    "stil": ("predictors.style_predictor", "load_style_model"),
+    "autor": ("predictors.author_predictor", "load_author_model"),
+    "emotie": ("predictors.emotion_predictor", "load_emotion_model"),
+}
+
+_state = {
+    "stare": "neinceput",
+    "backend": INFERENCE_BACKEND,
+    # "worker": modelele rulează în worker-ul de inferență; "local": în acest proces
+    "mod": "worker" if USE_INFERENCE_WORKER else "local",
+    "modele": {},
+    "eroare": None,
+    "inceput": None,
+    "durata_s": None,
+}
+_state_lock = threading.Lock()
+_warmup_thread = None
+_readiness_server = None
+
+def serving_batch_sizes():
+    """Mărimile de lot pentru forward-urile fictive: 1 și, cu micro-batching, lotul maxim."""
+    if MICRO_BATCHING_ENABLED and MICRO_BATCH_MAX_SIZE > 1:
+        return (1, MICRO_BATCH_MAX_SIZE)
+    return (1,)
+
+def _update(**changes):
+    with _state_lock:
+        _state.update(changes)
+
+def _update_model(model_key, **changes):
+    with _state_lock:
+        _state["modele"].setdefault(model_key, {}).update(changes)
+
+def _load_model(model_key):
+    if INFERENCE_BACKEND == "onnx":
+        from predictors.onnx_backend import load_onnx_model
+        return load_onnx_model(model_key)
+
+    module_name, loader_name = _MODEL_LOADERS[model_key]
+    return getattr(importlib.import_module(module_name), loader_name)()
+
+def _dummy_inputs():
+    import numpy as np
+    original_rgb = np.zeros((224, 224, 3), dtype=np.uint8)
+    if INFERENCE_BACKEND == "onnx":
+        return np.zeros((1, 3, 224, 224), dtype=np.float32), original_rgb
+
+    import torch
+    return torch.zeros(1, 3, 224, 224), original_rgb
+
+def _submit(model_key, image_input, original_rgb):
+    import predict
+    if INFERENCE_BACKEND == "onnx":
+        return predict.submit_onnx(model_key, image_input, original_rgb if model_key != "emotie" else None)
+    if model_key == "stil":
+        return predict.submit_style(image_input, original_rgb)
+    if model_key == "autor":
+        return predict.submit_author(image_input, original_rgb)
+    return predict.submit_emotion(image_input)
+
+def _warm_up_model(model_key, batch_sizes):
+    start = time.perf_counter()
+    _load_model(model_key)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    image_input, original_rgb = _dummy_inputs()
+    forward_ms = {}
+    for batch_size in batch_sizes:
+        # Cererile trimise împreună ajung în același lot al micro-batcher-ului, pe firul care servește modelul
+        start = time.perf_counter()
+        futures = [_submit(model_key, image_input, original_rgb) for _ in range(batch_size)]
+        for future in futures:
+            result = future.result()
+            if result.get("error"):
+                raise RuntimeError(result["error"])
+        forward_ms[batch_size] = (time.perf_counter() - start) * 1000
+
+    _update_model(model_key, stare="gata", incarcare_ms=round(load_ms, 1),
+                  forward_ms={str(size): round(ms, 1) for size, ms in forward_ms.items()})
+    print(f"Model {model_key.upper()} încălzit: încărcare {load_ms:.0f} ms, "
+          + ", ".join(f"lot {size}: {ms:.0f} ms" for size, ms in forward_ms.items()))
+
+def _wait_for_worker():
+    from predictors.worker_client import get_worker_client
+
+    client = get_worker_client()
+    while True:
+        response = client.request("ping", timeout=5)
+        result = response.get("result", {})
+        if response.get("status") == "ok" and result.get("pregatit", True):
+            _update(modele=result.get("modele", {}))
+            return
+        time.sleep(1.0)
+
+def warm_up_models(batch_sizes=None):
+    """
+    Încarcă toate modelele și rulează forward-urile fictive (blocant). Cu worker de inferență, nu încarcă
+    nimic în proces: doar așteaptă ca worker-ul să devină disponibil. Returnează starea finală (vezi get_readiness).
+    """
+    batch_sizes = batch_sizes or serving_batch_sizes()
+    started = time.perf_counter()
+    _update(stare="incalzire", inceput=time.time(), eroare=None)
+
+    try:
+        if USE_INFERENCE_WORKER:
+            # Modelele (și torch) rămân doar în worker; aici nu se importă predict sau predictorii
+            _wait_for_worker()
+        else:
+            for model_key in MODEL_KEYS:
+                _update_model(model_key, stare="incalzire")
+                _warm_up_model(model_key, batch_sizes)
+        _update(stare="gata", durata_s=round(time.perf_counter() - started, 2))
+        print(f"Modelele sunt pregătite în {time.perf_counter() - started:.1f} s")
+    except Exception as e:
+        print(f"Eroare la încălzirea modelelor: {e}")
+        _update(stare="eroare", eroare=str(e), durata_s=round(time.perf_counter() - started, 2))
+
+    return get_readiness()
+
+def start_warmup(batch_sizes=None):
+    """Pornește încălzirea pe un fir de fundal (o singură dată per proces) și returnează firul."""
+    global _warmup_thread
+    with _state_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up_models, args=(batch_sizes,), name="model-warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+def get_readiness():
+    """Starea încălzirii: stare (neinceput/incalzire/gata/eroare), timpii per model și eroarea, dacă există."""
+    with _state_lock:
+        state = dict(_state)
+        state["modele"] = {key: dict(value) for key, value in _state["modele"].items()}
+    state["pregatit"] = state["stare"] == "gata"
+    return state
+
+def is_ready():
+    """True după ce toate modelele au fost încărcate și încălzite."""
+    return get_readiness()["pregatit"]
+
+class _ReadinessHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if path == "/health":
+            status, payload = 200, {"status": "ok"}
+        elif path == "/ready":
+            payload = get_readiness()
+            status = 200 if payload["pregatit"] else 503
+        else:
+            status, payload = 404, {"error": f"Ruta necunoscută: {path}"}
+
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_readiness_server(host=READINESS_HOST, port=8503):
+    """
+    Pornește (o singură dată per proces) un server HTTP minimal cu /health (procesul rulează) și
+    /ready (200 doar după încălzire, altfel 503), pentru verificările load balancer-ului.
+    Adresa implicită este ARTADVISOR_READINESS_HOST (implicit adresa API-ului, 127.0.0.1).
+    """
+    global _readiness_server
+    with _state_lock:
+        if _readiness_server is None:
+            try:
+                _readiness_server = ThreadingHTTPServer((host, port), _ReadinessHandler)
+            except OSError as e:
+                # Alt proces (ex. o replică pe aceeași mașină) ocupă deja portul
+                print(f"Serverul de readiness nu a putut porni pe {host}:{port}: {e}")
+                return None
+            _readiness_server.daemon_threads = True
+            threading.Thread(target=_readiness_server.serve_forever, name="readiness-server", daemon=True).start()
+        return _readiness_server
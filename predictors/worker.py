@@ -0,0 +1,210 @@
+"""
+Worker-ul de inferență: un singur proces încarcă modelele și servește cererile tuturor proceselor Streamlit.
+
+Pornire: ARTADVISOR_INFERENCE_WORKER=/tmp/artadvisor-inference.sock python -m predictors.worker
+(sau start_inference_worker() din predictors.worker_client). Cererile sunt puse într-o coadă limitată
+(ARTADVISOR_INFERENCE_WORKER_QUEUE); când coada este plină, worker-ul răspunde imediat cu "busy" în loc
+să acumuleze latență. Un număr fix de fire (ARTADVISOR_INFERENCE_WORKER_THREADS) execută cererile, astfel
+încât micro-batching-ul și execuția concurentă a modelelor din predict.py funcționează ca în proces.
+
+Cererile sunt obiecte pickle, deci conexiunile sunt autentificate: pe TCP cheia trebuie dată explicit
+(ARTADVISOR_INFERENCE_WORKER_AUTHKEY), altfel worker-ul nu pornește; pe socket Unix, fără cheie explicită,
+worker-ul generează la fiecare pornire o cheie aleatoare în "<socket>.key" (0600), citită de clienți.
+"""
+
+import os
+
+# Procesul worker rulează modelele local: trebuie setat înainte de importul config
+os.environ["ARTADVISOR_INFERENCE_ROLE"] = "worker"
+
+import argparse
+import itertools
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+
+from config import (
+    INFERENCE_WORKER_ADDRESS, INFERENCE_WORKER_AUTHKEY, INFERENCE_WORKER_QUEUE_SIZE,
+    INFERENCE_WORKER_THREADS, INFERENCE_BACKEND, WARMUP_ENABLED, READINESS_PORT
+)
+from predictors.worker_client import parse_address, load_authkey, create_authkey
+from predictors.warmup import start_warmup, start_readiness_server, get_readiness
+from predictors.thread_budget import get_thread_settings
+from predictors.scheduler import get_scheduler, PRIORITY_INTERACTIVE
+from utils.single_flight import get_coalescing_stats
+from utils.artifact_store import get_artifact_stats
+
+def _portable(predictions):
+    """Înlocuiește artefactele CAM torch cu echivalentul numpy, ca clientul să nu importe torch."""
+    for key in ('stil', 'autor'):
+        results = predictions.get(key)
+        artifact = results.get('gradcam') if isinstance(results, dict) else None
+        if artifact is not None and hasattr(artifact, 'to_numpy'):
+            results['gradcam'] = artifact.to_numpy()
+    predictions.pop('optimized_image', None)
+    return predictions
+
+def handle_request(op, payload):
+    """Execută o cerere de inferență și returnează răspunsul pentru client."""
+    from predict import get_all_predictions, predict_emotions_from_image
+
+    if op == "predict":
+        predictions = get_all_predictions(payload["imagine"], priority=payload.get("prioritate", PRIORITY_INTERACTIVE))
+        if predictions.get("error"):
+            return {"status": "error", "error": predictions["error"]}
+        return {"status": "ok", "result": _portable(predictions)}
+    if op == "emotions":
+        return {"status": "ok", "result": predict_emotions_from_image(payload["imagine"])}
+    return {"status": "error", "error": f"Cerere necunoscută: {op}"}
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+class InferenceWorker:
+    """Serverul worker-ului: o coadă limitată de cereri, servită de un număr fix de fire."""
+
+    def __init__(self, address=INFERENCE_WORKER_ADDRESS, authkey=INFERENCE_WORKER_AUTHKEY,
+                 queue_size=INFERENCE_WORKER_QUEUE_SIZE, threads=INFERENCE_WORKER_THREADS):
+        self.address = address
+        self.authkey = authkey
+        self.threads = max(1, threads)
+        # Cererile interactive sunt preluate înaintea celor de lot; ordinea de sosire se păstrează în cadrul clasei
+        self._queue = queue.PriorityQueue(maxsize=max(1, queue_size))
+        self._sequence = itertools.count()
+        self._stats_lock = threading.Lock()
+        self._stats = {"servite": 0, "respinse": 0, "erori": 0, "conexiuni": 0}
+        self._started = time.time()
+        self._listener = None
+
+    def _already_running(self):
+        try:
+            Client(parse_address(self.address), authkey=load_authkey(self.address, self.authkey)).close()
+            return True
+        except (OSError, EOFError):
+            return False
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            "in_coada": self._queue.qsize(),
+            "capacitate_coada": self._queue.maxsize,
+            "fire": self.threads,
+            "backend": INFERENCE_BACKEND,
+            "pid": os.getpid(),
+            "uptime_s": time.time() - self._started,
+            "fire_cpu": get_thread_settings(),
+            "planificator": get_scheduler().stats(),
+            "coalescare": get_coalescing_stats(),
+            "artefacte": get_artifact_stats(),
+        })
+        return stats
+
+    @staticmethod
+    def _rank(payload):
+        priority = payload.get("prioritate", PRIORITY_INTERACTIVE) if isinstance(payload, dict) else PRIORITY_INTERACTIVE
+        return 0 if priority == PRIORITY_INTERACTIVE else 1
+
+    def _dispatch(self):
+        while True:
+            _, _, op, payload, future = self._queue.get()
+            try:
+                response = handle_request(op, payload)
+            except Exception as e:
+                print(f"Eroare în worker-ul de inferență ({op}): {e}")
+                response = {"status": "error", "error": f"Eroare în worker-ul de inferență: {e}"}
+            self._count("servite" if response.get("status") == "ok" else "erori")
+            future.set_result(response)
+
+    def _serve_connection(self, conn):
+        self._count("conexiuni")
+        with conn:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                if op == "ping":
+                    response = {"status": "ok", "result": {"pid": os.getpid(), **get_readiness()}}
+                elif op == "stats":
+                    response = {"status": "ok", "result": self.stats()}
+                else:
+                    future = Future()
+                    try:
+                        self._queue.put_nowait((self._rank(payload), next(self._sequence), op, payload, future))
+                        response = future.result()
+                    except queue.Full:
+                        self._count("respinse")
+                        response = {"status": "busy", "error": "Worker-ul de inferență este ocupat, reîncercați în câteva secunde"}
+
+                try:
+                    conn.send(response)
+                except OSError:
+                    return
+
+    def serve_forever(self):
+        """Ascultă pe adresa configurată până la SIGTERM/SIGINT. Returnează codul de ieșire."""
+        if not self.address:
+            print("Adresa worker-ului nu este configurată (ARTADVISOR_INFERENCE_WORKER)")
+            return 2
+
+        parsed = parse_address(self.address)
+        if not isinstance(parsed, str) and not self.authkey:
+            print("Worker-ul de inferență pe TCP nu pornește fără cheie explicită (ARTADVISOR_INFERENCE_WORKER_AUTHKEY)")
+            return 2
+        if isinstance(parsed, str) and os.path.exists(parsed):
+            if self._already_running():
+                print(f"Un worker de inferență rulează deja pe {self.address}")
+                return 0
+            # Socket rămas de la un worker oprit forțat
+            os.unlink(parsed)
+
+        authkey = self.authkey or create_authkey(self.address)
+        self._listener = Listener(parsed, authkey=authkey)
+        for i in range(self.threads):
+            threading.Thread(target=self._dispatch, name=f"inference-worker-{i}", daemon=True).start()
+
+        if WARMUP_ENABLED:
+            start_warmup()
+        if READINESS_PORT:
+            start_readiness_server(port=READINESS_PORT)
+
+        signal.signal(signal.SIGTERM, _interrupt)
+        print(f"Worker de inferență pornit pe {self.address} (backend {INFERENCE_BACKEND}, {self.threads} fire, "
+              f"coadă {self._queue.maxsize})")
+        try:
+            while True:
+                try:
+                    conn = self._listener.accept()
+                except (OSError, EOFError) as e:
+                    # Handshake eșuat (cheie greșită) sau client deconectat: se continuă
+                    print(f"Conexiune respinsă de worker-ul de inferență: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+        except KeyboardInterrupt:
+            print("Oprire worker de inferență...")
+        finally:
+            # Pentru socket-uri Unix, close() șterge și fișierul socket-ului
+            self._listener.close()
+        return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m predictors.worker", description="Worker-ul de inferență ArtAdvisor")
+    parser.add_argument("--address", default=INFERENCE_WORKER_ADDRESS, help="Socket Unix sau host:port")
+    parser.add_argument("--queue-size", type=int, default=INFERENCE_WORKER_QUEUE_SIZE, help="Capacitatea cozii de cereri")
+    parser.add_argument("--threads", type=int, default=INFERENCE_WORKER_THREADS, help="Numărul de cereri executate concurent")
+    args = parser.parse_args(argv)
+
+    worker = InferenceWorker(args.address, queue_size=args.queue_size, threads=args.threads)
+    return worker.serve_forever()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
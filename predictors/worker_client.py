@@ -0,0 +1,186 @@
+"""
+Clientul worker-ului de inferență (vezi predictors.worker).
+
+Procesele Streamlit trimit imaginea decodată printr-un socket Unix (sau TCP local) și primesc rezultatul
+în același format ca get_all_predictions. Modulul nu importă torch: hărțile CAM sosesc ca NumpyCAM.
+Fiecare fir (sesiune Streamlit) are propria conexiune, deschisă la prima cerere.
+"""
+
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Client
+
+from config import (
+    INFERENCE_WORKER_ADDRESS, INFERENCE_WORKER_AUTHKEY, INFERENCE_WORKER_TIMEOUT_S, INFERENCE_WORKER_AUTOSTART
+)
+from predictors.scheduler import PRIORITY_INTERACTIVE
+
+def parse_address(address):
+    """Adresa worker-ului: "host:port" pentru TCP, altfel calea unui socket Unix."""
+    host, separator, port = address.rpartition(':')
+    if separator and port.isdigit() and not address.startswith(('/', '.')):
+        return (host or '127.0.0.1', int(port))
+    return address
+
+def authkey_path(address):
+    """Fișierul cheii generate pentru un worker pe socket Unix."""
+    return f"{address}.key"
+
+def load_authkey(address, authkey=INFERENCE_WORKER_AUTHKEY):
+    """
+    Cheia de autentificare pentru adresa dată: cea configurată explicit sau, pe socket Unix, cea generată
+    de worker. Ridică PermissionError pe TCP fără cheie explicită sau dacă fișierul cheii este accesibil
+    altor utilizatori, și FileNotFoundError dacă worker-ul nu a generat încă o cheie.
+    """
+    if authkey:
+        return authkey
+    if not isinstance(parse_address(address), str):
+        raise PermissionError("Worker-ul de inferență pe TCP necesită ARTADVISOR_INFERENCE_WORKER_AUTHKEY")
+    path = authkey_path(address)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_mode & 0o077:
+            raise PermissionError(f"Fișierul cheii {path} este accesibil altor utilizatori (sunt necesare permisiuni 0600)")
+        return f.read()
+
+def create_authkey(address):
+    """Generează o cheie aleatoare nouă pentru un worker pe socket Unix, scrisă atomic cu permisiuni 0600."""
+    path = authkey_path(address)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    authkey = secrets.token_bytes(32)
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        os.write(fd, authkey)
+    finally:
+        os.close(fd)
+    os.replace(temp_path, path)
+    return authkey
+
+def start_inference_worker(address=INFERENCE_WORKER_ADDRESS, wait_s=120, env=None):
+    """
+    Pornește worker-ul de inferență ca proces separat și așteaptă până răspunde la ping.
+    Returnează obiectul Popen (oprire cu .terminate()); folosit la pornirea aplicației și în teste.
+    """
+    if not address:
+        raise ValueError("Adresa worker-ului de inferență nu este configurată (ARTADVISOR_INFERENCE_WORKER)")
+
+    worker_env = dict(os.environ if env is None else env)
+    worker_env["ARTADVISOR_INFERENCE_WORKER"] = address
+    worker_env["ARTADVISOR_INFERENCE_ROLE"] = "worker"
+    process = subprocess.Popen([sys.executable, "-m", "predictors.worker"], env=worker_env)
+
+    client = InferenceWorkerClient(address, autostart=False)
+    deadline = time.monotonic() + wait_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            # Alt worker ascultă deja pe această adresă (sau pornirea a eșuat)
+            if client.ping():
+                return process
+            raise RuntimeError(f"Worker-ul de inferență s-a oprit la pornire (cod {process.returncode})")
+        if client.ping():
+            return process
+        time.sleep(0.2)
+
+    process.terminate()
+    raise TimeoutError(f"Worker-ul de inferență nu a răspuns în {wait_s} secunde")
+
+class InferenceWorkerClient:
+    """Conexiuni (câte una per fir) către worker-ul de inferență și cererile suportate de acesta."""
+
+    def __init__(self, address=INFERENCE_WORKER_ADDRESS, authkey=INFERENCE_WORKER_AUTHKEY,
+                 timeout=INFERENCE_WORKER_TIMEOUT_S, autostart=INFERENCE_WORKER_AUTOSTART):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self.autostart = autostart
+        self._local = threading.local()
+        self._start_lock = threading.Lock()
+        self._process = None
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Cheia generată este recitită la fiecare conexiune nouă: un worker repornit o schimbă
+            conn = Client(parse_address(self.address), authkey=load_authkey(self.address, self.authkey))
+            self._local.conn = conn
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._process is None or self._process.poll() is not None:
+                print(f"Pornire worker de inferență pe {self.address}...")
+                self._process = start_inference_worker(self.address)
+
+    def request(self, op, payload=None, timeout=None):
+        """
+        Trimite o cerere și așteaptă răspunsul {"status": "ok" | "busy" | "error", ...}.
+        O conexiune închisă este redeschisă o singură dată; cu autostart, worker-ul este pornit la nevoie.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send((op, payload))
+                if not conn.poll(timeout):
+                    # Răspunsul întârziat ar desincroniza conexiunea, deci aceasta este abandonată
+                    self._close()
+                    return {"status": "error", "error": f"Worker-ul de inferență nu a răspuns în {timeout:.0f} secunde"}
+                return conn.recv()
+            except (OSError, EOFError) as e:
+                self._close()
+                if attempt == 0:
+                    if self.autostart and isinstance(e, (FileNotFoundError, ConnectionRefusedError)):
+                        try:
+                            self._ensure_started()
+                        except Exception as start_error:
+                            return {"status": "error", "error": f"Worker-ul de inferență nu a putut fi pornit: {start_error}"}
+                    continue
+                return {"status": "error", "error": f"Worker-ul de inferență nu este disponibil: {e}"}
+
+    def ping(self):
+        """True dacă worker-ul răspunde."""
+        return self.request("ping", timeout=5).get("status") == "ok"
+
+    def stats(self):
+        """Statisticile worker-ului (coadă, cereri servite și respinse)."""
+        response = self.request("stats", timeout=5)
+        return response.get("result", {}) if response.get("status") == "ok" else {}
+
+    def predict_all(self, image_array, priority=PRIORITY_INTERACTIVE):
+        """Echivalentul get_all_predictions pe o imagine RGB decodată (array HxWx3 uint8)."""
+        response = self.request("predict", {"imagine": image_array, "prioritate": priority})
+        if response.get("status") != "ok":
+            print(f"Eroare worker de inferență: {response.get('error')}")
+            return {"error": response.get("error", "Răspuns invalid de la worker-ul de inferență")}
+        return response["result"]
+
+    def predict_emotions(self, image_array):
+        """Echivalentul predict_emotions_from_image: {emoție: scor}."""
+        response = self.request("emotions", {"imagine": image_array})
+        if response.get("status") != "ok":
+            print(f"Eroare worker de inferență: {response.get('error')}")
+            return {}
+        return response["result"]
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_worker_client():
+    """Clientul unic din proces către worker-ul configurat."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = InferenceWorkerClient()
+        return _client
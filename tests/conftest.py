@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Testele importă modulele aplicației (config, predictors, utils) din rădăcina repository-ului
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
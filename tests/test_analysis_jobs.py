@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image
+
+from utils.analysis_jobs import AnalysisJobStore
+
+def _result():
+    return {"predictions": {}, "narrative": "", "timestamp": "20260101_000000", "style_option": "Poetic",
+            "show_report_pdf": False, "audio": None, "salvare": {"succes": True}}
+
+def test_job_result_keeps_the_original_image(tmp_path):
+    store = AnalysisJobStore(str(tmp_path))
+    original = Image.new("CMYK", (40, 30), (0, 128, 255, 0))
+    cropped = Image.new("RGB", (20, 10), (255, 0, 0))
+
+    job_id = store.submit(cropped, {}, original_image=original)
+    store.complete(job_id, _result())
+    result = store.load_result(job_id)
+
+    assert result["cropped_image"].size == (20, 10)
+    assert result["original_image"].size == (40, 30)
+
+def test_job_without_original_returns_none(tmp_path):
+    store = AnalysisJobStore(str(tmp_path))
+    job_id = store.submit(Image.new("RGB", (20, 10)), {})
+    store.complete(job_id, _result())
+
+    assert store.load_result(job_id)["original_image"] is None
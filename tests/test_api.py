@@ -0,0 +1,51 @@
+import http.client
+import json
+import sys
+import types
+
+import pytest
+
+import api
+
+@pytest.fixture
+def server():
+    server = api.start_server_thread("127.0.0.1", port=0, workers=2)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _request(server, method, path, body=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+    try:
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+def test_gradcam_rejects_out_of_range_class_idx(server, monkeypatch):
+    fake_predict = types.ModuleType("predict")
+    fake_predict.get_all_predictions = lambda image_bytes, **kwargs: {
+        "stil": {"predictions_sorted": [("Baroc", 0.7), ("Cubism", 0.3)]}
+    }
+    monkeypatch.setitem(sys.modules, "predict", fake_predict)
+
+    status, payload = _request(server, "POST", "/gradcam?model=stil&class_idx=2", body=b"imagine")
+    assert status == 400
+    assert "class_idx" in payload["error"]
+
+    status, _ = _request(server, "POST", "/gradcam?model=stil&class_idx=-1", body=b"imagine")
+    assert status == 400
+
+    status, _ = _request(server, "POST", "/gradcam?model=stil&class_idx=x", body=b"imagine")
+    assert status == 400
+
+def test_get_returns_json_500_on_unexpected_error(server, monkeypatch):
+    def broken_stats():
+        raise RuntimeError("planificator indisponibil")
+
+    monkeypatch.setattr(api, "get_artifact_stats", broken_stats)
+
+    status, payload = _request(server, "GET", "/health")
+    assert status == 500
+    assert "planificator indisponibil" in payload["error"]
@@ -0,0 +1,31 @@
+import pytest
+
+from predictors.batching import MicroBatcher, get_batcher
+
+def test_initializer_error_fails_submits():
+    def initializer():
+        raise OSError("fără fire")
+
+    batcher = MicroBatcher(lambda items: items, name="test-init", initializer=initializer)
+    with pytest.raises(RuntimeError, match="fără fire"):
+        batcher(1, timeout=5)
+    # Și cererile trimise după ce eroarea este cunoscută
+    with pytest.raises(RuntimeError, match="fără fire"):
+        batcher(2, timeout=5)
+
+def test_short_results_fail_the_batch():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_wait_ms=200, name="test-scurt")
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="rezultate"):
+            future.result(timeout=5)
+
+def test_get_batcher_rejects_different_batch_fn():
+    def batch_fn(items):
+        return [item * 2 for item in items]
+
+    batcher = get_batcher("test-inregistrare", batch_fn)
+    assert get_batcher("test-inregistrare", batch_fn) is batcher
+    assert batcher(3, timeout=5) == 6
+    with pytest.raises(ValueError):
+        get_batcher("test-inregistrare", lambda items: items)
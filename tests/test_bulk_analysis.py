@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip("PIL")
+
+from utils import bulk_analysis
+
+def _predictions(error=None):
+    style = {"error": f"Eroare în style_predictor: {error}"} if error else {"predictions_sorted": [("Baroc", 0.9)]}
+    return {
+        "stil": style,
+        "autor": {"predictions_sorted": [("Rembrandt", 0.8)]},
+        "emotie": {"predictions_sorted": []},
+    }
+
+def test_model_failure_is_neither_saved_nor_checkpointed(tmp_path, monkeypatch):
+    input_dir = tmp_path / "imagini"
+    input_dir.mkdir()
+    for name in ("bun.png", "esuat.png"):
+        (input_dir / name).write_bytes(b"")
+
+    def decode(path):
+        return path, object(), np.zeros((4, 4, 3), dtype=np.uint8), None
+
+    def predict_batch(batch, gradcam):
+        # Modelul de stil eșuează pe o imagine, ca un predictor care a ridicat o excepție
+        return [_predictions("CUDA out of memory" if path.endswith("esuat.png") else None) for path, _, _ in batch]
+
+    saved = []
+
+    def save(predictions, original_rgb, gallery_dir, gradcam):
+        saved.append(predictions)
+        return True, "meta.json"
+
+    monkeypatch.setattr(bulk_analysis, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(bulk_analysis, "_init_decode_worker", lambda: None)
+    monkeypatch.setattr(bulk_analysis, "decode_for_bulk", decode)
+    monkeypatch.setattr(bulk_analysis, "_predict_batch", predict_batch)
+    monkeypatch.setattr(bulk_analysis, "_save_to_gallery", save)
+
+    checkpoint_path = str(tmp_path / "checkpoint.txt")
+    stats = bulk_analysis.run_bulk_analysis(str(input_dir), gallery_dir=str(tmp_path / "galerie"), workers=1,
+                                            checkpoint_path=checkpoint_path)
+
+    assert stats["procesate"] == 1
+    assert stats["erori"] == 1
+    assert len(saved) == 1 and "error" not in saved[0]["stil"]
+    assert bulk_analysis.load_checkpoint(checkpoint_path) == {str(input_dir / "bun.png")}
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from utils.gallery_index import GalleryIndex, SORT_COLUMNS
+
+@pytest.fixture
+def index(tmp_path):
+    random.seed(1)
+    gallery = GalleryIndex(str(tmp_path))
+    entries = []
+    for i in range(103):
+        metadata = {
+            "timestamp": f"2024_{i:03d}",
+            "stil_dominant": random.choice(["Baroc", "Realism", None]),
+            "stil_scor": random.choice([0.1, 0.5, 0.9]),
+            "autor_probabil": random.choice(["Monet", None]),
+            "autor_scor": 0.3,
+            "descriere_narrativa": "text lung",
+        }
+        entries.append((metadata, f"{tmp_path}/art_{i:03d}.png", f"{tmp_path}/art_{i:03d}.json", float(random.choice([1, 2, 3]))))
+    gallery.upsert_many(entries)
+    return gallery
+
+@pytest.mark.parametrize("sort", sorted(SORT_COLUMNS))
+@pytest.mark.parametrize("descending", [True, False])
+def test_pages_match_full_listing(index, sort, descending):
+    expected = [artwork['json_path'] for artwork in index.list_artworks(sort=sort, descending=descending)]
+
+    paged, cursor = [], None
+    while True:
+        summaries, cursor = index.list_summaries(sort, descending, limit=10, cursor=cursor)
+        assert len(summaries) <= 10
+        paged += [summary['json_path'] for summary in summaries]
+        if cursor is None:
+            break
+
+    assert paged == expected
+
+def test_missing_text_values_are_returned_as_none(index):
+    summaries, _ = index.list_summaries("stil", descending=False, limit=200)
+    assert None in {summary['stil_dominant'] for summary in summaries}
+    assert "" not in index.distinct_values("stil_dominant")
+
+@pytest.mark.parametrize("sort", sorted(SORT_COLUMNS))
+@pytest.mark.parametrize("descending", [True, False])
+def test_cursor_page_seeks_the_composite_index(index, sort, descending):
+    _, cursor = index.list_summaries(sort, descending, limit=10)
+    query, params = index.summaries_query(sort, descending, limit=10, cursor=cursor)
+    plan = " | ".join(row[3] for row in index._connection().execute(f"EXPLAIN QUERY PLAN {query}", params))
+
+    assert "SEARCH artworks USING INDEX" in plan
+    assert f"(({SORT_COLUMNS[sort]},id)" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,45 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from utils.emotion_index import get_emotion_index
+from utils.gallery_index import get_gallery_index
+from utils.gallery_journal import get_gallery_journal, get_gallery_view, sync_gallery_files
+
+def _drop_artwork(gallery_dir, item_id, emotions):
+    open(os.path.join(gallery_dir, f"{item_id}.png"), 'wb').close()
+    with open(os.path.join(gallery_dir, f"{item_id}.json"), 'w', encoding='utf-8') as f:
+        json.dump({"timestamp": item_id, "stil_dominant": "Baroc", "emotii_detectate": emotions}, f)
+
+def test_out_of_band_delete_is_removed_from_every_index(tmp_path):
+    gallery_dir = str(tmp_path)
+    _drop_artwork(gallery_dir, "art_1", {"Bucurie": 0.9})
+    _drop_artwork(gallery_dir, "art_2", {"Bucurie": 0.8})
+    view = get_gallery_view(gallery_dir, "timestamp")
+    assert len(view) == 2
+    assert {item_id for item_id, _ in get_emotion_index(gallery_dir).search(["Bucurie"])} == {"art_1", "art_2"}
+
+    os.remove(os.path.join(gallery_dir, "art_2.json"))
+    os.remove(os.path.join(gallery_dir, "art_2.png"))
+    assert sync_gallery_files(gallery_dir) == (0, 1)
+
+    assert get_gallery_index(gallery_dir).count() == 1
+    assert [item_id for item_id, _ in get_emotion_index(gallery_dir).search(["Bucurie"])] == ["art_1"]
+    assert [artwork['metadata']['timestamp'] for artwork in view.artworks()] == ["art_1"]
+    entries, _ = get_gallery_journal(gallery_dir).read_since((None, 0))
+    assert {"op": "delete", "id": "art_2"} in entries
+
+def test_out_of_band_import_reaches_the_emotion_index(tmp_path):
+    gallery_dir = str(tmp_path)
+    _drop_artwork(gallery_dir, "art_1", {"Bucurie": 0.9})
+    view = get_gallery_view(gallery_dir, "timestamp")
+    assert len(view) == 1
+
+    _drop_artwork(gallery_dir, "art_3", {"Tristețe": 0.7})
+    assert sync_gallery_files(gallery_dir) == (1, 0)
+
+    assert [item_id for item_id, _ in get_emotion_index(gallery_dir).search(["Tristețe"])] == ["art_3"]
+    assert len(view) == 2
@@ -0,0 +1,28 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+pytest.importorskip("torchcam")
+pytest.importorskip("streamlit")
+
+from predictors import gradcam, quantization
+from predictors.style_predictor import build_style_model
+
+def test_validate_cam_on_mmap_loaded_model(tmp_path, monkeypatch):
+    """Modul de validare CAM (backward torchcam) funcționează pe un model încărcat cu ponderi mapate."""
+    weights_path = tmp_path / "model_stil.pth"
+    torch.manual_seed(0)
+    torch.save(build_style_model().state_dict(), weights_path)
+
+    monkeypatch.setattr(quantization, "WEIGHTS_MMAP", True)
+    monkeypatch.setattr(quantization, "INFERENCE_BACKEND", "fp32")
+    cpu = torch.device("cpu")
+    model = quantization.build_model_skeleton(build_style_model, cpu)
+    model = quantization.load_model_weights(model, str(weights_path), cpu)
+    monkeypatch.setattr(gradcam, "_load_model", lambda model_key: model)
+
+    report = gradcam.validate_cam("stil", torch.rand(1, 3, 224, 224), top_k=2)
+
+    assert len(report) == 2
+    assert all(difference < 1e-3 for difference in report.values())
+    assert all(parameter.grad is None for parameter in model.parameters())
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+pytest.importorskip("PIL")
+pytest.importorskip("streamlit")
+ort = pytest.importorskip("onnxruntime")
+
+from PIL import Image
+
+from predictors.onnx_backend import prepare_image_numpy
+from predictors.preprocessing import load_image_for_analysis
+from predictors.style_predictor import build_style_model
+
+def _painting(height, width):
+    rng = np.random.default_rng(0)
+    coarse = (rng.random((height // 16, width // 16, 3)) * 255).astype(np.uint8)
+    return Image.fromarray(coarse).resize((width, height), Image.Resampling.BICUBIC)
+
+@pytest.mark.parametrize("size", [(1024, 768), (180, 150), (224, 224)])
+def test_numpy_preprocessing_matches_torch(size):
+    image = _painting(*size)
+    image_tensor, _ = load_image_for_analysis(image)
+    image_array, _ = prepare_image_numpy(image)
+
+    assert image_array.shape == tuple(image_tensor.shape)
+    assert np.abs(image_array - image_tensor.numpy()).max() < 1e-4
+
+def test_onnx_logits_match_torch(tmp_path):
+    """Același model, aceeași imagine: backend-ul ONNX și calea PyTorch dau aceleași logit-uri."""
+    torch.manual_seed(0)
+    model = build_style_model().eval()
+    model_file = str(tmp_path / "stil.onnx")
+    torch.onnx.export(model, torch.zeros(1, 3, 224, 224), model_file, input_names=["input"], output_names=["logits"],
+                      dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}}, opset_version=17)
+
+    image = _painting(600, 800)
+    image_tensor, _ = load_image_for_analysis(image)
+    image_array, _ = prepare_image_numpy(image)
+
+    with torch.inference_mode():
+        torch_logits = model(image_tensor).numpy()
+    session = ort.InferenceSession(model_file, providers=["CPUExecutionProvider"])
+    onnx_logits = session.run(None, {"input": image_array})[0]
+
+    assert np.abs(onnx_logits - torch_logits).max() < 1e-3
+    assert onnx_logits.argmax() == torch_logits.argmax()
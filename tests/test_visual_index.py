@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from predictors.embeddings import EMBEDDING_DIM
+from utils.visual_index import VisualIndex
+
+def _clustered(rows, clusters, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, EMBEDDING_DIM)).astype(np.float32)
+    labels = np.arange(rows) % clusters
+    vectors = centers[labels] + 0.3 * rng.standard_normal((rows, EMBEDDING_DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True), labels
+
+def test_reupserted_id_is_found_under_its_new_embedding(tmp_path):
+    vectors, labels = _clustered(400, 8, seed=0)
+    index = VisualIndex(str(tmp_path), min_rows=100)
+    for row, vector in enumerate(vectors):
+        index.upsert(f"art_{row}", vector)
+
+    assert index.train_ivf() is not None
+    # "art_0" este în clusterul 0
+    assert index.search(vectors[0], top_k=1, nprobe=1)[0][0] == "art_0"
+
+    # Același id, salvat din nou cu un embedding din alt cluster
+    target = int(np.flatnonzero(labels == 5)[0])
+    new_vector = vectors[target] + 0.01 * np.random.default_rng(1).standard_normal(EMBEDDING_DIM).astype(np.float32)
+    new_vector /= np.linalg.norm(new_vector)
+    index.upsert("art_0", new_vector)
+
+    found = [item_id for item_id, _ in index.search(new_vector, top_k=3, nprobe=1)]
+    assert found[0] == "art_0"
+    assert "art_0" not in [item_id for item_id, _ in index.search(vectors[8], top_k=3, nprobe=1)]
+
+    # Alt proces (instanță nouă) încarcă indexul salvat, cu rândul deja mutat
+    reopened = VisualIndex(str(tmp_path), min_rows=100)
+    assert reopened.search(new_vector, top_k=1, nprobe=1)[0][0] == "art_0"
+
+def test_ivf_is_retrained_after_store_rebuild(tmp_path):
+    vectors, _ = _clustered(300, 6, seed=2)
+    index = VisualIndex(str(tmp_path), min_rows=100)
+    for row, vector in enumerate(vectors):
+        index.upsert(f"art_{row}", vector)
+    index.train_ivf()
+
+    # Rebuild renumerotează rândurile (ordine inversă): indexul IVF vechi nu mai este valid
+    index.rebuild((f"art_{row}", vectors[row]) for row in reversed(range(len(vectors))))
+    assert index.search(vectors[7], top_k=1, nprobe=1)[0][0] == "art_7"
+    assert index.wait_for_training(timeout=30)
+    assert index.search(vectors[7], top_k=1, nprobe=1)[0][0] == "art_7"
+
+def test_search_does_not_wait_for_training(tmp_path, monkeypatch):
+    from utils import visual_index
+
+    vectors, _ = _clustered(300, 6, seed=3)
+    index = VisualIndex(str(tmp_path), min_rows=100)
+    for row, vector in enumerate(vectors):
+        index.upsert(f"art_{row}", vector)
+
+    trained, release = threading.Event(), threading.Event()
+    train = visual_index.IVFIndex.train
+
+    def slow_train(*args, **kwargs):
+        # Antrenarea vede embedding-urile de dinaintea re-salvării de mai jos
+        index_trained = train(*args, **kwargs)
+        trained.set()
+        release.wait(30)
+        return index_trained
+
+    monkeypatch.setattr(visual_index.IVFIndex, "train", slow_train)
+
+    # Cât timp antrenarea este blocată, căutarea și re-salvarea unei opere răspund cu căutarea exactă
+    assert index.search(vectors[4], top_k=1, nprobe=1)[0][0] == "art_4"
+    assert trained.wait(30)
+    moved = vectors[200].copy()
+    index.upsert("art_4", moved)
+    assert index.search(moved, top_k=2, nprobe=1)[0][0] in ("art_4", "art_200")
+    assert not index.wait_for_training(timeout=0.1)
+
+    release.set()
+    assert index.wait_for_training(timeout=30)
+    # Rândul rescris în timpul antrenării este deja în lista noului său vector
+    found = [item_id for item_id, _ in index.search(moved, top_k=2, nprobe=1)]
+    assert set(found) == {"art_4", "art_200"}
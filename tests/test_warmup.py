@@ -0,0 +1,19 @@
+from predictors import warmup, worker_client
+
+class _ReadyWorker:
+    def request(self, op, payload=None, timeout=None):
+        assert op == "ping"
+        return {"status": "ok", "result": {"pregatit": True, "modele": {"stil": {"stare": "gata"}}}}
+
+def test_worker_mode_only_pings_the_worker(monkeypatch):
+    def load_locally(model_key):
+        raise AssertionError(f"modelul {model_key} a fost încărcat în procesul client")
+
+    monkeypatch.setattr(warmup, "USE_INFERENCE_WORKER", True)
+    monkeypatch.setattr(warmup, "_load_model", load_locally)
+    monkeypatch.setattr(worker_client, "get_worker_client", lambda: _ReadyWorker())
+
+    readiness = warmup.warm_up_models()
+
+    assert readiness["pregatit"]
+    assert readiness["modele"] == {"stil": {"stare": "gata"}}
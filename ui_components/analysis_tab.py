@@ -1,17 +1,175 @@
 import streamlit as st
 from PIL import Image
-import tempfile
 import os
 import csv
+import time
 from datetime import datetime
 from streamlit_cropper import st_cropper
 
-from predict import get_all_predictions
+from config import ANALYSIS_JOBS_ENABLED, ANALYSIS_JOB_POLL_S
+
+from predictors.cam_overlay import get_gradcam_image
 from utils.ai_services import generate_narrative_description, synthesize_audio_openai, ask_gpt_about_painting
-from utils.data_management import save_analysis_metadata, save_feedback_to_csv
+from utils.data_management import save_analysis_metadata, save_feedback_to_csv, search_similar_artworks
+from utils.analysis_jobs import submit_analysis_job, get_job, load_job_result, JOB_DONE, JOB_FAILED
+from utils.artifact_store import store_artifact, resolve_artifact, discard_artifacts
 from utils.visualizations import create_emotion_radar_chart
 from utils.pdf_generator_advanced import generate_pdf_report, check_pdf_capabilities
 
+STYLE_MAP = {
+    "Poetic": "🎨 Poetic",
+    "Analitic": "🧠 Analitic", 
+    "Emoțional": "😢 Emoțional",
+    "Amuzant": "😂 Amuzant",
+    "Istoric": "🕰 Istoric"
+}
+
+def _clear_analysis_results():
+    """Elimină analiza anterioară din sesiune și eliberează artefactele ei."""
+    previous = st.session_state.get('analysis_results') or {}
+    discard_artifacts(previous.get('cropped_image'), previous.get('original_image'), st.session_state.get('audio'))
+    st.session_state['analysis_results'] = None
+    st.session_state['audio'] = None
+
+def _set_analysis_results(results, audio_bytes):
+    """
+    Salvează rezultatele în sesiune. Imaginile și audio-ul stau în depozitul de artefacte (limitat în bytes,
+    cu evacuare pe disc); sesiunea păstrează doar referințele, iar cele ale analizei anterioare sunt eliberate.
+    """
+    _clear_analysis_results()
+    results = dict(results)
+    results['cropped_image'] = store_artifact(results.get('cropped_image'), "imagine_analizata")
+    results['original_image'] = store_artifact(results.get('original_image'), "imagine_originala")
+    st.session_state['audio'] = store_artifact(audio_bytes, "audio") if audio_bytes else None
+    st.session_state['analysis_results'] = results
+
+def _run_analysis_inline(cropped_img, image, selected_style, show_report_toggle):
+    """Analiza completă în rularea curentă a scriptului (ARTADVISOR_ANALYSIS_JOBS=0)."""
+    with st.spinner("Se analizează opera de artă... Acest proces poate dura câteva secunde."):
+        try:
+            # Progres indicator pentru utilizator
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+            
+            # Obține predicțiile
+            status_text.text("Analizez stilul artistic și autorul...")
+            progress_bar.progress(25)
+            # Stiva ML (torch, modelele) se importă abia la prima analiză, nu la afișarea tab-ului
+            from predict import get_all_predictions
+
+            # Imaginea decupată este analizată direct în memorie, fără fișier temporar
+            predictions = get_all_predictions(cropped_img)
+            
+            # Generează descrierea narativă îmbunătățită cu stilul selectat
+            status_text.text("Creez interpretarea narativă în stilul selectat...")
+            progress_bar.progress(50)
+            
+            narrative = generate_narrative_description(predictions, selected_style, cropped_img)
+            
+            # Generează audio în română
+            audio_bytes = None
+            if narrative and narrative != "Nu s-a putut genera descrierea narativă. Vă rugăm să încercați din nou.":
+                status_text.text("Generez narațiunea audio în română...")
+                progress_bar.progress(75)
+                audio_fp = synthesize_audio_openai(narrative)
+                audio_bytes = audio_fp.getvalue() if audio_fp is not None else None
+            
+            # Finalizare și salvare rezultate
+            status_text.text("Salvez rezultatele și pregătesc raportul...")
+            progress_bar.progress(90)
+            
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            _set_analysis_results({
+                'predictions': predictions,
+                'narrative': narrative,
+                'timestamp': timestamp,
+                'style_option': selected_style,
+                'cropped_image': cropped_img,
+                'original_image': image,
+                'show_report_pdf': show_report_toggle
+            }, audio_bytes)
+            
+            # Salvează metadatele pentru galerie
+            success, img_path, meta_path = save_analysis_metadata(
+                predictions, 
+                narrative, 
+                cropped_img, 
+                timestamp
+            )
+            
+            progress_bar.progress(100)
+            status_text.text("Analiza completă!")
+            
+            if success:
+                st.success("Analiza a fost completată cu succes! Interpretarea apare mai jos.")
+                st.rerun()
+            else:
+                st.warning(f"Analiza s-a finalizat, dar există o problemă la salvare: {meta_path}")
+            
+        except Exception as e:
+            st.error(f"A apărut o eroare în timpul analizei: {str(e)}")
+            st.info("Încercați din nou sau contactați suportul tehnic.")
+        finally:                    
+            if 'progress_bar' in locals():
+                progress_bar.empty()
+            if 'status_text' in locals():
+                status_text.empty()
+
+def _render_job_progress():
+    """
+    Urmărește job-ul de analiză al sesiunii (sau cel din URL, după o reconectare): afișează etapa curentă,
+    iar la final încarcă rezultatul în sesiune. Pagina se rerulează la ANALYSIS_JOB_POLL_S cât job-ul rulează.
+    """
+    job_id = st.session_state.get('analysis_job_id') or st.query_params.get('job')
+    if not job_id:
+        return
+
+    job = get_job(job_id)
+    if job is None:
+        st.warning("Analiza solicitată nu mai există (a expirat sau a fost ștearsă).")
+        _forget_job()
+        return
+
+    st.session_state['analysis_job_id'] = job_id
+
+    if job['stare'] == JOB_FAILED:
+        st.error(f"A apărut o eroare în timpul analizei: {job['eroare']}")
+        st.info("Încercați din nou sau contactați suportul tehnic.")
+        _forget_job()
+        return
+
+    if job['stare'] == JOB_DONE:
+        result = load_job_result(job_id)
+        _forget_job()
+        if result is None:
+            st.warning("Rezultatul analizei nu mai este disponibil.")
+            return
+        _set_analysis_results({
+            'predictions': result['predictions'],
+            'narrative': result['narrative'],
+            'timestamp': result['timestamp'],
+            'style_option': result['style_option'],
+            'cropped_image': result['cropped_image'],
+            'original_image': result['original_image'],
+            'show_report_pdf': result['show_report_pdf']
+        }, result['audio'])
+        if result['salvare']['succes']:
+            st.success("Analiza a fost completată cu succes! Interpretarea apare mai jos.")
+        else:
+            st.warning(f"Analiza s-a finalizat, dar există o problemă la salvare: {result['salvare']['metadate']}")
+        return
+
+    st.progress(job['progres'], text=job['mesaj'])
+    st.caption(f"Analiza continuă și dacă reîncarci pagina (job {job_id[:8]}).")
+    time.sleep(ANALYSIS_JOB_POLL_S)
+    st.rerun()
+
+def _forget_job():
+    st.session_state['analysis_job_id'] = None
+    if 'job' in st.query_params:
+        del st.query_params['job']
+
 def render_analysis_tab():
     """Renderează tab-ul de analiză a operelor de artă."""
     
@@ -104,88 +262,20 @@ def render_analysis_tab():
         
         # Buton pentru analiză
         if st.button("Începe Analiza Completă", type="primary", use_container_width=True):
-            with st.spinner("Se analizează opera de artă... Acest proces poate dura câteva secunde."):
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_img_file:
-                        cropped_img.save(temp_img_file.name)
-                        temp_img_path = temp_img_file.name
-
-                    # Progres indicator pentru utilizator
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    
-                    # Obține predicțiile
-                    status_text.text("Analizez stilul artistic și autorul...")
-                    progress_bar.progress(25)
-                    predictions = get_all_predictions(temp_img_path)
-                    
-                    # Generează descrierea narativă îmbunătățită cu stilul selectat
-                    status_text.text("Creez interpretarea narativă în stilul selectat...")
-                    progress_bar.progress(50)
-                    
-                    style_map = {
-                        "Poetic": "🎨 Poetic",
-                        "Analitic": "🧠 Analitic", 
-                        "Emoțional": "😢 Emoțional",
-                        "Amuzant": "😂 Amuzant",
-                        "Istoric": "🕰 Istoric"
-                    }
-                    selected_style = style_map.get(style_option, "🎨 Poetic")  # Folosește stilul selectat
-                    
-                    narrative = generate_narrative_description(predictions, selected_style, cropped_img)
-                    
-                    # Generează audio în română
-                    if narrative and narrative != "Nu s-a putut genera descrierea narativă. Vă rugăm să încercați din nou.":
-                        status_text.text("Generez narațiunea audio în română...")
-                        progress_bar.progress(75)
-                        audio_fp = synthesize_audio_openai(narrative)
-                        st.session_state['audio'] = audio_fp
-                    else:
-                        st.session_state['audio'] = None
-                    
-                    # Finalizare și salvare rezultate
-                    status_text.text("Salvez rezultatele și pregătesc raportul...")
-                    progress_bar.progress(90)
-                    
+            selected_style = STYLE_MAP.get(style_option, "🎨 Poetic")  # Folosește stilul selectat
+            if ANALYSIS_JOBS_ENABLED:
+                # Analiza rulează ca job în coada persistentă; rerulările și reconectările doar îi urmăresc progresul
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                job_id = submit_analysis_job(cropped_img, selected_style, timestamp, show_report_toggle,
+                                             original_image=image)
+                st.session_state['analysis_job_id'] = job_id
+                _clear_analysis_results()
+                st.query_params['job'] = job_id
+            else:
+                _run_analysis_inline(cropped_img, image, selected_style, show_report_toggle)
 
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    st.session_state['analysis_results'] = {
-                        'predictions': predictions,
-                        'narrative': narrative,
-                        'timestamp': timestamp,
-                        'style_option': selected_style,
-                        'cropped_image': cropped_img,
-                        'original_image': image,
-                        'show_report_pdf': show_report_toggle
-                    }
-                    
-                    # Salvează metadatele pentru galerie
-                    success, img_path, meta_path = save_analysis_metadata(
-                        predictions, 
-                        narrative, 
-                        cropped_img, 
-                        timestamp
-                    )
-                    
-                    progress_bar.progress(100)
-                    status_text.text("Analiza completă!")
-                    
-                    if success:
-                        st.success("Analiza a fost completată cu succes! Interpretarea apare mai jos.")
-                        st.rerun()
-                    else:
-                        st.warning(f"Analiza s-a finalizat, dar există o problemă la salvare: {meta_path}")
-                    
-                except Exception as e:
-                    st.error(f"A apărut o eroare în timpul analizei: {str(e)}")
-                    st.info("Încercați din nou sau contactați suportul tehnic.")
-                finally:                    
-                    if 'temp_img_path' in locals() and os.path.exists(temp_img_path):
-                        os.unlink(temp_img_path)
-                    if 'progress_bar' in locals():
-                        progress_bar.empty()
-                    if 'status_text' in locals():
-                        status_text.empty()
+    if ANALYSIS_JOBS_ENABLED:
+        _render_job_progress()
     
     if 'analysis_results' in st.session_state and st.session_state.analysis_results:
         st.markdown("---")
@@ -210,8 +300,12 @@ def render_analysis_tab():
                 """, unsafe_allow_html=True)
                 
                 try:
-                    st.session_state.audio.seek(0)
-                    st.audio(st.session_state.audio, format='audio/mp3', autoplay=False)
+                    audio = resolve_artifact(st.session_state.audio)
+                    if audio is None:
+                        raise ValueError("audio-ul nu mai este disponibil")
+                    if hasattr(audio, 'seek'):
+                        audio.seek(0)
+                    st.audio(audio, format='audio/mp3', autoplay=False)
                     
                 except Exception as e:
                     st.markdown("""
@@ -270,13 +364,15 @@ def render_analysis_tab():
                     st.markdown("<div style='margin-bottom: 1rem;'></div>", unsafe_allow_html=True)
                 
                 # Heatmap pentru Stil
-                if 'gradcam_image' in predictions.get('stil', {}):
+                # Grad-CAM este calculat la cerere, doar când este afișat
+                gradcam_stil = get_gradcam_image(predictions.get('stil'))
+                if gradcam_stil is not None:
                     st.markdown("""
                     <div class="heatmap-section">
                         <h4>Zona de Interes - Stil</h4>
                     </div>
                     """, unsafe_allow_html=True)
-                    st.image(predictions['stil']['gradcam_image'], 
+                    st.image(gradcam_stil, 
                             caption="Heatmap pentru detectarea stilului artistic", 
                             use_container_width=True)
                 
@@ -310,13 +406,15 @@ def render_analysis_tab():
                     st.markdown("<div style='margin-bottom: 1rem;'></div>", unsafe_allow_html=True)
                 
                 # Heatmap pentru Autor
-                if 'gradcam_image' in predictions.get('autor', {}):
+                # Grad-CAM este calculat la cerere, doar când este afișat
+                gradcam_autor = get_gradcam_image(predictions.get('autor'))
+                if gradcam_autor is not None:
                     st.markdown("""
                     <div class="heatmap-section">
                         <h4>Zona de Interes - Autor</h4>
                     </div>
                     """, unsafe_allow_html=True)
-                    st.image(predictions['autor']['gradcam_image'], 
+                    st.image(gradcam_autor, 
                             caption="Heatmap pentru detectarea autorului", 
                             use_container_width=True)
                 
@@ -353,6 +451,22 @@ def render_analysis_tab():
             else:
                 st.markdown('<div class="no-prediction">Nu s-au detectat emoții</div>', unsafe_allow_html=True)
 
+        # OPERE ASEMĂNĂTOARE VIZUAL DIN GALERIE (după embedding-ul modelului de emoții)
+        similar_artworks = search_similar_artworks(
+            predictions.get('emotie', {}).get('embedding'),
+            top_k=4,
+            exclude_id=f"art_{st.session_state.analysis_results['timestamp']}"
+        )
+        if similar_artworks:
+            st.markdown("---")
+            st.markdown("""
+            <h3 class="section-title">Opere asemănătoare din galerie</h3>
+            """, unsafe_allow_html=True)
+            for column, artwork in zip(st.columns(len(similar_artworks)), similar_artworks):
+                with column:
+                    st.image(artwork['image_path'], use_container_width=True,
+                             caption=f"{artwork['metadata'].get('stil_dominant', 'N/A')} · {artwork['similarity']:.0%}")
+
         # SECȚIUNEA DE ÎNTREBĂRI GPT DESPRE PICTURĂ
         st.markdown("---")
         st.markdown("""
@@ -1,12 +1,14 @@
-from openai import OpenAI
 from PIL import Image
 import base64
 from io import BytesIO
 from config import ARTIST_PERSONAS
+from utils.prediction_cache import image_content_hash
+from utils.single_flight import get_single_flight, make_key
 
 def get_openai_client():
     """Obține clientul OpenAI cu cheia API din Streamlit secrets."""
     import streamlit as st
+    from openai import OpenAI
     return OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
 
 def show_streamlit_error(message):
@@ -21,7 +23,24 @@ def encode_image_to_base64(pil_image):
     return base64.b64encode(buffered.getvalue()).decode("utf-8")
 
 def generate_narrative_description(predictions: dict, style: str, image: Image.Image):
-    """Generează descrierea narativă folosind OpenAI API, analizând atât textul, cât și imaginea."""
+    """
+    Generează descrierea narativă folosind OpenAI API, analizând atât textul, cât și imaginea.
+    Cererile identice concurente (aceeași imagine, același stil și aceleași predicții) sunt coalescate
+    într-un singur apel către API.
+    """
+    try:
+        key = make_key(
+            "naratiune", image_content_hash(image), style,
+            predictions['stil']['predictions_sorted'][0][0],
+            predictions['autor']['predictions_sorted'][0][0],
+            [emotion for emotion, _ in predictions['emotie'].get('predictions_sorted', [])]
+        )
+    except (KeyError, IndexError, TypeError):
+        return _generate_narrative_description(predictions, style, image)
+    narrative, _ = get_single_flight("naratiune").do(key, _generate_narrative_description, predictions, style, image)
+    return narrative
+
+def _generate_narrative_description(predictions: dict, style: str, image: Image.Image):
     try:
         client = get_openai_client()
         
@@ -103,7 +122,14 @@ Pune opera în context istoric! Vorbește despre perioada în care a fost creat
         return None
 
 def synthesize_audio_openai(text: str) -> BytesIO | None:
-    """Generează audio natural în română cu intonație expresivă și tonalitate plăcută."""
+    """
+    Generează audio natural în română cu intonație expresivă și tonalitate plăcută.
+    Cererile concurente pentru același text sunt coalescate; fiecare apelant primește propriul buffer.
+    """
+    audio_bytes, _ = get_single_flight("audio").do(make_key("audio", "tts-1-hd", "nova", text), _synthesize_audio_openai, text)
+    return BytesIO(audio_bytes.getvalue()) if audio_bytes is not None else None
+
+def _synthesize_audio_openai(text: str) -> BytesIO | None:
     try:
         client = get_openai_client()
         
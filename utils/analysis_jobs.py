@@ -0,0 +1,367 @@
+"""
+Coada persistentă a analizelor complete.
+
+Butonul de analiză nu mai rulează predicțiile, narațiunea, audio-ul și salvarea în galerie în interiorul
+rulării scriptului Streamlit: imaginea este trimisă ca job într-o coadă locală (SQLite în modul WAL, cu
+intrările și rezultatele în același director), iar workerii o preiau. Interfața urmărește progresul pe
+etape după id-ul job-ului, deci o rerulare sau o reconectare a browserului nu mai pierde lucrul deja făcut.
+Mai multe procese (instanțe Streamlit sau python -m utils.analysis_jobs) pot servi aceeași coadă: preluarea
+unui job este atomică, iar un job rămas fără progres (proces oprit) este repus în coadă.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+import numpy as np
+from PIL import Image
+
+from config import (
+    ANALYSIS_JOBS_DIR, ANALYSIS_JOB_WORKERS, ANALYSIS_JOB_POLL_S, ANALYSIS_JOB_STALE_S,
+    ANALYSIS_JOB_MAX_ATTEMPTS, ANALYSIS_JOB_RETENTION_H
+)
+
+JOB_QUEUED = "in_asteptare"
+JOB_RUNNING = "in_executie"
+JOB_DONE = "finalizat"
+JOB_FAILED = "esuat"
+FINAL_STATES = (JOB_DONE, JOB_FAILED)
+
+# Etapele unei analize: (progres %, mesaj afișat în interfață)
+STAGES = {
+    "in_asteptare": (0, "Analiza așteaptă un worker liber..."),
+    "predictii": (25, "Analizez stilul artistic și autorul..."),
+    "naratiune": (50, "Creez interpretarea narativă în stilul selectat..."),
+    "audio": (75, "Generez narațiunea audio în română..."),
+    "salvare": (90, "Salvez rezultatele și pregătesc raportul..."),
+    "finalizat": (100, "Analiza completă!"),
+}
+
+NARRATIVE_FAILURE = "Nu s-a putut genera descrierea narativă. Vă rugăm să încercați din nou."
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    stare TEXT NOT NULL,
+    etapa TEXT NOT NULL,
+    progres INTEGER NOT NULL DEFAULT 0,
+    parametri TEXT NOT NULL,
+    eroare TEXT,
+    proprietar TEXT,
+    incercari INTEGER NOT NULL DEFAULT 0,
+    creat REAL NOT NULL,
+    actualizat REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_stare_creat ON jobs (stare, creat);
+"""
+
+class AnalysisJobStore:
+    """Starea job-urilor (SQLite, o conexiune per fir) și fișierele lor: imaginea de intrare și rezultatul."""
+
+    def __init__(self, jobs_dir=ANALYSIS_JOBS_DIR, stale_s=ANALYSIS_JOB_STALE_S, max_attempts=ANALYSIS_JOB_MAX_ATTEMPTS):
+        self.jobs_dir = jobs_dir
+        self.db_path = os.path.join(jobs_dir, "jobs.sqlite3")
+        self.stale_s = stale_s
+        self.max_attempts = max(1, max_attempts)
+        self._local = threading.local()
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: tranzacțiile sunt deschise explicit (BEGIN IMMEDIATE la preluare)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def submit(self, image, params, original_image=None):
+        """
+        Salvează imaginea analizată (decupată), imaginea originală încărcată (opțional) și parametrii și
+        pune job-ul în coadă. Returnează id-ul job-ului.
+        """
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id), exist_ok=True)
+        image.save(os.path.join(self.job_dir(job_id), "imagine.png"))
+        if original_image is not None:
+            # PNG nu stochează toate modurile (ex. CMYK din JPEG)
+            mode = 'RGBA' if 'A' in original_image.getbands() else 'RGB'
+            original_image.convert(mode).save(os.path.join(self.job_dir(job_id), "originala.png"))
+
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (id, stare, etapa, progres, parametri, creat, actualizat) VALUES (?, ?, ?, 0, ?, ?, ?)",
+            (job_id, JOB_QUEUED, "in_asteptare", json.dumps(params, ensure_ascii=False), now, now)
+        )
+        return job_id
+
+    def claim(self, owner):
+        """Preia atomic cel mai vechi job din coadă (și repune în coadă job-urile abandonate). Returnează job-ul sau None."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stale_before = now - self.stale_s
+            conn.execute(
+                "UPDATE jobs SET stare = ?, eroare = ?, actualizat = ? WHERE stare = ? AND actualizat < ? AND incercari >= ?",
+                (JOB_FAILED, "Analiza a fost întreruptă de prea multe ori", now, JOB_RUNNING, stale_before, self.max_attempts)
+            )
+            conn.execute(
+                "UPDATE jobs SET stare = ?, etapa = 'in_asteptare', progres = 0, proprietar = NULL, actualizat = ? "
+                "WHERE stare = ? AND actualizat < ?",
+                (JOB_QUEUED, now, JOB_RUNNING, stale_before)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE stare = ? ORDER BY creat LIMIT 1", (JOB_QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET stare = ?, proprietar = ?, incercari = incercari + 1, actualizat = ? WHERE id = ?",
+                    (JOB_RUNNING, owner, now, row["id"])
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"]) if row is not None else None
+
+    def update_stage(self, job_id, stage):
+        """Marchează etapa curentă; actualizarea servește și ca semn de viață pentru detectarea job-urilor abandonate."""
+        self._connection().execute(
+            "UPDATE jobs SET etapa = ?, progres = ?, actualizat = ? WHERE id = ?",
+            (stage, STAGES[stage][0], time.time(), job_id)
+        )
+
+    def complete(self, job_id, result):
+        path = os.path.join(self.job_dir(job_id), "rezultat.pkl")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        self._connection().execute(
+            "UPDATE jobs SET stare = ?, etapa = 'finalizat', progres = 100, actualizat = ? WHERE id = ?",
+            (JOB_DONE, time.time(), job_id)
+        )
+
+    def fail(self, job_id, error):
+        self._connection().execute(
+            "UPDATE jobs SET stare = ?, eroare = ?, actualizat = ? WHERE id = ?",
+            (JOB_FAILED, str(error), time.time(), job_id)
+        )
+
+    def get(self, job_id):
+        """Starea job-ului ca dict (stare, etapa, progres, mesaj, eroare, ...) sau None dacă nu există."""
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["parametri"] = json.loads(job["parametri"])
+        job["mesaj"] = STAGES.get(job["etapa"], (0, job["etapa"]))[1]
+        return job
+
+    def load_image(self, job_id, filename="imagine.png"):
+        with Image.open(os.path.join(self.job_dir(job_id), filename)) as image:
+            image.load()
+            return image.copy()
+
+    def load_original_image(self, job_id):
+        """Imaginea originală trimisă cu job-ul sau None (job trimis fără ea)."""
+        try:
+            return self.load_image(job_id, "originala.png")
+        except FileNotFoundError:
+            return None
+
+    def load_result(self, job_id):
+        """
+        Rezultatul unui job finalizat, cu imaginea analizată reatașată la hărțile CAM și imaginea originală
+        (None dacă nu a fost trimisă); None dacă rezultatul lipsește.
+        """
+        try:
+            with open(os.path.join(self.job_dir(job_id), "rezultat.pkl"), 'rb') as f:
+                result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        image = self.load_image(job_id)
+        original_rgb = np.array(image.convert('RGB'))
+        for key in ('stil', 'autor'):
+            artifact = result["predictions"].get(key, {}).get('gradcam')
+            if artifact is not None:
+                artifact.attach_image(original_rgb)
+        result["cropped_image"] = image
+        result["original_image"] = self.load_original_image(job_id)
+        return result
+
+    def cleanup(self, retention_h=ANALYSIS_JOB_RETENTION_H):
+        """Șterge job-urile încheiate mai vechi decât retention_h ore, împreună cu fișierele lor."""
+        cutoff = time.time() - retention_h * 3600
+        conn = self._connection()
+        placeholders = ", ".join("?" for _ in FINAL_STATES)
+        expired = [row["id"] for row in conn.execute(
+            f"SELECT id FROM jobs WHERE stare IN ({placeholders}) AND actualizat < ?", (*FINAL_STATES, cutoff)
+        )]
+        for job_id in expired:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        return len(expired)
+
+    def stats(self):
+        """Numărul de job-uri per stare."""
+        rows = self._connection().execute("SELECT stare, COUNT(*) AS numar FROM jobs GROUP BY stare")
+        return {row["stare"]: row["numar"] for row in rows}
+
+def run_analysis_job(store, job):
+    """Etapele unei analize complete, cu progresul salvat după fiecare etapă."""
+    from predict import get_all_predictions
+    from utils.ai_services import generate_narrative_description, synthesize_audio_openai
+    from utils.data_management import save_analysis_metadata
+
+    job_id = job["id"]
+    params = job["parametri"]
+    image = store.load_image(job_id)
+
+    store.update_stage(job_id, "predictii")
+    predictions = get_all_predictions(image)
+    if predictions.get("error"):
+        raise RuntimeError(predictions["error"])
+
+    store.update_stage(job_id, "naratiune")
+    narrative = generate_narrative_description(predictions, params["style_option"], image)
+
+    audio = None
+    if narrative and narrative != NARRATIVE_FAILURE:
+        store.update_stage(job_id, "audio")
+        audio_fp = synthesize_audio_openai(narrative)
+        audio = audio_fp.getvalue() if audio_fp is not None else None
+
+    # Numele fișierelor din galerie vin din timestamp-ul fixat la trimitere: o reluare suprascrie aceleași fișiere
+    store.update_stage(job_id, "salvare")
+    success, img_path, meta_path = save_analysis_metadata(predictions, narrative, image, params["timestamp"])
+
+    store.complete(job_id, {
+        "predictions": predictions,
+        "narrative": narrative,
+        "audio": audio,
+        "timestamp": params["timestamp"],
+        "style_option": params["style_option"],
+        "show_report_pdf": params.get("show_report_pdf", False),
+        "salvare": {"succes": success, "imagine": img_path, "metadate": meta_path},
+    })
+
+class AnalysisJobRunner:
+    """Firele care preiau și execută job-uri din coadă; trimiterile locale le trezesc imediat."""
+
+    def __init__(self, store, workers=ANALYSIS_JOB_WORKERS, poll_s=ANALYSIS_JOB_POLL_S):
+        self.store = store
+        self.workers = workers
+        self.poll_s = poll_s
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._loop, args=(index,), name=f"analysis-job-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def notify(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _loop(self, index):
+        owner = f"{os.uname().nodename if hasattr(os, 'uname') else 'local'}:{os.getpid()}:{index}"
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim(owner)
+            except sqlite3.Error as e:
+                print(f"Eroare la preluarea unui job de analiză: {e}")
+                job = None
+
+            if job is None:
+                self._wake.wait(self.poll_s)
+                self._wake.clear()
+                continue
+
+            try:
+                run_analysis_job(self.store, job)
+            except Exception as e:
+                print(f"Eroare în job-ul de analiză {job['id']}: {e}")
+                self.store.fail(job["id"], e)
+
+_store = None
+_runner = None
+_jobs_lock = threading.Lock()
+
+def get_job_store():
+    """Coada unică din proces; la prima utilizare șterge job-urile încheiate expirate."""
+    global _store
+    with _jobs_lock:
+        if _store is None:
+            _store = AnalysisJobStore()
+            _store.cleanup()
+        return _store
+
+def get_job_runner():
+    """Workerii din proces (ARTADVISOR_ANALYSIS_JOB_WORKERS), porniți la prima utilizare."""
+    global _runner
+    store = get_job_store()
+    with _jobs_lock:
+        if _runner is None:
+            _runner = AnalysisJobRunner(store).start()
+        return _runner
+
+def submit_analysis_job(image, style_option, timestamp, show_report_pdf=False, original_image=None):
+    """
+    Pune în coadă analiza completă a imaginii (decupate) și returnează id-ul job-ului. original_image,
+    imaginea încărcată înainte de decupare, este păstrată cu job-ul și returnată în rezultat.
+    """
+    job_id = get_job_store().submit(image, {
+        "style_option": style_option,
+        "timestamp": timestamp,
+        "show_report_pdf": show_report_pdf,
+    }, original_image=original_image)
+    get_job_runner().notify()
+    return job_id
+
+def get_job(job_id):
+    """Starea unui job (vezi AnalysisJobStore.get) sau None."""
+    return get_job_store().get(job_id)
+
+def load_job_result(job_id):
+    """Rezultatul unui job finalizat sau None."""
+    return get_job_store().load_result(job_id)
+
+def main(argv=None):
+    """Worker de sine stătător pentru coadă: python -m utils.analysis_jobs --workers 2"""
+    parser = argparse.ArgumentParser(description="Worker pentru coada de analize ArtAdvisor")
+    parser.add_argument("--workers", type=int, default=max(1, ANALYSIS_JOB_WORKERS), help="Numărul de fire de execuție")
+    args = parser.parse_args(argv)
+
+    runner = AnalysisJobRunner(get_job_store(), workers=args.workers).start()
+    print(f"Worker de analize pornit ({args.workers} fire) pe {runner.store.db_path}")
+    try:
+        while True:
+            time.sleep(60)
+            get_job_store().cleanup()
+    except KeyboardInterrupt:
+        runner.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Depozitul artefactelor mari din sesiuni: imaginile analizate, audio-ul narațiunii, suprapunerile Grad-CAM.
+
+Sesiunile păstrează doar referințe mici (ArtifactRef); obiectele stau într-un LRU comun procesului, limitat
+în bytes (ARTADVISOR_ARTIFACT_MEMORY_MB). Intrările evacuate din memorie sunt serializate pe disc, într-un
+al doilea nivel limitat (ARTADVISOR_ARTIFACT_DISK_MB), și reîncărcate la următoarea accesare. Un artefact
+evacuat și de pe disc este pierdut: load() returnează None, iar apelantul îl recalculează sau renunță la el.
+Memoria procesului rămâne astfel mărginită oricâte sesiuni sunt conectate.
+"""
+
+import os
+import pickle
+import shutil
+import threading
+from collections import OrderedDict
+
+from config import ARTIFACT_MEMORY_MB, ARTIFACT_DISK_DIR, ARTIFACT_DISK_MB
+
+def artifact_nbytes(obj):
+    """Mărimea aproximativă în memorie a unui artefact (imagine PIL, array numpy, bytes)."""
+    if hasattr(obj, 'getbands') and hasattr(obj, 'size'):
+        width, height = obj.size
+        return width * height * len(obj.getbands())
+    if hasattr(obj, 'nbytes'):
+        return int(obj.nbytes)
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return len(obj)
+    if hasattr(obj, 'getbuffer'):
+        return obj.getbuffer().nbytes
+    return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+class ArtifactRef:
+    """Referința către un artefact din depozit; se păstrează în session_state în locul obiectului."""
+
+    __slots__ = ("key", "kind", "nbytes")
+
+    def __init__(self, key, kind, nbytes):
+        self.key = key
+        self.kind = kind
+        self.nbytes = nbytes
+
+    def load(self):
+        """Obiectul (din memorie sau reîncărcat de pe disc) sau None dacă a fost evacuat complet."""
+        return get_artifact_store().get(self)
+
+    def __getstate__(self):
+        return (self.key, self.kind, self.nbytes)
+
+    def __setstate__(self, state):
+        self.key, self.kind, self.nbytes = state
+
+    def __repr__(self):
+        return f"ArtifactRef({self.kind}, {self.nbytes} bytes)"
+
+class _Entry:
+    __slots__ = ("obj", "nbytes")
+
+    def __init__(self, obj, nbytes):
+        self.obj = obj
+        self.nbytes = nbytes
+
+class ArtifactStore:
+    """LRU în memorie limitat în bytes, cu evacuare pe disc (LRU limitat în bytes) și reîncărcare leneșă."""
+
+    def __init__(self, memory_bytes=ARTIFACT_MEMORY_MB * 1024 * 1024, disk_dir=ARTIFACT_DISK_DIR,
+                 disk_bytes=ARTIFACT_DISK_MB * 1024 * 1024):
+        self.memory_limit = memory_bytes
+        self.disk_limit = disk_bytes
+        # Fiecare proces are propriul director; cele rămase de la procese oprite sunt șterse la pornire
+        self.disk_dir = os.path.join(disk_dir, str(os.getpid()))
+        self._remove_orphans(disk_dir)
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._by_id = {}
+        self._owners = {}
+        self._spilling = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "adaugari": 0, "hits_memorie": 0, "reincarcari_disc": 0, "evacuari_disc": 0,
+            "pierdute": 0, "negasite": 0, "eliberate": 0,
+        }
+
+    @staticmethod
+    def _remove_orphans(root):
+        try:
+            names = os.listdir(root)
+        except OSError:
+            return
+        for name in names:
+            if not name.isdigit() or int(name) == os.getpid():
+                continue
+            try:
+                os.kill(int(name), 0)
+            except ProcessLookupError:
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            except OSError:
+                pass
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def put(self, obj, kind="artefact"):
+        """
+        Adaugă un obiect și returnează referința lui. Același obiect încă rezident primește aceeași intrare
+        (ex. imaginea comună hărților CAM de stil și autor), eliberată după ce toți deținătorii renunță la ea.
+        """
+        if obj is None:
+            return None
+        nbytes = artifact_nbytes(obj)
+        with self._lock:
+            key = self._by_id.get(id(obj))
+            if key is not None and key in self._memory and self._memory[key].obj is obj:
+                self._memory.move_to_end(key)
+                self._owners[key] += 1
+                return ArtifactRef(key, kind, nbytes)
+
+            self._counter += 1
+            key = f"{kind}_{self._counter}"
+            self._owners[key] = 1
+            self._stats["adaugari"] += 1
+            spilled = self._insert_memory(key, obj, nbytes)
+        self._spill(spilled)
+        return ArtifactRef(key, kind, nbytes)
+
+    def get(self, ref):
+        """Obiectul referit: din memorie, reîncărcat de pe disc sau None dacă a fost evacuat complet."""
+        if ref is None:
+            return None
+        with self._lock:
+            entry = self._memory.get(ref.key)
+            if entry is not None:
+                self._memory.move_to_end(ref.key)
+                self._stats["hits_memorie"] += 1
+                return entry.obj
+            entry = self._spilling.get(ref.key)
+            if entry is not None:
+                # Evacuat chiar acum, încă nescris pe disc
+                return entry.obj
+            on_disk = ref.key in self._disk
+
+        if not on_disk:
+            with self._lock:
+                self._stats["negasite"] += 1
+            return None
+
+        try:
+            with open(self._disk_path(ref.key), 'rb') as f:
+                obj = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            print(f"Eroare la reîncărcarea artefactului {ref.key}: {e}")
+            with self._lock:
+                self._stats["negasite"] += 1
+            return None
+
+        with self._lock:
+            self._stats["reincarcari_disc"] += 1
+            if ref.key in self._memory:
+                # Alt fir l-a reîncărcat între timp
+                return self._memory[ref.key].obj
+            self._forget_disk(ref.key)
+            spilled = self._insert_memory(ref.key, obj, artifact_nbytes(obj))
+        self._spill(spilled)
+        return obj
+
+    def discard(self, *refs):
+        """Renunță la referințe care nu mai sunt folosite (ex. analiza anterioară a unei sesiuni)."""
+        with self._lock:
+            for ref in refs:
+                if ref is None or ref.key not in self._owners:
+                    continue
+                self._owners[ref.key] -= 1
+                if self._owners[ref.key] > 0:
+                    continue
+                del self._owners[ref.key]
+                entry = self._memory.pop(ref.key, None)
+                if entry is not None:
+                    self._memory_bytes -= entry.nbytes
+                    self._by_id.pop(id(entry.obj), None)
+                    self._stats["eliberate"] += 1
+                elif ref.key in self._disk:
+                    self._forget_disk(ref.key)
+                    self._stats["eliberate"] += 1
+
+    def _insert_memory(self, key, obj, nbytes):
+        """Inserează în LRU-ul din memorie; returnează intrările evacuate, de scris pe disc în afara lock-ului."""
+        self._memory[key] = _Entry(obj, nbytes)
+        self._memory_bytes += nbytes
+        self._by_id[id(obj)] = key
+        spilled = []
+        while self._memory_bytes > self.memory_limit and self._memory:
+            evicted_key, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self._by_id.pop(id(evicted.obj), None)
+            self._spilling[evicted_key] = evicted
+            spilled.append((evicted_key, evicted))
+        return spilled
+
+    def _spill(self, spilled):
+        for key, entry in spilled:
+            size = self._write_disk(key, entry.obj)
+            with self._lock:
+                self._spilling.pop(key, None)
+                if size is None:
+                    self._owners.pop(key, None)
+                    self._stats["pierdute"] += 1
+                    continue
+                if key not in self._owners:
+                    # Eliberat cât timp era scris pe disc
+                    self._remove_file(key)
+                    continue
+                self._stats["evacuari_disc"] += 1
+                self._disk[key] = size
+                self._disk_bytes += size
+                while self._disk_bytes > self.disk_limit and self._disk:
+                    evicted_key = next(iter(self._disk))
+                    self._forget_disk(evicted_key)
+                    self._owners.pop(evicted_key, None)
+                    self._stats["pierdute"] += 1
+
+    def _write_disk(self, key, obj):
+        """Serializează artefactul pe disc; returnează mărimea scrisă sau None dacă nu a putut fi păstrat."""
+        try:
+            payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f"Artefactul {key} nu poate fi mutat pe disc: {e}")
+            return None
+        if len(payload) > self.disk_limit:
+            return None
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            with open(self._disk_path(key), 'wb') as f:
+                f.write(payload)
+        except OSError as e:
+            print(f"Eroare la scrierea artefactului {key} pe disc: {e}")
+            return None
+        return len(payload)
+
+    def _forget_disk(self, key):
+        size = self._disk.pop(key, None)
+        if size is None:
+            return
+        self._disk_bytes -= size
+        self._remove_file(key)
+
+    def _remove_file(self, key):
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+
+    def stats(self):
+        """Bytes rezidenți în memorie și pe disc, numărul de intrări și contoarele de evacuare/reîncărcare."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "intrari_memorie": len(self._memory),
+                "bytes_memorie": self._memory_bytes,
+                "limita_memorie": self.memory_limit,
+                "intrari_disc": len(self._disk),
+                "bytes_disc": self._disk_bytes,
+                "limita_disc": self.disk_limit,
+            })
+            return stats
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_artifact_store():
+    """Depozitul de artefacte unic din proces."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
+
+def store_artifact(obj, kind="artefact"):
+    """Pune obiectul în depozit și returnează referința (None pentru None)."""
+    return get_artifact_store().put(obj, kind)
+
+def resolve_artifact(value):
+    """Obiectul din spatele unei referințe; orice altă valoare (inclusiv obiectele vechi din sesiune) e returnată ca atare."""
+    return value.load() if isinstance(value, ArtifactRef) else value
+
+def get_artifact_stats():
+    return get_artifact_store().stats()
+
+def discard_artifacts(*values):
+    """Eliberează referințele dintre valorile date; celelalte valori sunt ignorate."""
+    refs = [value for value in values if isinstance(value, ArtifactRef)]
+    if refs:
+        get_artifact_store().discard(*refs)
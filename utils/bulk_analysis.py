@@ -0,0 +1,182 @@
+"""
+Analiză offline în masă: importă un director întreg de imagini în galerie, fără interfața Streamlit.
+Decodarea rulează în procese separate, în paralel cu inferența pe loturi din procesul principal.
+Progresul este salvat într-un fișier checkpoint, astfel încât o rulare întreruptă continuă de unde a rămas.
+"""
+
+import os
+import time
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from PIL import Image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+def iter_image_paths(input_dir):
+    """Parcurge directorul recursiv și returnează (stream) căile absolute ale imaginilor, în ordine stabilă."""
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.abspath(os.path.join(root, name))
+
+def default_checkpoint_path(input_dir, gallery_dir="gallery_uploads"):
+    """Fișierul checkpoint implicit, unic pentru fiecare director sursă."""
+    digest = hashlib.sha1(os.path.abspath(input_dir).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(gallery_dir, f".bulk_checkpoint_{digest}.txt")
+
+def load_checkpoint(checkpoint_path):
+    """Încarcă mulțimea de imagini deja procesate."""
+    if not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        return {line.rstrip('\n') for line in f if line.strip()}
+
+def _init_decode_worker():
+    """Fiecare proces de decodare folosește un singur fir torch, pentru a nu concura cu inferența."""
+    import torch
+    torch.set_num_threads(1)
+
+def decode_for_bulk(image_path):
+    """Rulează în procesele de decodare. Returnează (cale, tensor, imagine RGB, eroare)."""
+    from predictors.preprocessing import load_image_for_analysis
+    try:
+        image_tensor, original_rgb = load_image_for_analysis(image_path)
+        return image_path, image_tensor, original_rgb, None
+    except Exception as e:
+        return image_path, None, None, str(e)
+
+def _predict_batch(batch, gradcam):
+    """
+    Rulează cele trei modele pe un lot de imagini decodate, în clasa de prioritate "lot" a planificatorului:
+    lotul este împărțit în bucăți, iar fiecare forward pe o bucată așteaptă până nu mai există cereri
+    interactive, care pot prelua astfel modelele între bucăți.
+    """
+    from predict import merge_predictions
+    from predictors.style_predictor import predict_style_batch
+    from predictors.author_predictor import predict_author_batch
+    from predictors.emotion_predictor import predict_emotion_batch
+    from predictors.scheduler import scheduled, iter_chunks, PRIORITY_BATCH
+
+    predict_style = scheduled(predict_style_batch, PRIORITY_BATCH)
+    predict_author = scheduled(predict_author_batch, PRIORITY_BATCH)
+    predict_emotion = scheduled(predict_emotion_batch, PRIORITY_BATCH)
+
+    merged = []
+    for chunk in iter_chunks(batch):
+        tensors = [image_tensor for _, image_tensor, _ in chunk]
+        original_rgbs = [original_rgb for _, _, original_rgb in chunk] if gradcam else None
+        style_results = predict_style(tensors, original_rgbs)
+        author_results = predict_author(tensors, original_rgbs)
+        emotion_results = predict_emotion(tensors)
+        merged.extend(merge_predictions(s, a, e) for s, a, e in zip(style_results, author_results, emotion_results))
+
+    return merged
+
+def _model_error(predictions):
+    """Prima eroare raportată de un model pentru o imagine, sau None dacă toate modelele au reușit."""
+    for key in ('stil', 'autor', 'emotie'):
+        error = predictions.get(key, {}).get('error')
+        if error:
+            return error
+    return None
+
+def _save_to_gallery(predictions, original_rgb, gallery_dir, gradcam):
+    """Scrie perechea JSON/PNG în aceeași schemă ca save_analysis_metadata."""
+    from utils.data_management import save_analysis_metadata
+
+    # Microsecundele garantează nume unice când se salvează mai multe imagini pe secundă
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    success, image_path, metadata_path = save_analysis_metadata(
+        predictions, None, Image.fromarray(original_rgb), timestamp, gallery_dir=gallery_dir
+    )
+
+    if success and gradcam:
+        from predictors.cam_overlay import get_gradcam_image
+        for key in ('stil', 'autor'):
+            overlay = get_gradcam_image(predictions.get(key))
+            if overlay is not None:
+                overlay.save(os.path.join(gallery_dir, f"art_{timestamp}_gradcam_{key}.png"))
+
+    return success, metadata_path
+
+def run_bulk_analysis(input_dir, gallery_dir="gallery_uploads", batch_size=16, workers=None,
+                      gradcam=True, checkpoint_path=None, report_every=50):
+    """
+    Analizează toate imaginile din input_dir și le salvează în galerie. Imaginile la care un model a eșuat
+    sunt numărate ca erori și nu sunt salvate, deci o rulare reluată le reîncearcă.
+    Returnează statisticile rulării: procesate, erori, sărite (din checkpoint), imagini/secundă.
+    """
+    os.makedirs(gallery_dir, exist_ok=True)
+    checkpoint_path = checkpoint_path or default_checkpoint_path(input_dir, gallery_dir)
+    done = load_checkpoint(checkpoint_path)
+
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    max_in_flight = max(batch_size * 2, workers * 4)
+    pending = (path for path in iter_image_paths(input_dir) if path not in done)
+
+    stats = {"procesate": 0, "erori": 0, "sarite": len(done), "imagini_pe_secunda": 0.0}
+    start = time.monotonic()
+    last_report = 0
+
+    def process(batch, checkpoint):
+        for (path, _, original_rgb), predictions in zip(batch, _predict_batch(batch, gradcam)):
+            # O eroare de model (adesea trecătoare) nu ajunge în galerie și nici în checkpoint: rularea următoare reîncearcă imaginea
+            error = _model_error(predictions)
+            if error:
+                stats["erori"] += 1
+                print(f"Eroare la analiza {path}: {error}")
+                continue
+
+            success, detail = _save_to_gallery(predictions, original_rgb, gallery_dir, gradcam)
+            if success:
+                checkpoint.write(path + '\n')
+                stats["procesate"] += 1
+            else:
+                stats["erori"] += 1
+                print(f"Eroare la salvarea {path}: {detail}")
+        checkpoint.flush()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_decode_worker) as pool, \
+            open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+        in_flight = deque()
+
+        def fill():
+            while len(in_flight) < max_in_flight:
+                path = next(pending, None)
+                if path is None:
+                    return
+                in_flight.append(pool.submit(decode_for_bulk, path))
+
+        fill()
+        batch = []
+        while in_flight:
+            path, image_tensor, original_rgb, error = in_flight.popleft().result()
+            fill()
+
+            if error:
+                stats["erori"] += 1
+                print(f"Eroare la decodarea {path}: {error}")
+                continue
+
+            batch.append((path, image_tensor, original_rgb))
+            if len(batch) >= batch_size:
+                process(batch, checkpoint)
+                batch = []
+
+            if stats["procesate"] - last_report >= report_every:
+                last_report = stats["procesate"]
+                rate = stats["procesate"] / max(time.monotonic() - start, 1e-6)
+                print(f"{stats['procesate']} imagini procesate ({rate:.1f} imagini/s)")
+
+        if batch:
+            process(batch, checkpoint)
+
+    elapsed = max(time.monotonic() - start, 1e-6)
+    stats["imagini_pe_secunda"] = stats["procesate"] / elapsed
+    print(f"Gata: {stats['procesate']} procesate, {stats['erori']} erori, {stats['sarite']} sărite "
+          f"în {elapsed:.1f}s ({stats['imagini_pe_secunda']:.1f} imagini/s)")
+    return stats
@@ -1,10 +1,10 @@
 import os
 import json
-import glob
-import numpy as np
 from datetime import datetime
-from sklearn.metrics.pairwise import cosine_similarity
-from config import ALL_EMOTIONS
+from utils.gallery_index import get_gallery_index, artwork_id
+from utils.emotion_index import get_emotion_index
+from utils.visual_index import get_visual_index
+from utils.gallery_journal import get_gallery_journal, get_gallery_view, remove_from_indexes
 
 # Cache optimizat pentru citirea fișierelor JSON
 def get_artwork_details_cached(json_file_path, file_mtime):
@@ -21,43 +21,28 @@ def get_artwork_details_cached(json_file_path, file_mtime):
     
     return _load_cached(json_file_path, file_mtime)
 
-# Cache pentru lista completă de opere
+# Lista completă de opere, ținută în memorie și actualizată doar cu intrările noi din jurnalul galeriei
 def get_all_artworks_cached(gallery_dir="gallery_uploads", sort_by_date=True):
-    """Încarcă toate operele de artă din galerie cu cache optimizat."""
-    import streamlit as st
-    
-    @st.cache_data(ttl=60, show_spinner=False)
-    def _load_all_cached(dir_path, sort_flag):
-        artworks = []
-        
-        if os.path.exists(dir_path):
-            json_files = glob.glob(os.path.join(dir_path, "art_*.json"))
-            
-            if sort_flag:
-                json_files.sort(key=os.path.getmtime, reverse=True)
-            
-            for json_file in json_files:
-                
-                file_mtime = os.path.getmtime(json_file)
-                metadata = get_artwork_details_cached(json_file, file_mtime)
-                
-                if metadata:
-                    image_file = json_file.replace('.json', '.png')
-                    if os.path.exists(image_file):
-                        artworks.append({
-                            'metadata': metadata,
-                            'image_path': image_file,
-                            'json_path': json_file
-                        })
-        
-        return artworks
-    
-    return _load_all_cached(gallery_dir, sort_by_date)
+    """Încarcă toate operele de artă din galerie (lista incrementală din utils.gallery_journal)."""
+    return get_gallery_view(gallery_dir, "data" if sort_by_date else "timestamp").artworks()
 
-def save_analysis_metadata(predictions, narrative, cropped_image, timestamp_str):
+def iter_artworks(cursor=None, limit=24, sort="data", filters=None, gallery_dir="gallery_uploads", descending=None):
+    """
+    O pagină din galerie: (rezumate, cursor_următor). Rezumatele au doar coloanele indexului (id, stil,
+    autor, scoruri, căi), fără descrierea narativă; cursor_următor este None după ultima pagină.
+    filters: style, author, min_style_score, min_author_score. Memoria și timpul per pagină nu cresc cu galeria.
+    """
+    return get_gallery_index(gallery_dir).list_summaries(
+        sort=sort, descending=descending, limit=limit, cursor=cursor, **(filters or {})
+    )
+
+def load_artwork_page(summaries, gallery_dir="gallery_uploads"):
+    """Metadatele complete doar pentru operele paginii afișate, în formatul get_all_artworks și în ordinea paginii."""
+    return get_gallery_index(gallery_dir).get_many(summary['id'] for summary in summaries)
+
+def save_analysis_metadata(predictions, narrative, cropped_image, timestamp_str, gallery_dir="gallery_uploads"):
     """Salvează metadatele analizei pentru galerie."""
     try:
-        gallery_dir = "gallery_uploads"
         os.makedirs(gallery_dir, exist_ok=True)
         
         image_filename = f"art_{timestamp_str}.png"
@@ -79,59 +64,81 @@ def save_analysis_metadata(predictions, narrative, cropped_image, timestamp_str)
             "data_analiza": datetime.now().strftime("%d.%m.%Y %H:%M")
         }
         
-        with open(metadata_path, 'w', encoding='utf-8') as f:
+        # Fișierul JSON este înlocuit atomic, apoi opera este scrisă în index într-o tranzacție
+        temp_path = f"{metadata_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, metadata_path)
+        item_id = artwork_id(metadata_path)
+        mtime = os.path.getmtime(metadata_path)
+        get_gallery_index(gallery_dir).upsert(metadata, image_path, metadata_path, mtime)
+        get_emotion_index(gallery_dir).upsert(item_id, metadata["emotii_detectate"])
+        embedding = predictions.get('emotie', {}).get('embedding')
+        if embedding is not None:
+            get_visual_index(gallery_dir).upsert(item_id, embedding)
+        # Intrarea din jurnal se scrie ultima: cititorii care o aplică găsesc opera deja indexată
+        get_gallery_journal(gallery_dir).record_upsert(item_id, mtime)
         
         return True, image_path, metadata_path
     except Exception as e:
         return False, None, str(e)
 
-def search_by_emotion(target_emotions, gallery_dir="gallery_uploads"):
-    """Caută opere de artă pe baza emoțiilor selectate."""
-    if not target_emotions:
+def delete_artwork(item_id, gallery_dir="gallery_uploads"):
+    """Șterge perechea PNG/JSON a unei opere și o scoate din indexuri; ștergerea este scrisă în jurnal."""
+    try:
+        for extension in (".png", ".json"):
+            path = os.path.join(gallery_dir, f"{item_id}{extension}")
+            if os.path.exists(path):
+                os.remove(path)
+        remove_from_indexes(gallery_dir, [item_id])
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+def search_by_emotion(target_emotions, gallery_dir="gallery_uploads", top_k=10):
+    """
+    Caută opere de artă pe baza emoțiilor selectate: similaritatea cosinus față de matricea de emoții
+    a galeriei (un produs matrice-vector și top-k prin argpartition).
+    """
+    if not target_emotions or not os.path.exists(gallery_dir):
+        return []
+
+    # Câteva rezultate în plus acoperă operele din matrice care au dispărut între timp din galerie
+    matches = get_emotion_index(gallery_dir).search(target_emotions, top_k=top_k * 2)
+    similarities = dict(matches)
+
+    results = []
+    for artwork in get_gallery_index(gallery_dir).get_many(item_id for item_id, _ in matches):
+        item_id = artwork_id(artwork['json_path'])
+        results.append({
+            'image_path': artwork['image_path'],
+            'metadata': artwork['metadata'],
+            'similarity': similarities[item_id]
+        })
+    return results[:top_k]
+
+def search_similar_artworks(embedding, gallery_dir="gallery_uploads", top_k=10, exclude_id=None):
+    """
+    Operele cele mai asemănătoare vizual cu un embedding (predictions['emotie']['embedding']): căutare
+    exactă în galeriile mici, index IVF peste VISUAL_INDEX_MIN_ROWS opere. exclude_id omite opera însăși.
+    """
+    if embedding is None or not os.path.exists(gallery_dir):
         return []
-    
-    # Creează vectorul țintă
-    target_vector = np.zeros(len(ALL_EMOTIONS))
-    for emotion in target_emotions:
-        if emotion in ALL_EMOTIONS:
-            target_vector[ALL_EMOTIONS.index(emotion)] = 1.0
-    
+
+    matches = [
+        (item_id, score) for item_id, score in get_visual_index(gallery_dir).search(embedding, top_k=top_k * 2 + 1)
+        if item_id != exclude_id and score > 0
+    ]
+    similarities = dict(matches)
+
     results = []
-    
-    if os.path.exists(gallery_dir):
-        json_files = glob.glob(os.path.join(gallery_dir, "art_*.json"))
-        
-        for json_file in json_files:
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                emotions_detected = metadata.get('emotii_detectate', {})
-                
-                # Creează vectorul pentru această operă
-                artwork_vector = np.zeros(len(ALL_EMOTIONS))
-                for emotion, score in emotions_detected.items():
-                    if emotion in ALL_EMOTIONS:
-                        artwork_vector[ALL_EMOTIONS.index(emotion)] = score
-                
-                # Calculează similaritatea cosinus
-                if np.linalg.norm(artwork_vector) > 0 and np.linalg.norm(target_vector) > 0:
-                    similarity = cosine_similarity([target_vector], [artwork_vector])[0][0]
-                    
-                    image_file = json_file.replace('json', 'png')
-                    if os.path.exists(image_file):
-                        results.append({
-                            'image_path': image_file,
-                            'metadata': metadata,
-                            'similarity': similarity
-                        })
-            except Exception as e:
-                continue
-    
-    # Sortează după similaritate
-    results.sort(key=lambda x: x['similarity'], reverse=True)
-    return results[:10]  # Returnează primele 10 rezultate
+    for artwork in get_gallery_index(gallery_dir).get_many(item_id for item_id, _ in matches):
+        results.append({
+            'image_path': artwork['image_path'],
+            'metadata': artwork['metadata'],
+            'similarity': similarities[artwork_id(artwork['json_path'])]
+        })
+    return results[:top_k]
 
 def get_artwork_details(json_file_path):
     """Încarcă detaliile unei opere de artă din fișierul JSON. (Funcție backwards-compatible)"""
@@ -139,7 +146,7 @@ def get_artwork_details(json_file_path):
     return get_artwork_details_cached(json_file_path, file_mtime)
 
 def get_all_artworks(gallery_dir="gallery_uploads", sort_by_date=True):
-    """Încarcă toate operele de artă din galerie. (Funcție backwards-compatible)"""
+    """Încarcă toate operele de artă din galerie. (Funcție backwards-compatible; pentru pagini: iter_artworks)"""
     return get_all_artworks_cached(gallery_dir, sort_by_date)
 
 def save_feedback_to_csv(feedback_data):
@@ -0,0 +1,99 @@
+"""
+Matricea de emoții a galeriei, pentru căutarea după emoții.
+
+Fiecare operă are un rând float32 cu scorurile emoțiilor (ordinea ALL_EMOTIONS), normalizat L2, într-un
+fișier .npy citit prin memory-map; al doilea fișier, emotion_ids.txt, dă id-ul operei pentru fiecare rând
+(stocarea comună din utils.vector_store). O căutare este un singur produs matrice-vector plus argpartition
+pentru top-k, deci rămâne în milisecunde și pentru milioane de rânduri.
+"""
+
+import argparse
+import os
+import threading
+
+import numpy as np
+
+from config import ALL_EMOTIONS
+from utils.gallery_index import get_gallery_index
+from utils.vector_store import MemmapVectorStore
+
+MATRIX_FILENAME = "emotion_matrix.npy"
+IDS_FILENAME = "emotion_ids.txt"
+LOCK_FILENAME = "emotion_matrix.lock"
+
+EMOTION_POSITIONS = {emotion: position for position, emotion in enumerate(ALL_EMOTIONS)}
+
+def emotion_vector(emotions):
+    """Vectorul float32 normalizat L2 al unui dict {emoție: scor} sau al unei liste de emoții (pondere 1)."""
+    vector = np.zeros(len(ALL_EMOTIONS), dtype=np.float32)
+    items = emotions.items() if isinstance(emotions, dict) else ((emotion, 1.0) for emotion in emotions)
+    for emotion, score in items:
+        position = EMOTION_POSITIONS.get(emotion)
+        if position is not None:
+            vector[position] = score
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+class EmotionIndex(MemmapVectorStore):
+    """Matricea de emoții (memory-map) și harta rând -> id a unui director de galerie."""
+
+    def __init__(self, gallery_dir):
+        super().__init__(gallery_dir, MATRIX_FILENAME, IDS_FILENAME, LOCK_FILENAME, len(ALL_EMOTIONS))
+        self.gallery_dir = gallery_dir
+
+    def upsert(self, item_id, emotions):
+        """Scrie (sau rescrie) rândul unei opere din {emoție: scor}."""
+        super().upsert(item_id, emotion_vector(emotions))
+
+    def rebuild(self, entries):
+        """Reconstruiește matricea din (id, {emoție: scor})."""
+        return super().rebuild((item_id, emotion_vector(emotions)) for item_id, emotions in entries)
+
+    def search(self, query, top_k=10):
+        """
+        Cele mai apropiate top_k opere după similaritatea cosinus cu query ({emoție: scor} sau listă de emoții).
+        Returnează [(id, similaritate)], descrescător; operele fără emoții comune (similaritate 0) sunt omise.
+        """
+        query_vector = emotion_vector(query)
+        if not query_vector.any():
+            return []
+        # Rândurile sunt deja normalizate: produsul scalar este similaritatea cosinus
+        return [(item_id, score) for item_id, score in self.search_vector(query_vector, top_k) if score > 0]
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def _gallery_entries(gallery_dir):
+    for artwork in get_gallery_index(gallery_dir).list_artworks(sort="timestamp", descending=False):
+        item_id = os.path.splitext(os.path.basename(artwork['json_path']))[0]
+        yield item_id, artwork['metadata'].get('emotii_detectate', {})
+
+def get_emotion_index(gallery_dir="gallery_uploads"):
+    """
+    Matricea de emoții unică din proces a unei galerii. La prima deschidere este reconstruită din indexul
+    galeriei dacă îi lipsesc opere (matrice nouă, fișiere importate din afara aplicației).
+    """
+    key = os.path.abspath(gallery_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = EmotionIndex(gallery_dir)
+            if len(index) < get_gallery_index(gallery_dir).count():
+                rows = index.rebuild(_gallery_entries(gallery_dir))
+                print(f"Matricea de emoții pentru {gallery_dir}: {rows} rânduri reconstruite")
+            _indexes[key] = index
+        return index
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Matricea de emoții a galeriei ArtAdvisor")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Reconstruiește matricea din indexul galeriei")
+    rebuild_parser.add_argument("--gallery-dir", default="gallery_uploads", help="Directorul galeriei")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        rows = EmotionIndex(args.gallery_dir).rebuild(_gallery_entries(args.gallery_dir))
+        print(f"Matricea de emoții reconstruită: {rows} rânduri")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""
+Indexul galeriei: o bază SQLite (modul WAL) alături de perechile art_*.json / art_*.png.
+
+Fișierele JSON rămân sursa completă a metadatelor, dar listarea, sortarea și filtrarea galeriei nu mai
+deschid fiecare fișier: save_analysis_metadata scrie rândul operei în index într-o tranzacție, iar coloanele
+după care se sortează și se filtrează (timestamp, stil, autor, scoruri) sunt indexate. Galeriile existente
+sunt importate automat la prima deschidere a unui index gol, sau explicit cu:
+    python -m utils.gallery_index import [--gallery-dir gallery_uploads]
+"""
+
+import argparse
+import base64
+import glob
+import json
+import os
+import sqlite3
+import threading
+
+from config import GALLERY_INDEX_FILENAME
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artworks (
+    id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    stil_dominant TEXT NOT NULL DEFAULT '',
+    stil_scor REAL,
+    autor_probabil TEXT NOT NULL DEFAULT '',
+    autor_scor REAL,
+    image_path TEXT NOT NULL,
+    json_path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artworks_stil ON artworks (stil_dominant, stil_scor);
+CREATE INDEX IF NOT EXISTS artworks_autor ON artworks (autor_probabil, autor_scor);
+CREATE INDEX IF NOT EXISTS artworks_mtime_id ON artworks (mtime, id);
+CREATE INDEX IF NOT EXISTS artworks_timestamp_id ON artworks (timestamp, id);
+CREATE INDEX IF NOT EXISTS artworks_stil_id ON artworks (stil_dominant, id);
+CREATE INDEX IF NOT EXISTS artworks_autor_id ON artworks (autor_probabil, id);
+CREATE INDEX IF NOT EXISTS artworks_stil_scor_id ON artworks (stil_scor, id);
+CREATE INDEX IF NOT EXISTS artworks_autor_scor_id ON artworks (autor_scor, id);
+"""
+
+# Coloanele text de sortare fără valoare sunt stocate ca '' (nu NULL), ca paginarea după cheie să poată
+# căuta direct în indexul (coloană, id); rezumatele le returnează din nou ca None
+_MISSING_TEXT = ""
+_TEXT_SORT_COLUMNS = ("stil_dominant", "autor_probabil")
+
+# Criteriile de sortare acceptate -> coloana cu index compus (coloană, id); id-ul departajează în aceeași direcție
+SORT_COLUMNS = {
+    "data": "mtime",
+    "timestamp": "timestamp",
+    "stil": "stil_dominant",
+    "autor": "autor_probabil",
+    "stil_scor": "stil_scor",
+    "autor_scor": "autor_scor",
+}
+
+# Ordinea implicită a fiecărui criteriu în listarea paginată (cele mai noi / cele mai sigure întâi)
+DEFAULT_DESCENDING = {
+    "data": True,
+    "timestamp": False,
+    "stil": False,
+    "autor": False,
+    "stil_scor": True,
+    "autor_scor": True,
+}
+
+# Coloanele unui rezumat de operă (fără metadata: descrierea narativă și emoțiile rămân în JSON / index)
+SUMMARY_COLUMNS = ("id", "timestamp", "stil_dominant", "stil_scor", "autor_probabil", "autor_scor",
+                   "image_path", "json_path", "mtime")
+
+def encode_cursor(value, item_id):
+    """Cursorul opac al unei pagini: valoarea de sortare și id-ul ultimei opere afișate."""
+    return base64.urlsafe_b64encode(json.dumps([value, item_id]).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        value, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError(f"Cursor invalid: {cursor}") from e
+    return value, item_id
+
+def artwork_id(json_path):
+    """Id-ul unei opere: numele fișierului fără extensie (ex. art_20240101_120000)."""
+    return os.path.splitext(os.path.basename(json_path))[0]
+
+class GalleryIndex:
+    """Indexul SQLite al unui director de galerie (o conexiune per fir)."""
+
+    def __init__(self, gallery_dir):
+        self.gallery_dir = gallery_dir
+        self.db_path = os.path.join(gallery_dir, GALLERY_INDEX_FILENAME)
+        self._local = threading.local()
+        os.makedirs(gallery_dir, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_values(metadata, image_path, json_path, mtime):
+        return (
+            artwork_id(json_path),
+            str(metadata.get("timestamp", "")),
+            metadata.get("stil_dominant") or _MISSING_TEXT,
+            float(metadata.get("stil_scor") or 0),
+            metadata.get("autor_probabil") or _MISSING_TEXT,
+            float(metadata.get("autor_scor") or 0),
+            image_path,
+            json_path,
+            mtime,
+            json.dumps(metadata, ensure_ascii=False),
+        )
+
+    def upsert_many(self, entries):
+        """Adaugă sau actualizează opere într-o singură tranzacție; entries: (metadata, image_path, json_path, mtime)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO artworks (id, timestamp, stil_dominant, stil_scor, autor_probabil, autor_scor, "
+                "image_path, json_path, mtime, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._row_values(*entry) for entry in entries]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def upsert(self, metadata, image_path, json_path, mtime=None):
+        """Adaugă sau actualizează o operă (apelat de save_analysis_metadata)."""
+        if mtime is None:
+            mtime = os.path.getmtime(json_path)
+        self.upsert_many([(metadata, image_path, json_path, mtime)])
+
+    def remove(self, artwork_ids):
+        """Elimină operele date din index (fișierele nu sunt atinse)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("DELETE FROM artworks WHERE id = ?", [(item,) for item in artwork_ids])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM artworks").fetchone()[0]
+
+    def _where(self, style=None, author=None, min_style_score=None, min_author_score=None):
+        clauses, params = [], []
+        if style:
+            clauses.append("stil_dominant = ?")
+            params.append(style)
+        if author:
+            clauses.append("autor_probabil = ?")
+            params.append(author)
+        if min_style_score is not None:
+            clauses.append("stil_scor >= ?")
+            params.append(min_style_score)
+        if min_author_score is not None:
+            clauses.append("autor_scor >= ?")
+            params.append(min_author_score)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def list_artworks(self, sort="data", descending=True, limit=None, offset=0, **filters):
+        """
+        Operele din galerie în formatul get_all_artworks ({'metadata', 'image_path', 'json_path', 'mtime'}),
+        sortate și filtrate prin interogări indexate. filters: style, author, min_style_score, min_author_score.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Criteriu de sortare necunoscut: {sort}")
+        where, params = self._where(**filters)
+        direction = 'DESC' if descending else 'ASC'
+        query = (f"SELECT metadata, image_path, json_path, mtime FROM artworks{where} "
+                 f"ORDER BY {SORT_COLUMNS[sort]} {direction}, id {direction}")
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        return [
+            self._artwork(row) for row in self._connection().execute(query, params)
+        ]
+
+    def summaries_query(self, sort="data", descending=None, limit=24, cursor=None, **filters):
+        """
+        Interogarea (sql, parametri) unei pagini de rezumate. Cursorul devine o comparație de tip row-value,
+        (coloană, id) > (?, ?) sau <, iar ordinea (coloană, id) are aceeași direcție pe ambele chei, deci
+        SQLite caută direct în indexul compus al coloanei, fără sortare temporară.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Criteriu de sortare necunoscut: {sort}")
+        if descending is None:
+            descending = DEFAULT_DESCENDING[sort]
+        column = SORT_COLUMNS[sort]
+        direction = 'DESC' if descending else 'ASC'
+        where, params = self._where(**filters)
+
+        if cursor:
+            value, last_id = decode_cursor(cursor)
+            after = f"({column}, id) {'<' if descending else '>'} (?, ?)"
+            where = f"{where} AND {after}" if where else f" WHERE {after}"
+            params += [value, last_id]
+
+        query = (f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM artworks{where} "
+                 f"ORDER BY {column} {direction}, id {direction} LIMIT ?")
+        return query, params + [limit + 1]
+
+    def list_summaries(self, sort="data", descending=None, limit=24, cursor=None, **filters):
+        """
+        O pagină de rezumate (SUMMARY_COLUMNS, fără metadatele complete) și cursorul paginii următoare
+        (None la final). Paginarea este după cheie (valoarea de sortare, id), nu după OFFSET: fiecare pagină
+        este o căutare în indexul (coloană, id), oricât de departe ar fi în galerie.
+        """
+        query, params = self.summaries_query(sort, descending, limit, cursor, **filters)
+        rows = self._connection().execute(query, params).fetchall()
+
+        column = SORT_COLUMNS[sort]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(rows[limit - 1][column], rows[limit - 1]["id"])
+
+        summaries = []
+        for row in rows[:limit]:
+            summary = dict(row)
+            for text_column in _TEXT_SORT_COLUMNS:
+                summary[text_column] = summary[text_column] or None
+            summaries.append(summary)
+        return summaries, next_cursor
+
+    @staticmethod
+    def _artwork(row):
+        return {'metadata': json.loads(row["metadata"]), 'image_path': row["image_path"],
+                'json_path': row["json_path"], 'mtime': row["mtime"]}
+
+    def mtime_of(self, artwork_id_value):
+        """mtime-ul fișierului JSON la ultima indexare a operei sau None."""
+        row = self._connection().execute("SELECT mtime FROM artworks WHERE id = ?", (artwork_id_value,)).fetchone()
+        return row["mtime"] if row is not None else None
+
+    def get(self, artwork_id_value):
+        """Metadatele unei opere din index sau None."""
+        row = self._connection().execute("SELECT metadata FROM artworks WHERE id = ?", (artwork_id_value,)).fetchone()
+        return json.loads(row["metadata"]) if row is not None else None
+
+    def get_many(self, artwork_ids):
+        """Operele cu id-urile date, în formatul list_artworks, păstrând ordinea cererii (id-urile lipsă sunt omise)."""
+        artwork_ids = list(artwork_ids)
+        if not artwork_ids:
+            return []
+        placeholders = ", ".join("?" for _ in artwork_ids)
+        rows = {
+            row["id"]: self._artwork(row)
+            for row in self._connection().execute(
+                f"SELECT id, metadata, image_path, json_path, mtime FROM artworks WHERE id IN ({placeholders})", artwork_ids
+            )
+        }
+        return [rows[item_id] for item_id in artwork_ids if item_id in rows]
+
+    def distinct_values(self, column):
+        """Valorile distincte ale unei coloane de filtrare ("stil_dominant" sau "autor_probabil")."""
+        if column not in ("stil_dominant", "autor_probabil"):
+            raise ValueError(f"Coloană necunoscută: {column}")
+        return [row[0] for row in self._connection().execute(
+            f"SELECT DISTINCT {column} FROM artworks WHERE {column} != '' ORDER BY {column}"
+        )]
+
+    def import_json_files(self, batch_size=500, on_imported=None, on_removed=None):
+        """
+        Importul perechilor JSON/PNG existente: adaugă fișierele noi sau modificate (după mtime) și
+        elimină operele ale căror fișiere au dispărut. Returnează (importate, eliminate).
+        on_imported(entries) primește fiecare lot importat ((metadata, image_path, json_path, mtime));
+        on_removed(ids), dacă este dat, face eliminarea în locul indexului (ex. remove_from_indexes din
+        utils.gallery_journal, care curăță și matricile de vectori și scrie jurnalul).
+        """
+        indexed = {row["id"]: row["mtime"] for row in self._connection().execute("SELECT id, mtime FROM artworks")}
+        seen = set()
+        batch = []
+        imported = 0
+
+        for json_path in glob.glob(os.path.join(self.gallery_dir, "art_*.json")):
+            image_path = json_path[:-len('.json')] + '.png'
+            if not os.path.exists(image_path):
+                continue
+            item_id = artwork_id(json_path)
+            seen.add(item_id)
+            try:
+                mtime = os.path.getmtime(json_path)
+                if indexed.get(item_id) == mtime:
+                    continue
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Fișierul {json_path} nu a putut fi importat în index: {e}")
+                continue
+
+            batch.append((metadata, image_path, json_path, mtime))
+            if len(batch) >= batch_size:
+                imported += self._import_batch(batch, on_imported)
+                batch = []
+
+        if batch:
+            imported += self._import_batch(batch, on_imported)
+
+        missing = [item_id for item_id in indexed if item_id not in seen]
+        if missing:
+            (on_removed or self.remove)(missing)
+        return imported, len(missing)
+
+    def _import_batch(self, batch, on_imported):
+        self.upsert_many(batch)
+        if on_imported is not None:
+            on_imported(batch)
+        return len(batch)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_gallery_index(gallery_dir="gallery_uploads"):
+    """Indexul unic din proces al unui director de galerie; un index nou importă fișierele existente."""
+    key = os.path.abspath(gallery_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = GalleryIndex(gallery_dir)
+            if index.count() == 0:
+                imported, _ = index.import_json_files()
+                if imported:
+                    print(f"Indexul galeriei {gallery_dir}: {imported} opere importate")
+            _indexes[key] = index
+        return index
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indexul SQLite al galeriei ArtAdvisor")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Importă/sincronizează fișierele JSON existente în index")
+    import_parser.add_argument("--gallery-dir", default="gallery_uploads", help="Directorul galeriei")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        from utils.gallery_journal import sync_gallery_files
+        imported, removed = sync_gallery_files(args.gallery_dir)
+        print(f"Index actualizat: {imported} opere importate, {removed} eliminate")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+Jurnalul de modificări al galeriei și listele de opere menținute incremental din el.
+
+Fiecare salvare și ștergere (save_analysis_metadata, delete_artwork, watcher-ul) adaugă o linie JSON în
+gallery_journal.log, după ce indexul SQLite a fost actualizat. Listele din memorie (GalleryView) rețin
+poziția până la care au citit jurnalul și, la fiecare cerere, aplică doar liniile noi: operele adăugate sunt
+citite din index după id și inserate la locul lor în ordinea sortării, cele șterse sunt scoase, deci costul
+este O(opere noi), nu O(galerie). Un jurnal înlocuit (compactat) sau o intrare "reset" reîncarcă lista.
+
+Fișierele copiate direct în director (fără aplicație) sunt preluate de un watcher inotify opțional
+(GALLERY_WATCHER = 1, doar Linux), care le indexează și le scrie în jurnal ca pe orice salvare.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from config import GALLERY_JOURNAL_FILENAME, GALLERY_JOURNAL_MAX_MB, GALLERY_WATCHER_ENABLED
+from utils.emotion_index import get_emotion_index
+from utils.gallery_index import get_gallery_index, artwork_id
+from utils.visual_index import get_visual_index
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+OP_UPSERT = "upsert"
+OP_DELETE = "delete"
+OP_RESET = "reset"
+
+class GalleryJournal:
+    """Jurnalul append-only al unui director de galerie; scrierile sunt sincronizate între fire și procese."""
+
+    def __init__(self, gallery_dir):
+        self.gallery_dir = gallery_dir
+        self.path = os.path.join(gallery_dir, GALLERY_JOURNAL_FILENAME)
+        self.lock_path = f"{self.path}.lock"
+        self.max_bytes = GALLERY_JOURNAL_MAX_MB * 1024 * 1024
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _writer(self):
+        with self._lock:
+            os.makedirs(self.gallery_dir, exist_ok=True)
+            with open(self.lock_path, 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _append(self, entries):
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode('utf-8')
+        with self._writer():
+            try:
+                if os.path.getsize(self.path) > self.max_bytes:
+                    # Compactare: un fișier nou (alt inode) face cititorii să reîncarce lista o singură dată
+                    temp_path = f"{self.path}.{os.getpid()}.tmp"
+                    open(temp_path, 'wb').close()
+                    os.replace(temp_path, self.path)
+            except OSError:
+                pass
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+    def record_upsert(self, item_id, mtime):
+        self._append([{"op": OP_UPSERT, "id": item_id, "mtime": mtime}])
+
+    def record_delete(self, item_ids):
+        self._append([{"op": OP_DELETE, "id": item_id} for item_id in item_ids])
+
+    def record_reset(self):
+        """Cititorii reîncarcă integral lista (după importuri în masă, ex. import_json_files)."""
+        self._append([{"op": OP_RESET}])
+
+    def position(self):
+        """Sfârșitul curent al jurnalului: (inode, offset)."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None, 0
+        return stat.st_ino, stat.st_size
+
+    def read_since(self, position):
+        """
+        (intrări, poziție nouă) de la `position`, doar liniile complete; intrări None dacă jurnalul
+        a fost înlocuit sau trunchiat între timp (cititorul trebuie să reîncarce).
+        """
+        inode, offset = position
+        current_inode, size = self.position()
+        if inode is None and current_inode is not None:
+            # Jurnalul a fost creat după citire: este citit de la început
+            inode = current_inode
+        if current_inode != inode or size < offset:
+            return None, (current_inode, size)
+        if size == offset:
+            return [], position
+
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        complete = data.rfind(b'\n') + 1
+        entries = []
+        for line in data[:complete].decode('utf-8').splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                print(f"Linie invalidă în jurnalul galeriei {self.path}: {line[:80]}")
+        return entries, (inode, offset + complete)
+
+class GalleryView:
+    """Lista sortată a operelor unei galerii, ținută la zi prin aplicarea intrărilor noi din jurnal."""
+
+    SORTS = ("data", "timestamp")
+
+    def __init__(self, gallery_dir, sort="data"):
+        if sort not in self.SORTS:
+            raise ValueError(f"Criteriu de sortare necunoscut: {sort}")
+        self.gallery_dir = gallery_dir
+        self.sort = sort
+        self.journal = get_gallery_journal(gallery_dir)
+        self._lock = threading.Lock()
+        self._keys = []
+        self._artworks = []
+        self._key_of = {}
+        self._position = None
+
+    def _key(self, item_id, artwork):
+        # Cheile sunt ținute crescător (mtime, id) sau (timestamp, id); "data" este servită inversată,
+        # aceeași ordine ca list_artworks (mtime descrescător, id descrescător)
+        if self.sort == "data":
+            return artwork['mtime'], item_id
+        return str(artwork['metadata'].get('timestamp', '')), item_id
+
+    def _reload(self):
+        # Poziția este luată înaintea interogării: intrările scrise între timp sunt reaplicate (idempotent)
+        self._position = self.journal.position()
+        index = get_gallery_index(self.gallery_dir)
+        self._artworks = index.list_artworks(sort=self.sort, descending=False)
+        self._keys = []
+        self._key_of = {}
+        for artwork in self._artworks:
+            item_id = artwork_id(artwork['json_path'])
+            key = self._key(item_id, artwork)
+            self._keys.append(key)
+            self._key_of[item_id] = key
+
+    def _remove(self, item_id):
+        key = self._key_of.pop(item_id, None)
+        if key is not None:
+            position = bisect_left(self._keys, key)
+            del self._keys[position]
+            del self._artworks[position]
+
+    def _insert(self, item_id, artwork):
+        key = self._key(item_id, artwork)
+        position = bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._artworks.insert(position, artwork)
+        self._key_of[item_id] = key
+
+    def _apply(self, entries):
+        # Doar ultima operație per operă contează; adăugările sunt citite din index într-o singură interogare
+        latest = {}
+        for entry in entries:
+            if entry.get("op") == OP_RESET:
+                return False
+            latest[entry["id"]] = entry["op"]
+
+        upserted = [item_id for item_id, op in latest.items() if op == OP_UPSERT]
+        for item_id in latest:
+            self._remove(item_id)
+        for artwork in get_gallery_index(self.gallery_dir).get_many(upserted):
+            self._insert(artwork_id(artwork['json_path']), artwork)
+        return True
+
+    def refresh(self):
+        """Aplică intrările noi din jurnal; returnează numărul lor (0 = lista era la zi)."""
+        with self._lock:
+            if self._position is None:
+                self._reload()
+                return len(self._artworks)
+            entries, position = self.journal.read_since(self._position)
+            if entries is None:
+                self._reload()
+                return len(self._artworks)
+            if entries:
+                self._position = position
+                if not self._apply(entries):
+                    self._reload()
+            return len(entries)
+
+    def artworks(self):
+        """Operele în ordinea sortării (o copie a listei; elementele sunt partajate și nu trebuie modificate)."""
+        self.refresh()
+        with self._lock:
+            return self._artworks[::-1] if self.sort == "data" else list(self._artworks)
+
+    def __len__(self):
+        self.refresh()
+        with self._lock:
+            return len(self._artworks)
+
+# Constante inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+def _load_inotify():
+    """libc cu funcțiile inotify sau None (alte platforme)."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+def index_external_artwork(gallery_dir, item_id):
+    """
+    Indexează o pereche art_*.json / art_*.png apărută în director din afara aplicației (indexul galeriei,
+    matricea de emoții și jurnalul). Returnează False dacă perechea e incompletă sau deja indexată.
+    """
+    json_path = os.path.join(gallery_dir, f"{item_id}.json")
+    image_path = os.path.join(gallery_dir, f"{item_id}.png")
+    if not (os.path.exists(json_path) and os.path.exists(image_path)):
+        return False
+
+    index = get_gallery_index(gallery_dir)
+    try:
+        mtime = os.path.getmtime(json_path)
+        # Salvările aplicației sunt deja indexate cu același mtime
+        if index.mtime_of(item_id) == mtime:
+            return False
+        with open(json_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Fișierul {json_path} nu a putut fi indexat: {e}")
+        return False
+
+    index.upsert(metadata, image_path, json_path, mtime)
+    get_emotion_index(gallery_dir).upsert(item_id, metadata.get("emotii_detectate", {}))
+    get_gallery_journal(gallery_dir).record_upsert(item_id, mtime)
+    return True
+
+def remove_from_indexes(gallery_dir, item_ids):
+    """Scoate operele din indexul galeriei, matricea de emoții și indexul vizual, apoi scrie ștergerea în jurnal."""
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+    get_gallery_index(gallery_dir).remove(item_ids)
+    emotion_index = get_emotion_index(gallery_dir)
+    visual_index = get_visual_index(gallery_dir)
+    for item_id in item_ids:
+        emotion_index.remove(item_id)
+        visual_index.remove(item_id)
+    get_gallery_journal(gallery_dir).record_delete(item_ids)
+
+def sync_gallery_files(gallery_dir="gallery_uploads"):
+    """
+    Sincronizarea completă cu fișierele din director (modificările făcute cât timp aplicația nu a rulat):
+    operele noi intră și în matricea de emoții, cele dispărute ies din toate indexurile prin remove_from_indexes,
+    iar listele din memorie sunt reîncărcate. Returnează (importate, eliminate).
+    """
+    emotion_index = get_emotion_index(gallery_dir)
+
+    def _imported(entries):
+        for metadata, _, json_path, _ in entries:
+            emotion_index.upsert(artwork_id(json_path), metadata.get("emotii_detectate", {}))
+
+    imported, removed = get_gallery_index(gallery_dir).import_json_files(
+        on_imported=_imported, on_removed=lambda item_ids: remove_from_indexes(gallery_dir, item_ids)
+    )
+    if imported:
+        get_gallery_journal(gallery_dir).record_reset()
+    return imported, removed
+
+class GalleryWatcher:
+    """Fir care urmărește prin inotify fișierele art_*.json / art_*.png adăugate sau șterse din galerie."""
+
+    def __init__(self, gallery_dir):
+        self.gallery_dir = gallery_dir
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+
+    def start(self):
+        libc = _load_inotify()
+        if libc is None:
+            print("Watcher-ul galeriei nu este disponibil: inotify lipsește pe această platformă")
+            return False
+
+        os.makedirs(self.gallery_dir, exist_ok=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            print(f"inotify_init1 a eșuat: {os.strerror(ctypes.get_errno())}")
+            return False
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+        if libc.inotify_add_watch(fd, os.fsencode(self.gallery_dir), mask) < 0:
+            print(f"inotify_add_watch a eșuat pentru {self.gallery_dir}: {os.strerror(ctypes.get_errno())}")
+            os.close(fd)
+            return False
+
+        self._fd = fd
+        self._catch_up()
+        self._thread = threading.Thread(target=self._loop, name="gallery-watcher", daemon=True)
+        self._thread.start()
+        return True
+
+    def _catch_up(self):
+        imported, removed = sync_gallery_files(self.gallery_dir)
+        if imported or removed:
+            print(f"Galeria {self.gallery_dir}: {imported} opere preluate, {removed} eliminate de la ultima rulare")
+
+    def _loop(self):
+        try:
+            while not self._stop.is_set():
+                readable, _, _ = select.select([self._fd], [], [], 1.0)
+                if not readable:
+                    continue
+                try:
+                    data = os.read(self._fd, 65536)
+                except BlockingIOError:
+                    continue
+                self._handle(self._parse(data))
+        finally:
+            os.close(self._fd)
+
+    @staticmethod
+    def _parse(data):
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            start = offset + _EVENT_HEADER.size
+            name = data[start:start + length].rstrip(b'\0').decode('utf-8', 'replace')
+            events.append((name, mask))
+            offset = start + length
+        return events
+
+    def _handle(self, events):
+        added, removed = [], []
+        for name, mask in events:
+            item_id, extension = os.path.splitext(name)
+            if not item_id.startswith("art_") or extension not in (".json", ".png"):
+                continue
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                removed.append(item_id)
+            else:
+                added.append(item_id)
+
+        index = get_gallery_index(self.gallery_dir)
+        try:
+            gone = [item_id for item_id in dict.fromkeys(removed) if index.mtime_of(item_id) is not None]
+            remove_from_indexes(self.gallery_dir, gone)
+            for item_id in dict.fromkeys(added):
+                index_external_artwork(self.gallery_dir, item_id)
+        except Exception as e:
+            print(f"Eroare la sincronizarea galeriei {self.gallery_dir}: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+_journals = {}
+_views = {}
+_watchers = {}
+_registry_lock = threading.RLock()
+
+def get_gallery_journal(gallery_dir="gallery_uploads"):
+    """Jurnalul unic din proces al unei galerii."""
+    key = os.path.abspath(gallery_dir)
+    with _registry_lock:
+        if key not in _journals:
+            _journals[key] = GalleryJournal(gallery_dir)
+        return _journals[key]
+
+def start_gallery_watcher(gallery_dir="gallery_uploads"):
+    """Pornește (o singură dată per proces) watcher-ul inotify al unei galerii."""
+    key = os.path.abspath(gallery_dir)
+    with _registry_lock:
+        if key in _watchers:
+            return _watchers[key]
+        watcher = GalleryWatcher(gallery_dir)
+        _watchers[key] = watcher
+    watcher.start()
+    return watcher
+
+def get_gallery_view(gallery_dir="gallery_uploads", sort="data"):
+    """Lista unică din proces a operelor unei galerii pentru o sortare ("data" sau "timestamp")."""
+    key = (os.path.abspath(gallery_dir), sort)
+    with _registry_lock:
+        view = _views.get(key)
+        if view is None:
+            view = _views[key] = GalleryView(gallery_dir, sort)
+    if GALLERY_WATCHER_ENABLED:
+        start_gallery_watcher(gallery_dir)
+    return view
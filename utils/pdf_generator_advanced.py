@@ -5,6 +5,8 @@ import os
 import base64
 from PIL import Image
 
+from utils.artifact_store import resolve_artifact
+
 def check_pdf_capabilities():
     import platform
     
@@ -44,9 +46,10 @@ def generate_html_content(analysis_results):
     style_option = analysis_results.get('style_option', 'Standard')
     
     image_base64 = ""
-    if 'cropped_image' in analysis_results:
+    cropped_image = resolve_artifact(analysis_results.get('cropped_image'))
+    if cropped_image is not None:
         buffered = BytesIO()
-        analysis_results['cropped_image'].save(buffered, format="PNG")
+        cropped_image.save(buffered, format="PNG")
         image_base64 = base64.b64encode(buffered.getvalue()).decode()
     
     try:
@@ -285,10 +288,12 @@ def generate_html_content(analysis_results):
     
     gradcam_images = []
     if predictions:
-        if 'stil' in predictions and 'gradcam_image' in predictions['stil']:
-            gradcam_images.append(('Stil Artistic', predictions['stil']['gradcam_image']))
-        if 'autor' in predictions and 'gradcam_image' in predictions['autor']:
-            gradcam_images.append(('Autor', predictions['autor']['gradcam_image']))
+        # Hărțile Grad-CAM sunt calculate la cerere (o singură dată) doar pentru raport
+        from predictors.cam_overlay import get_gradcam_image
+        for key, title in (('stil', 'Stil Artistic'), ('autor', 'Autor')):
+            gradcam_img = get_gradcam_image(predictions.get(key))
+            if gradcam_img is not None:
+                gradcam_images.append((title, gradcam_img))
     
     if gradcam_images:
         html_content += """
@@ -0,0 +1,197 @@
+"""
+Cache persistent pentru predicții, indexat după conținutul imaginii.
+
+Cheia este hash-ul pixelilor decodați plus versiunea modelelor, deci aceeași pictură reîncărcată
+(alt nume de fișier temporar, alt upload, după restart) nu mai trece prin modele. Două niveluri:
+un LRU în memorie, limitat în bytes, și un nivel pe disc, limitat tot în bytes, cu statistici de evacuare.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config import (
+    PREDICTION_CACHE_DIR, PREDICTION_CACHE_MEMORY_MB, PREDICTION_CACHE_DISK_MB, INFERENCE_BACKEND
+)
+
+# Se incrementează când se schimbă formatul rezultatelor salvate
+CACHE_SCHEMA_VERSION = 3
+
+def image_content_hash(image):
+    """Hash SHA-256 al pixelilor decodați (RGB) și al dimensiunilor imaginii (PIL Image sau array HxWx3)."""
+    pixels = np.ascontiguousarray(np.asarray(image.convert('RGB') if hasattr(image, 'convert') else image, dtype=np.uint8))
+    digest = hashlib.sha256()
+    digest.update(str(pixels.shape).encode('ascii'))
+    digest.update(pixels.tobytes())
+    return digest.hexdigest()
+
+def model_version(weight_paths, extra=""):
+    """
+    Versiunea modelelor: backend-ul de inferență și (nume, mărime, mtime) pentru fiecare fișier de ponderi.
+    Orice reantrenare sau schimbare de backend invalidează automat cache-ul.
+    """
+    digest = hashlib.sha1(f"{CACHE_SCHEMA_VERSION}|{INFERENCE_BACKEND}|{extra}".encode('utf-8'))
+    for path in weight_paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"|{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+        except OSError:
+            digest.update(f"|{os.path.basename(path)}:lipsa".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+class PredictionCache:
+    """
+    Cache în două niveluri pentru rezultatele get_all_predictions.
+    Valorile sunt păstrate serializate (pickle), astfel încât fiecare apelant primește propria copie,
+    iar mărimea în bytes a fiecărei intrări este exactă.
+    """
+
+    def __init__(self, cache_dir=PREDICTION_CACHE_DIR, memory_bytes=PREDICTION_CACHE_MEMORY_MB * 1024 * 1024,
+                 disk_bytes=PREDICTION_CACHE_DISK_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.memory_limit = memory_bytes
+        self.disk_limit = disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits_memorie": 0, "hits_disc": 0, "misses": 0,
+            "evacuari_memorie": 0, "evacuari_disc": 0, "scrieri": 0,
+        }
+
+    def make_key(self, content_hash, version):
+        return f"{version}_{content_hash}"
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[-2:], f"{key}.pkl")
+
+    def get(self, key):
+        """Returnează rezultatul din cache (copie nouă) sau None."""
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+                self._stats["hits_memorie"] += 1
+                return pickle.loads(payload)
+
+        payload = self._read_disk(key)
+        if payload is None:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self._stats["hits_disc"] += 1
+            self._put_memory(key, payload)
+        return pickle.loads(payload)
+
+    def put(self, key, value):
+        """Salvează rezultatul în ambele niveluri."""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._put_memory(key, payload)
+            self._stats["scrieri"] += 1
+        self._write_disk(key, payload)
+
+    def _put_memory(self, key, payload):
+        if len(payload) > self.memory_limit:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = payload
+        self._memory_bytes += len(payload)
+        while self._memory_bytes > self.memory_limit and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._stats["evacuari_memorie"] += 1
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            # mtime marchează ultima utilizare, pentru evacuarea LRU de pe disc
+            os.utime(path, None)
+            return payload
+        except OSError:
+            return None
+
+    def _write_disk(self, key, payload):
+        if len(payload) > self.disk_limit:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Eroare la scrierea în cache-ul de predicții: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += len(payload)
+            if self._disk_bytes > self.disk_limit:
+                self._evict_disk()
+
+    def _iter_disk_entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.pkl'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _scan_disk_bytes(self):
+        return sum(size for _, size, _ in self._iter_disk_entries())
+
+    def _evict_disk(self):
+        """Șterge intrările cele mai vechi (după ultima utilizare) până sub 90% din limită."""
+        entries = sorted(self._iter_disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.disk_limit * 0.9
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self._stats["evacuari_disc"] += 1
+            except OSError:
+                continue
+        self._disk_bytes = total
+
+    def stats(self):
+        """Statisticile cache-ului: hit-uri, miss-uri, evacuări și bytes ocupați pe fiecare nivel."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["intrari_memorie"] = len(self._memory)
+            stats["bytes_memorie"] = self._memory_bytes
+            stats["bytes_disc"] = self._disk_bytes if self._disk_bytes is not None else self._scan_disk_bytes()
+            return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_prediction_cache():
+    """Cache-ul de predicții unic din proces."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PredictionCache()
+        return _cache
@@ -0,0 +1,95 @@
+"""
+Coalescarea cererilor identice concurente (single-flight).
+
+Când mai multe sesiuni cer în același timp același calcul (aceeași pictură încărcată de o clasă întreagă,
+aceeași narațiune, același text pentru audio), doar primul apelant îl execută; ceilalți așteaptă rezultatul
+lui, fără o nouă rulare a modelelor sau o nouă cerere plătită către API. Cheia este dată de apelant
+(hash-ul conținutului imaginii și parametrii prompt-ului). Rezultatele nu sunt păstrate după finalizare:
+pentru reutilizare ulterioară există cache-urile dedicate.
+"""
+
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+
+class _Abandoned(Exception):
+    """Apelantul care executa calculul a fost întrerupt (ex. rerulare Streamlit); următorul îl preia."""
+
+class SingleFlight:
+    """Un grup de calcule coalescate după cheie, cu contoare de execuții și cereri coalescate."""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"executate": 0, "coalescate": 0, "erori": 0, "in_curs": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Execută fn(*args, **kwargs) o singură dată pentru toate apelurile concurente cu aceeași cheie.
+        Returnează (rezultat, partajat); partajat=True pentru apelanții care au primit rezultatul altuia
+        și trebuie să îl copieze înainte de a-l modifica.
+        """
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = Future()
+                    self._calls[key] = future
+                    self._stats["in_curs"] += 1
+                else:
+                    self._stats["coalescate"] += 1
+
+            if not leader:
+                try:
+                    return future.result(), True
+                except _Abandoned:
+                    continue
+
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self._finish(key, error=True)
+                future.set_exception(e)
+                raise
+            except BaseException:
+                # Excepțiile de control (rerulare/oprire Streamlit) aparțin doar sesiunii care le-a primit
+                self._finish(key, error=True)
+                future.set_exception(_Abandoned())
+                raise
+
+            self._finish(key)
+            future.set_result(result)
+            return result, False
+
+    def _finish(self, key, error=False):
+        with self._lock:
+            self._calls.pop(key, None)
+            self._stats["in_curs"] -= 1
+            self._stats["erori" if error else "executate"] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+def get_single_flight(name):
+    """Grupul de coalescare unic din proces pentru un tip de calcul (ex. "predictii", "naratiune", "audio")."""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+def get_coalescing_stats():
+    """Contoarele tuturor grupurilor de coalescare."""
+    with _groups_lock:
+        return {name: group.stats() for name, group in _groups.items()}
+
+def make_key(*parts):
+    """Cheie stabilă (SHA-256) din părți serializabile JSON: hash-uri, parametri de prompt, texte."""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
@@ -0,0 +1,206 @@
+"""
+Vectori per operă într-o matrice .npy citită prin memory-map, cu harta rând -> id într-un fișier text.
+
+Baza comună pentru matricea de emoții (utils.emotion_index) și embedding-urile vizuale (utils.visual_index).
+Rândurile sunt scrise pe loc, iar id-ul este adăugat în fișierul de id-uri doar după rândul lui, deci
+cititorii (și alte procese) aplică doar liniile noi și nu văd niciodată un id fără vector. Când matricea
+se umple, capacitatea se dublează într-un fișier nou, înlocuit atomic; cititorii redeschid memory-map-ul.
+Reconstruirea înlocuiește ambele fișiere sub lock-ul exclusiv al scriitorilor, iar cititorii reîmprospătează
+sub lock-ul partajat, deci nu pot asocia matricea nouă cu id-urile vechi.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+INITIAL_CAPACITY = 1024
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+def top_k_rows(scores, top_k):
+    """Pozițiile celor mai mari top_k scoruri, descrescător (argpartition, apoi sortarea doar a celor k)."""
+    count = scores.shape[0]
+    k = min(top_k, count)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(scores, count - k)[count - k:]
+    return top[np.argsort(scores[top])[::-1]]
+
+class MemmapVectorStore:
+    """Matricea de vectori (memory-map), harta rând -> id și scrierile sincronizate între fire și procese."""
+
+    def __init__(self, directory, matrix_filename, ids_filename, lock_filename, dim, initial_capacity=INITIAL_CAPACITY):
+        self.directory = directory
+        self.matrix_path = os.path.join(directory, matrix_filename)
+        self.ids_path = os.path.join(directory, ids_filename)
+        self.lock_path = os.path.join(directory, lock_filename)
+        self.dim = dim
+        self.initial_capacity = initial_capacity
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._ids = []
+        self._rows = {}
+        self._ids_offset = 0
+        self._ids_inode = None
+        self._matrix = None
+        self._matrix_stat = None
+
+    @contextmanager
+    def _writer(self):
+        """Lock-ul scriitorilor: între firele procesului și, unde există fcntl, între procese."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.lock_path, 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._refresh_locked()
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Reîmprospătarea cititorilor (cu self._lock deținut), sub lock-ul partajat între procese."""
+        if fcntl is None or not os.path.isdir(self.directory):
+            self._refresh_locked()
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            try:
+                self._refresh_locked()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh_locked(self):
+        """Aplică id-urile adăugate de la ultima citire și redeschide matricea dacă fișierul a fost înlocuit."""
+        try:
+            ids_stat = os.stat(self.ids_path)
+        except OSError:
+            if self._ids:
+                self._reset()
+            return
+
+        if ids_stat.st_ino != self._ids_inode or ids_stat.st_size < self._ids_offset:
+            # Fișier reconstruit: se recitește de la început
+            self._reset()
+            self._ids_inode = ids_stat.st_ino
+
+        if ids_stat.st_size > self._ids_offset:
+            with open(self.ids_path, 'rb') as f:
+                f.seek(self._ids_offset)
+                data = f.read(ids_stat.st_size - self._ids_offset)
+            complete = data.rfind(b'\n') + 1
+            for item_id in data[:complete].decode('utf-8').splitlines():
+                self._rows[item_id] = len(self._ids)
+                self._ids.append(item_id)
+            self._ids_offset += complete
+
+        try:
+            matrix_stat = os.stat(self.matrix_path)
+        except OSError:
+            self._matrix = None
+            return
+        key = (matrix_stat.st_ino, matrix_stat.st_size)
+        if self._matrix is None or key != self._matrix_stat:
+            self._matrix = np.load(self.matrix_path, mmap_mode='r')
+            self._matrix_stat = key
+
+    def _ensure_capacity_locked(self, rows):
+        """Creează sau mărește matricea (capacitate dublată, înlocuire atomică) pentru cel puțin `rows` rânduri."""
+        if self._matrix is not None and self._matrix.shape[0] >= rows:
+            return
+        capacity = max(self.initial_capacity, rows, 2 * (self._matrix.shape[0] if self._matrix is not None else 0))
+        temp_path = f"{self.matrix_path}.{os.getpid()}.tmp.npy"
+        grown = np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.float32, shape=(capacity, self.dim))
+        if self._matrix is not None:
+            grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+        grown.flush()
+        del grown
+        os.replace(temp_path, self.matrix_path)
+        self._matrix = None
+        self._refresh_locked()
+
+    def _write_row_locked(self, row, vector):
+        matrix = np.load(self.matrix_path, mmap_mode='r+')
+        matrix[row] = vector
+        matrix.flush()
+        del matrix
+
+    def upsert(self, item_id, vector):
+        """Scrie (sau rescrie) vectorul unei opere."""
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._writer():
+            row = self._rows.get(item_id)
+            if row is None:
+                row = len(self._ids)
+                self._ensure_capacity_locked(row + 1)
+                self._write_row_locked(row, vector)
+                # Id-ul se adaugă după rând: cititorii nu văd niciodată un id fără vectorul lui
+                with open(self.ids_path, 'a', encoding='utf-8') as f:
+                    f.write(f"{item_id}\n")
+            else:
+                self._write_row_locked(row, vector)
+            self._refresh_locked()
+
+    def remove(self, item_id):
+        """Golește rândul unei opere șterse (id-ul rămâne rezervat și este refolosit la o nouă salvare)."""
+        with self._writer():
+            row = self._rows.get(item_id)
+            if row is not None:
+                self._write_row_locked(row, np.zeros(self.dim, dtype=np.float32))
+
+    def rebuild(self, entries):
+        """Reconstruiește matricea din (id, vector), cu înlocuirea atomică a ambelor fișiere."""
+        entries = list(entries)
+        with self._writer():
+            capacity = max(self.initial_capacity, len(entries))
+            matrix_temp = f"{self.matrix_path}.{os.getpid()}.tmp.npy"
+            ids_temp = f"{self.ids_path}.{os.getpid()}.tmp"
+            matrix = np.lib.format.open_memmap(matrix_temp, mode='w+', dtype=np.float32, shape=(capacity, self.dim))
+            with open(ids_temp, 'w', encoding='utf-8') as f:
+                for row, (item_id, vector) in enumerate(entries):
+                    matrix[row] = vector
+                    f.write(f"{item_id}\n")
+            matrix.flush()
+            del matrix
+            os.replace(matrix_temp, self.matrix_path)
+            os.replace(ids_temp, self.ids_path)
+            self._refresh_locked()
+        return len(entries)
+
+    def snapshot(self):
+        """(id-uri, număr de rânduri, matrice) la momentul apelului; lista de id-uri doar crește."""
+        ids, count, matrix, _ = self.versioned_snapshot()
+        return ids, count, matrix
+
+    def versioned_snapshot(self):
+        """Ca snapshot(), plus generația stocării (inode-ul fișierului de id-uri, schimbat de rebuild)."""
+        with self._lock:
+            self._refresh()
+            return self._ids, len(self._ids), self._matrix, self._ids_inode
+
+    def row_of(self, item_id):
+        with self._lock:
+            self._refresh()
+            return self._rows.get(item_id)
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._ids)
+
+    def search_vector(self, query_vector, top_k=10):
+        """Căutare exactă: [(id, scor)] după produsul scalar cu query_vector, descrescător."""
+        ids, count, matrix = self.snapshot()
+        if count == 0 or matrix is None or top_k <= 0:
+            return []
+        scores = np.asarray(matrix[:count] @ query_vector)
+        return [(ids[row], float(scores[row])) for row in top_k_rows(scores, top_k)]
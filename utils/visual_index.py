@@ -0,0 +1,402 @@
+"""
+Căutarea operelor asemănătoare vizual, după embedding-urile salvate la analiză (predictors.embeddings).
+
+Embedding-ul fiecărei opere este scris la salvare într-o matrice memory-map (utils.vector_store), deci
+căutarea nu mai rulează modelele peste galerie. Peste matrice, un index IVF în numpy: centroizi obținuți
+prin k-means sferic, câte o listă de rânduri per centroid și, la o căutare, doar NPROBE liste vizitate.
+Inserările noi sunt repartizate incremental la centroidul cel mai apropiat; indexul este reantrenat când
+galeria și-a dublat mărimea de la ultima antrenare, pe un fir de fundal: până la terminare, căutările folosesc
+indexul anterior sau, la prima antrenare, căutarea exactă. O operă salvată din nou (același id, alt embedding) este
+mutată în lista centroidului noului vector, iar indexul salvat este rescris, ca celelalte procese să îl
+reîncarce. Sub VISUAL_INDEX_MIN_ROWS opere căutarea este exactă.
+
+Antrenarea poate rula și explicit, de ex. după backfill:
+    python -m utils.visual_index train --gallery-dir gallery_uploads
+Comparația recall / latență față de căutarea exactă, pe date sintetice:
+    python -m utils.visual_index benchmark --rows 100000
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from config import VISUAL_INDEX_MIN_ROWS, VISUAL_INDEX_NLIST, VISUAL_INDEX_NPROBE
+from predictors.embeddings import EMBEDDING_DIM
+from utils.vector_store import MemmapVectorStore, top_k_rows
+
+MATRIX_FILENAME = "visual_embeddings.npy"
+IDS_FILENAME = "visual_ids.txt"
+LOCK_FILENAME = "visual_embeddings.lock"
+IVF_FILENAME = "visual_ivf.npz"
+
+# Mărimea eșantionului de antrenare per centroid și numărul de iterații k-means
+_TRAIN_SAMPLES_PER_LIST = 64
+_KMEANS_ITERATIONS = 10
+_ASSIGN_CHUNK = 65536
+
+def default_nlist(rows):
+    return VISUAL_INDEX_NLIST or max(16, int(4 * np.sqrt(rows)))
+
+def _assign(vectors, centroids):
+    """Centroidul cel mai apropiat (produs scalar maxim) pentru fiecare vector, pe bucăți."""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _ASSIGN_CHUNK):
+        chunk = np.asarray(vectors[start:start + _ASSIGN_CHUNK], dtype=np.float32)
+        assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+def _cluster_sums(vectors, assignments, nlist):
+    """
+    Suma vectorilor fiecărui cluster și numărul lor: vectorii sortați după cluster sunt însumați pe segmente
+    contigue (np.add.at, cu acces aleator rând cu rând, era de câteva ori mai lent).
+    """
+    order = np.argsort(assignments, kind='stable')
+    counts = np.bincount(assignments, minlength=nlist)
+    ends = np.cumsum(counts)
+    grouped = vectors[order]
+    sums = np.zeros((nlist, vectors.shape[1]), dtype=np.float32)
+    for cluster in np.flatnonzero(counts):
+        sums[cluster] = grouped[ends[cluster] - counts[cluster]:ends[cluster]].sum(axis=0)
+    return sums, counts
+
+class IVFIndex:
+    """Index IVF (inverted file) pentru vectori normalizați L2, cu similaritatea cosinus ca produs scalar."""
+
+    def __init__(self, centroids, generation=0):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.nlist = len(self.centroids)
+        self.generation = generation
+        self.trained_rows = 0
+        self.count = 0
+        self._lists = [np.empty(0, dtype=np.int64) for _ in range(self.nlist)]
+        self._sizes = np.zeros(self.nlist, dtype=np.int64)
+        self._assignments = np.empty(0, dtype=np.int32)
+
+    @classmethod
+    def train(cls, matrix, rows, nlist=None, seed=0, generation=0):
+        """k-means sferic pe un eșantion din primele `rows` rânduri, apoi repartizarea tuturor rândurilor."""
+        rng = np.random.default_rng(seed)
+        nlist = min(nlist or default_nlist(rows), rows)
+        sample_size = min(rows, nlist * _TRAIN_SAMPLES_PER_LIST)
+        sample_rows = np.sort(rng.choice(rows, size=sample_size, replace=False))
+        sample = np.asarray(matrix[sample_rows], dtype=np.float32)
+
+        centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+        for _ in range(_KMEANS_ITERATIONS):
+            assignments = _assign(sample, centroids)
+            sums, counts = _cluster_sums(sample, assignments, nlist)
+            empty = counts == 0
+            # Centroizii rămași fără vectori sunt reinițializați din eșantion
+            sums[empty] = sample[rng.choice(sample_size, size=int(empty.sum()))]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+        index = cls(centroids, generation)
+        index.add_rows(matrix, 0, rows)
+        index.trained_rows = rows
+        return index
+
+    def _append(self, list_idx, rows):
+        size = self._sizes[list_idx]
+        needed = size + len(rows)
+        current = self._lists[list_idx]
+        if needed > len(current):
+            grown = np.empty(max(needed, 2 * len(current), 16), dtype=np.int64)
+            grown[:size] = current[:size]
+            self._lists[list_idx] = current = grown
+        current[size:needed] = rows
+        self._sizes[list_idx] = needed
+
+    def add_rows(self, matrix, start, stop):
+        """Repartizează rândurile [start, stop) ale matricei (inserare incrementală)."""
+        if stop <= start:
+            return
+        assignments = _assign(matrix[start:stop], self.centroids)
+        self._add_assigned(np.arange(start, stop, dtype=np.int64), assignments)
+        self._assignments = np.concatenate([self._assignments[:start], assignments])
+        self.count = stop
+
+    def reassign(self, row, vector):
+        """Mută un rând rescris în lista centroidului celui mai apropiat de noul vector. True dacă s-a mutat."""
+        old_list = int(self._assignments[row])
+        new_list = int(np.argmax(self.centroids @ np.asarray(vector, dtype=np.float32)))
+        if new_list == old_list:
+            return False
+        size = self._sizes[old_list]
+        members = self._lists[old_list]
+        position = int(np.flatnonzero(members[:size] == row)[0])
+        # Ordinea din listă nu contează (candidații sunt sortați la căutare): ultimul element ia locul rândului
+        members[position] = members[size - 1]
+        self._sizes[old_list] = size - 1
+        self._append(new_list, np.array([row], dtype=np.int64))
+        self._assignments[row] = new_list
+        return True
+
+    def _add_assigned(self, rows, assignments):
+        order = np.argsort(assignments, kind='stable')
+        sorted_lists = assignments[order]
+        boundaries = np.flatnonzero(np.diff(sorted_lists)) + 1
+        for group in np.split(order, boundaries):
+            if len(group):
+                self._append(int(assignments[group[0]]), rows[group])
+
+    def search(self, matrix, query_vector, top_k=10, nprobe=VISUAL_INDEX_NPROBE):
+        """(rânduri, scoruri) pentru cele mai apropiate top_k rânduri din cele nprobe liste cele mai apropiate."""
+        nprobe = max(1, min(nprobe, self.nlist))
+        probes = top_k_rows(self.centroids @ query_vector, nprobe)
+        candidates = np.concatenate([self._lists[p][:self._sizes[p]] for p in probes])
+        if len(candidates) == 0:
+            return candidates, np.empty(0, dtype=np.float32)
+        candidates.sort()
+        scores = np.asarray(matrix[candidates] @ query_vector)
+        top = top_k_rows(scores, top_k)
+        return candidates[top], scores[top]
+
+    def save(self, path):
+        temp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(temp_path, centroids=self.centroids, assignments=self._assignments[:self.count],
+                 trained_rows=np.int64(self.trained_rows), generation=np.int64(self.generation))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, matrix, rows, generation=0):
+        """
+        Indexul salvat, completat cu rândurile adăugate după salvare; None dacă lipsește, nu se potrivește
+        sau a fost construit peste altă generație a stocării (rândurile au fost renumerotate de rebuild).
+        """
+        try:
+            with np.load(path) as data:
+                centroids, assignments = data["centroids"], data["assignments"]
+                trained_rows, saved_generation = int(data["trained_rows"]), int(data["generation"])
+        except (OSError, KeyError, ValueError):
+            return None
+        if centroids.shape[1] != matrix.shape[1] or len(assignments) > rows or saved_generation != generation:
+            return None
+
+        index = cls(centroids, generation)
+        index._add_assigned(np.arange(len(assignments), dtype=np.int64), assignments)
+        index._assignments = assignments.astype(np.int32)
+        index.count = len(assignments)
+        index.trained_rows = trained_rows
+        index.add_rows(matrix, index.count, rows)
+        return index
+
+class VisualIndex(MemmapVectorStore):
+    """Embedding-urile vizuale ale unei galerii și indexul IVF construit peste ele."""
+
+    def __init__(self, gallery_dir, min_rows=VISUAL_INDEX_MIN_ROWS):
+        super().__init__(gallery_dir, MATRIX_FILENAME, IDS_FILENAME, LOCK_FILENAME, EMBEDDING_DIM)
+        self.gallery_dir = gallery_dir
+        self.ivf_path = os.path.join(gallery_dir, IVF_FILENAME)
+        self.min_rows = min_rows
+        self._ivf = None
+        self._ivf_saved = None
+        self._ivf_lock = threading.Lock()
+        self._training = None
+        # Rândurile rescrise cât timp antrenarea rulează: sunt reatribuite înainte ca noul index să fie folosit
+        self._rewritten_rows = set()
+
+    def _saved_ivf_version(self):
+        try:
+            stat = os.stat(self.ivf_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _save_ivf(self):
+        self._ivf.save(self.ivf_path)
+        self._ivf_saved = self._saved_ivf_version()
+
+    def _training_running(self):
+        return self._training is not None and self._training.is_alive()
+
+    def _sync_ivf(self, matrix, count, generation):
+        """
+        Încarcă sau completează indexul IVF pentru primele `count` rânduri (cu _ivf_lock deținut). Antrenarea
+        necesară (index lipsă sau galerie dublată) pornește pe un fir de fundal; până se termină, se folosește
+        indexul anterior, iar fără index căutarea este exactă. Returnează True dacă există un index utilizabil.
+        """
+        saved = self._saved_ivf_version()
+        stale = (self._ivf is None or self._ivf.count > count or self._ivf.generation != generation
+                 or (saved is not None and saved != self._ivf_saved))
+        if stale:
+            # Indexul salvat de alt proces (ex. după o reatribuire) are prioritate față de cel din memorie
+            self._ivf = IVFIndex.load(self.ivf_path, matrix, count, generation)
+            self._ivf_saved = saved
+        if (self._ivf is None or count >= 2 * self._ivf.trained_rows) and not self._training_running():
+            self._rewritten_rows.clear()
+            self._training = threading.Thread(target=self._train_background, name="visual-ivf-train", daemon=True)
+            self._training.start()
+        if self._ivf is not None and self._ivf.count < count:
+            self._ivf.add_rows(matrix, self._ivf.count, count)
+        return self._ivf is not None
+
+    def _train_background(self):
+        try:
+            self.train_ivf()
+        except Exception as e:
+            print(f"Eroare la antrenarea indexului IVF: {e}")
+
+    def train_ivf(self):
+        """
+        Antrenează indexul IVF peste toate rândurile curente și îl salvează (rulează pe firul de fundal sau
+        din linia de comandă). Returnează indexul, sau None dacă stocarea a fost reconstruită între timp.
+        """
+        _, count, matrix, generation = self.versioned_snapshot()
+        if count == 0 or matrix is None:
+            return None
+        started = time.perf_counter()
+        ivf = IVFIndex.train(matrix, count, generation=generation)
+
+        _, count, matrix, current_generation = self.versioned_snapshot()
+        with self._ivf_lock:
+            if current_generation != generation:
+                return None
+            ivf.add_rows(matrix, ivf.count, count)
+            for row in sorted(self._rewritten_rows):
+                if row < ivf.count:
+                    ivf.reassign(row, matrix[row])
+            self._rewritten_rows.clear()
+            self._ivf = ivf
+            self._save_ivf()
+        print(f"Index IVF antrenat: {count} opere, {ivf.nlist} liste, "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        return ivf
+
+    def wait_for_training(self, timeout=None):
+        """Așteaptă antrenarea pornită în fundal. True dacă nu mai rulează nicio antrenare."""
+        training = self._training
+        if training is not None:
+            training.join(timeout)
+        return not self._training_running()
+
+    def upsert(self, item_id, vector):
+        """Scrie embedding-ul unei opere; o operă existentă este mutată și în lista IVF a noului vector."""
+        vector = np.asarray(vector, dtype=np.float32)
+        row = self.row_of(item_id)
+        super().upsert(item_id, vector)
+        if row is None:
+            return
+
+        _, count, matrix, generation = self.versioned_snapshot()
+        with self._ivf_lock:
+            if self._training_running():
+                self._rewritten_rows.add(row)
+            if self._ivf is None and self._saved_ivf_version() is None:
+                return
+            if self._sync_ivf(matrix, count, generation) and row < self._ivf.count and self._ivf.reassign(row, vector):
+                self._save_ivf()
+
+    def search(self, query_vector, top_k=10, exact=False, nprobe=VISUAL_INDEX_NPROBE):
+        """[(id, similaritate)] pentru cele mai asemănătoare top_k opere (IVF peste VISUAL_INDEX_MIN_ROWS opere)."""
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        ids, count, matrix, generation = self.versioned_snapshot()
+        if count == 0 or matrix is None or top_k <= 0:
+            return []
+        if exact or count < self.min_rows:
+            return self.search_vector(query_vector, top_k)
+
+        with self._ivf_lock:
+            if self._sync_ivf(matrix, count, generation):
+                rows, scores = self._ivf.search(matrix, query_vector, top_k, nprobe)
+            else:
+                rows = None
+        if rows is None:
+            # Indexul se antrenează încă în fundal
+            return self.search_vector(query_vector, top_k)
+        return [(ids[row], float(score)) for row, score in zip(rows, scores)]
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_visual_index(gallery_dir="gallery_uploads"):
+    """Indexul vizual unic din proces al unei galerii."""
+    key = os.path.abspath(gallery_dir)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = VisualIndex(gallery_dir)
+        return _indexes[key]
+
+def backfill_embeddings(gallery_dir="gallery_uploads"):
+    """Calculează embedding-urile operelor din galerie care nu au încă unul (ex. importate din afara aplicației)."""
+    from predict import get_all_predictions
+    from predictors.scheduler import PRIORITY_BATCH
+    from utils.gallery_index import get_gallery_index, artwork_id
+
+    index = get_visual_index(gallery_dir)
+    added = 0
+    for artwork in get_gallery_index(gallery_dir).list_artworks(sort="timestamp", descending=False):
+        item_id = artwork_id(artwork['json_path'])
+        if index.row_of(item_id) is not None:
+            continue
+        predictions = get_all_predictions(artwork['image_path'], priority=PRIORITY_BATCH)
+        embedding = predictions.get('emotie', {}).get('embedding')
+        if embedding is not None:
+            index.upsert(item_id, embedding)
+            added += 1
+    return added
+
+def _synthetic_embeddings(rows, dim, clusters, seed):
+    """Vectori normalizați grupați în jurul unor centre aleatoare (structura aproximativă a embedding-urilor reale)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size=rows)] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def run_benchmark(rows=100000, dim=EMBEDDING_DIM, queries=200, top_k=10, nprobes=(1, 4, 8, 16, 32), seed=0):
+    """Recall@k și latența medie a căutării IVF față de căutarea exactă, pe vectori sintetici."""
+    matrix = _synthetic_embeddings(rows, dim, clusters=max(16, rows // 500), seed=seed)
+    query_vectors = _synthetic_embeddings(queries, dim, clusters=max(16, rows // 500), seed=seed)
+
+    started = time.perf_counter()
+    ivf = IVFIndex.train(matrix, rows)
+    report = {"randuri": rows, "dimensiune": dim, "liste": ivf.nlist,
+              "antrenare_ms": round((time.perf_counter() - started) * 1000, 1), "rezultate": []}
+
+    started = time.perf_counter()
+    exact = [set(top_k_rows(matrix @ query, top_k).tolist()) for query in query_vectors]
+    exact_ms = (time.perf_counter() - started) * 1000 / queries
+    report["rezultate"].append({"metoda": "exact", "recall": 1.0, "latenta_ms": round(exact_ms, 3)})
+
+    for nprobe in nprobes:
+        started = time.perf_counter()
+        found = [ivf.search(matrix, query, top_k, nprobe)[0] for query in query_vectors]
+        latency_ms = (time.perf_counter() - started) * 1000 / queries
+        recall = np.mean([len(exact_rows & set(rows_found.tolist())) / top_k for exact_rows, rows_found in zip(exact, found)])
+        report["rezultate"].append({"metoda": f"ivf nprobe={nprobe}", "recall": round(float(recall), 4),
+                                    "latenta_ms": round(latency_ms, 3)})
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indexul de similaritate vizuală al galeriei ArtAdvisor")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill = subparsers.add_parser("backfill", help="Calculează embedding-urile lipsă pentru operele din galerie")
+    backfill.add_argument("--gallery-dir", default="gallery_uploads", help="Directorul galeriei")
+
+    train = subparsers.add_parser("train", help="Antrenează și salvează indexul IVF al galeriei")
+    train.add_argument("--gallery-dir", default="gallery_uploads", help="Directorul galeriei")
+
+    benchmark = subparsers.add_parser("benchmark", help="Recall și latență IVF față de căutarea exactă")
+    benchmark.add_argument("--rows", type=int, default=100000, help="Numărul de vectori sintetici")
+    benchmark.add_argument("--dim", type=int, default=EMBEDDING_DIM, help="Dimensiunea vectorilor")
+    benchmark.add_argument("--queries", type=int, default=200, help="Numărul de căutări")
+    benchmark.add_argument("--top-k", type=int, default=10, help="Numărul de rezultate per căutare")
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill":
+        print(f"Embedding-uri adăugate: {backfill_embeddings(args.gallery_dir)}")
+    elif args.command == "train":
+        if get_visual_index(args.gallery_dir).train_ivf() is None:
+            print("Indexul IVF nu a fost antrenat: galeria nu are embedding-uri sau a fost reconstruită între timp")
+    elif args.command == "benchmark":
+        report = run_benchmark(args.rows, args.dim, args.queries, args.top_k)
+        print(f"{report['randuri']} vectori x {report['dimensiune']}, {report['liste']} liste, "
+              f"antrenare {report['antrenare_ms']} ms")
+        for result in report["rezultate"]:
+            print(f"  {result['metoda']:<16} recall@{args.top_k}={result['recall']:.4f}  {result['latenta_ms']:.3f} ms/căutare")
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,14 @@ Funcții pentru generarea vizualizărilor în aplicația ArtAdvisor.
 Include funcții pentru crearea graficelor și interpretarea vizuală a datelor.
 """
 
-import plotly.graph_objects as go
 from config import EMOTION_GROUPS
 
 def create_emotion_radar_chart(emotions_dict):
     """Creează un grafic radar pentru emoții cu maximum 6 emoții."""
     if not emotions_dict:
         return None
+
+    import plotly.graph_objects as go
     
     # Limitează la primele 6 emoții pentru vizualizare optimă
     emotions_items = list(emotions_dict.items())[:6]